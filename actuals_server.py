@@ -0,0 +1,127 @@
+"""实际产量采集服务（asyncio）：产线终端通过 TCP 长连接持续发送 NDJSON 报工
+
+用法：python actuals_server.py [--host 0.0.0.0] [--port 5003]
+
+协议：每行一条 JSON 报工（格式见 app/actuals.py）。配置了 ACTUALS_API_TOKEN 时，
+连接建立后第一行必须是 {"token": "..."}。格式错误的报工会回复一行
+{"line": 行号, "error": "..."}，正确的报工不回复；缓冲区已满时同样回复错误，终端需重发该行。报工在内存中按小时汇总，
+每隔 ACTUALS_FLUSH_INTERVAL 秒批量写入数据库；进程退出前写入剩余数据。
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import logging
+import signal
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from app import create_app, db
+from app.actuals import ActualsBuffer, BufferFull, ReportError, get_plant_index, parse_report
+
+log = logging.getLogger('actuals')
+
+# 工序和机台索引的刷新间隔（秒），产能数据变更后新工序最多延迟这么久才能报工
+PLANT_REFRESH_INTERVAL = 60
+
+
+class ActualsServer:
+
+    def __init__(self, app):
+        self.app = app
+        self.token = app.config.get('ACTUALS_API_TOKEN')
+        self.buffer = ActualsBuffer(app, db)
+        self.plant_index = {}
+        self.connections = 0
+
+    def _load_plant_index(self):
+        with self.app.app_context():
+            try:
+                return get_plant_index(db)
+            finally:
+                db.session.remove()
+
+    async def refresh_plant_index(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(PLANT_REFRESH_INTERVAL)
+            try:
+                self.plant_index = await loop.run_in_executor(None, self._load_plant_index)
+            except Exception:
+                log.exception('读取产能数据失败')
+
+    async def handle(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        self.connections += 1
+        line_number = 0
+        try:
+            if self.token:
+                line = await reader.readline()
+                try:
+                    token = json.loads(line).get('token', '')
+                except (ValueError, AttributeError):
+                    token = ''
+                if not hmac.compare_digest(str(token), self.token):
+                    writer.write(b'{"error": "invalid token"}\n')
+                    await writer.drain()
+                    return
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line_number += 1
+                if not line.strip():
+                    continue
+                try:
+                    key, quantity = parse_report(json.loads(line), self.plant_index)
+                    self.buffer.add(key, quantity)
+                except (ReportError, ValueError, BufferFull) as e:
+                    writer.write(json.dumps({'line': line_number, 'error': str(e)}, ensure_ascii=False).encode() + b'\n')
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+            log.debug('连接关闭 %s，共 %s 行', peer, line_number)
+
+
+async def serve(app, host, port):
+    loop = asyncio.get_running_loop()
+    server_state = ActualsServer(app)
+    # 先加载工序索引再接受连接，避免启动初期的报工因工序未知被拒绝
+    server_state.plant_index = await loop.run_in_executor(None, server_state._load_plant_index)
+    refresher = asyncio.create_task(server_state.refresh_plant_index())
+    server = await asyncio.start_server(server_state.handle, host, port, limit=1024 * 1024)
+    log.info('实际产量采集服务已启动：%s:%s', host, port)
+
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    async with server:
+        await stop.wait()
+    refresher.cancel()
+
+    # 写入剩余的报工
+    written = await loop.run_in_executor(None, server_state.buffer.flush)
+    log.info('服务停止，写入剩余 %s 行，统计：%s', written, server_state.buffer.stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='实际产量采集服务（asyncio）')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    app = create_app(register_views=False)
+    asyncio.run(serve(app, args.host, args.port or app.config.get('ACTUALS_SERVER_PORT', 5003)))
+
+
+if __name__ == '__main__':
+    main()
@@ -11,7 +11,9 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 import pymysql
 pymysql.install_as_MySQLdb()
 
-from app import app
+from app import create_app
+
+app = create_app()
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5002)
\ No newline at end of file
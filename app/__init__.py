@@ -1,14 +1,15 @@
 import os
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from config import Config
+from app.extensions import db, migrate
 
-# 创建数据库实例
-db = SQLAlchemy()
-migrate = Migrate()
 
-def create_app():
+def create_app(config_class=Config, register_views=True):
+    """应用工厂
+
+    register_views=False 时只初始化扩展和模型，不注册蓝图，
+    供 init_db.py、数据库迁移等命令行脚本使用，以减少启动开销。
+    """
     # 获取项目根目录路径
     project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     
@@ -18,32 +19,29 @@ def create_app():
                 static_folder=os.path.join(project_dir, 'app', 'static'))
 
     # 加载配置
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
 
     # 初始化扩展
     db.init_app(app)
     migrate.init_app(app, db)
 
-    # 导入模型（在db初始化之后）
-    from app import models
+    # 导入模型，确保元数据在迁移和 create_all 时完整
+    from app import models  # noqa: F401
+
+    # 命令行：flask schedule-partitions ...、flask replica ...、flask archive ...（均只导入轻量模块）
+    from app.partitioning import partition_cli
+    from app.db_routing import init_db_routing, replica_cli
+    from app.archive_cli import archive_cli
+    app.cli.add_command(partition_cli)
+    app.cli.add_command(replica_cli)
+    app.cli.add_command(archive_cli)
 
-    # 确保模型只初始化一次
-    global _models_initialized
-    if not _models_initialized:
-        models.init_models(db)
-        _models_initialized = True
+    # 读写分离：只读请求使用副本（配置 DATABASE_REPLICA_URL 时）
+    init_db_routing(app, db)
 
-    # 导入控制器（在app和db都准备好之后）
-    from app import controllers
-    controllers.register_routes(app, db)
+    # 按需注册蓝图（订单、产能、排产、用户）
+    if register_views:
+        from app.blueprints import register_blueprints
+        register_blueprints(app)
     
     return app
-
-# 全局标志：防止模型被重复初始化
-_models_initialized = False
-
-# 创建应用实例
-app = create_app()
-
-if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,413 @@
+"""实际产量采集
+
+产线终端按 (车间, 工序, 机台, 小时) 上报实际产量，报工频率很高。这里不逐条写库：
+报工先在内存中按小时汇总，由后台线程每隔 ACTUALS_FLUSH_INTERVAL 秒（或缓冲的
+汇总行数达到 ACTUALS_FLUSH_MAX_ROWS 时）批量写入，写入使用 upsert 累加到
+production_actuals 的小时汇总行上（MySQL：INSERT ... ON DUPLICATE KEY UPDATE，
+SQLite：INSERT ... ON CONFLICT DO UPDATE）。
+
+写入失败时，数据库不可用（OperationalError）的整批放回缓冲区等待下次重试；其他错误（如某一行
+数据无法写入）把这批数据二分后分别重试，单行连续失败 ACTUALS_MAX_ATTEMPTS 次后写入死信文件
+ACTUALS_DEAD_LETTER_FILE（NDJSON，修正后可原样 POST 到 /api/actuals 重新报工），不再阻塞其他数据。
+缓冲的汇总行数达到 ACTUALS_BUFFER_MAX_ROWS 时拒绝新的汇总行，HTTP 接口返回 503，终端稍后重发。
+
+HTTP 接口 POST /api/actuals 接受 JSON（单条、数组或 {"reports": [...]}）和 NDJSON
+（每行一条）；actuals_server.py 提供基于 asyncio 的 TCP 采集服务，终端可持续发送 NDJSON。
+
+单条报工格式：
+    {"workshop_id": 1, "process_id": 3, "equipment_id": 7, "time": "2026-10-19T08:15:00", "quantity": 120}
+也可以用 "date": "2026-10-19", "hour": 8 代替 "time"；equipment_id 省略时按工序报工。
+"""
+import atexit
+import json
+import os
+import threading
+from datetime import datetime
+
+from flask import current_app, jsonify, request
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from app.auth import login_required, token_or_login_required
+from app.scheduler import get_plant_snapshot
+
+
+class ReportError(ValueError):
+    """报工数据格式错误"""
+
+
+class BufferFull(RuntimeError):
+    """缓冲区已满（数据库长时间无法写入），报工需要稍后重发"""
+
+
+def _plant_index(plant):
+    """由产能快照构建 {工序ID: (车间ID, 机台ID集合)}，用于校验报工"""
+    index = {}
+    for workshop in plant.values():
+        for process in workshop['processes']:
+            index[process['id']] = (workshop['id'], {e['id'] for e in process['equipments']})
+    return index
+
+
+_plant_index_cache = (None, None)
+
+
+def get_plant_index(db):
+    """返回与当前产能快照对应的工序索引，快照未变化时复用"""
+    global _plant_index_cache
+    plant = get_plant_snapshot(db)
+    cached_plant, index = _plant_index_cache
+    if cached_plant is not plant:
+        index = _plant_index(plant)
+        _plant_index_cache = (plant, index)
+    return index
+
+
+def parse_report(report, plant_index):
+    """校验单条报工，返回 ((车间ID, 工序ID, 机台ID, 日期, 小时), 数量)"""
+    if not isinstance(report, dict):
+        raise ReportError('报工必须是 JSON 对象')
+    try:
+        process_id = int(report['process_id'])
+        equipment_id = int(report.get('equipment_id') or 0)
+        quantity = int(report['quantity'])
+        if 'time' in report:
+            moment = datetime.fromisoformat(str(report['time']))
+            day = datetime(moment.year, moment.month, moment.day)
+            hour = moment.hour
+        else:
+            day = datetime.strptime(str(report['date']), '%Y-%m-%d')
+            hour = int(report['hour'])
+    except KeyError as e:
+        raise ReportError(f'缺少字段：{e.args[0]}')
+    except (TypeError, ValueError):
+        raise ReportError('字段格式错误')
+
+    if not 0 <= hour <= 23:
+        raise ReportError('小时必须在 0-23 之间')
+    if quantity < 0:
+        raise ReportError('数量不能为负数')
+
+    process = plant_index.get(process_id)
+    if process is None:
+        raise ReportError(f'工序不存在：{process_id}')
+    workshop_id, equipment_ids = process
+    if report.get('workshop_id') is not None and int(report['workshop_id']) != workshop_id:
+        raise ReportError(f'工序 {process_id} 不属于车间 {report["workshop_id"]}')
+    if equipment_id and equipment_id not in equipment_ids:
+        raise ReportError(f'机台 {equipment_id} 不属于工序 {process_id}')
+    return (workshop_id, process_id, equipment_id, day, hour), quantity
+
+
+def upsert_actuals(db, totals):
+    """将 {(车间ID, 工序ID, 机台ID, 日期, 小时): [数量, 报工条数]} 累加写入 production_actuals，返回写入的行数"""
+    from app.models import ProductionActual
+
+    if not totals:
+        return 0
+
+    now = datetime.utcnow()
+    rows = [{
+        'workshop_id': workshop_id, 'process_id': process_id, 'equipment_id': equipment_id,
+        'schedule_date': day, 'hour': hour, 'quantity': quantity, 'report_count': count, 'updated_at': now,
+    } for (workshop_id, process_id, equipment_id, day, hour), (quantity, count) in totals.items()]
+
+    dialect = db.engine.dialect.name
+    table = ProductionActual.__table__
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        stmt = stmt.on_duplicate_key_update(
+            quantity=table.c.quantity + stmt.inserted.quantity,
+            report_count=table.c.report_count + stmt.inserted.report_count,
+            updated_at=stmt.inserted.updated_at,
+        )
+    elif dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['workshop_id', 'process_id', 'equipment_id', 'schedule_date', 'hour'],
+            set_={
+                'quantity': table.c.quantity + stmt.excluded.quantity,
+                'report_count': table.c.report_count + stmt.excluded.report_count,
+                'updated_at': stmt.excluded.updated_at,
+            },
+        )
+    else:
+        raise RuntimeError(f'不支持的数据库：{dialect}')
+
+    db.session.execute(stmt, rows)
+    db.session.commit()
+    return len(rows)
+
+
+def dead_letter_path(app):
+    """死信文件路径：ACTUALS_DEAD_LETTER_FILE，相对路径位于 instance 目录，为空表示只记录日志"""
+    path = app.config.get('ACTUALS_DEAD_LETTER_FILE')
+    if path and not os.path.isabs(path):
+        path = os.path.join(app.instance_path, path)
+    return path or None
+
+
+class ActualsBuffer:
+    """报工缓冲区：在内存中按小时汇总，由后台线程定期批量写入"""
+
+    def __init__(self, app, db, interval=None, max_rows=None):
+        self.app = app
+        self.db = db
+        self.interval = interval if interval is not None else app.config.get('ACTUALS_FLUSH_INTERVAL', 1.0)
+        self.max_rows = max_rows if max_rows is not None else app.config.get('ACTUALS_FLUSH_MAX_ROWS', 5000)
+        self.max_pending = app.config.get('ACTUALS_BUFFER_MAX_ROWS', 200000)
+        self.max_attempts = app.config.get('ACTUALS_MAX_ATTEMPTS', 5)
+        self.dead_letter_path = dead_letter_path(app)
+        self._totals = {}
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.stats = {'reports': 0, 'flushes': 0, 'rows_written': 0, 'errors': 0, 'rejected': 0, 'dead_letters': 0}
+
+    def add(self, key, quantity):
+        """缓冲一条报工；缓冲区已满且是新的汇总行时抛出 BufferFull"""
+        with self._lock:
+            slot = self._totals.get(key)
+            if slot is None:
+                if len(self._totals) >= self.max_pending:
+                    self.stats['rejected'] += 1
+                    raise BufferFull('报工缓冲区已满，请稍后重发')
+                self._totals[key] = [quantity, 1]
+            else:
+                slot[0] += quantity
+                slot[1] += 1
+            self.stats['reports'] += 1
+            pending = len(self._totals)
+        self._ensure_thread()
+        if pending >= self.max_rows:
+            self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._totals)
+
+    def flush(self):
+        """立即写入缓冲的汇总，返回写入的行数
+
+        数据库不可用时整批放回缓冲区并抛出异常；其他错误二分定位到出错的行，
+        出错的行放回缓冲区，连续失败 max_attempts 次后写入死信文件。
+        """
+        with self._flush_lock:
+            with self._lock:
+                totals, self._totals = self._totals, {}
+            if not totals:
+                return 0
+            with self.app.app_context():
+                try:
+                    written = self._write(totals)
+                finally:
+                    self.db.session.remove()
+            self.stats['flushes'] += 1
+            return written
+
+    def _write(self, totals):
+        """写入一批汇总，返回写入的行数；抛出 OperationalError 时这批中未写入的行都已放回缓冲区"""
+        try:
+            written = upsert_actuals(self.db, totals)
+        except OperationalError:
+            self.db.session.rollback()
+            self.stats['errors'] += 1
+            self._restore(totals)
+            raise
+        except Exception as e:
+            self.db.session.rollback()
+            self.stats['errors'] += 1
+            if len(totals) == 1:
+                self._fail(totals, e)
+                return 0
+            items = list(totals.items())
+            middle = len(items) // 2
+            halves = [dict(items[:middle]), dict(items[middle:])]
+            written = 0
+            for index, half in enumerate(halves):
+                try:
+                    written += self._write(half)
+                except OperationalError:
+                    # 出错的一半已放回缓冲区，之后尚未写入的部分也要放回，否则会丢失
+                    for rest in halves[index + 1:]:
+                        self._restore(rest)
+                    raise
+            return written
+        for key in totals:
+            self._attempts.pop(key, None)
+        self.stats['rows_written'] += written
+        return written
+
+    def _fail(self, totals, error):
+        """单行写入失败：放回缓冲区，达到重试次数后写入死信文件"""
+        (key, (quantity, count)), = totals.items()
+        attempts = self._attempts.get(key, 0) + 1
+        if attempts < self.max_attempts:
+            self._attempts[key] = attempts
+            self.app.logger.warning('实际产量写入失败（第 %s 次），将在下次重试：%s', attempts, key, exc_info=error)
+            self._restore(totals)
+            return
+
+        self._attempts.pop(key, None)
+        workshop_id, process_id, equipment_id, day, hour = key
+        record = {
+            'workshop_id': workshop_id, 'process_id': process_id, 'equipment_id': equipment_id,
+            'date': day.strftime('%Y-%m-%d'), 'hour': hour, 'quantity': quantity, 'report_count': count,
+            'error': str(error)[:500], 'failed_at': datetime.utcnow().isoformat(timespec='seconds'),
+        }
+        self.stats['dead_letters'] += 1
+        self.app.logger.error('实际产量连续写入失败 %s 次，已放弃：%s', attempts, record)
+        if self.dead_letter_path:
+            os.makedirs(os.path.dirname(self.dead_letter_path), exist_ok=True)
+            with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def _restore(self, totals):
+        with self._lock:
+            for key, (quantity, count) in totals.items():
+                slot = self._totals.setdefault(key, [0, 0])
+                slot[0] += quantity
+                slot[1] += count
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='actuals-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                self.app.logger.exception('实际产量写入失败，将在下次重试')
+
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+
+def get_actuals_buffer(app, db):
+    """每个应用（每个工作进程）共用一个缓冲区，进程退出时写入剩余数据"""
+    buffer = _buffers.get(id(app))
+    if buffer is None:
+        with _buffers_lock:
+            buffer = _buffers.get(id(app))
+            if buffer is None:
+                buffer = ActualsBuffer(app, db)
+                _buffers[id(app)] = buffer
+                atexit.register(_flush_quietly, buffer)
+    return buffer
+
+
+def _flush_quietly(buffer):
+    try:
+        buffer.flush()
+    except Exception:
+        pass
+
+
+def flush_all_buffers():
+    """写入所有缓冲区中的数据（工作进程退出前调用）"""
+    for buffer in list(_buffers.values()):
+        _flush_quietly(buffer)
+
+
+def ingest_reports(reports, buffer, plant_index):
+    """校验并缓冲一批报工，返回 (接受条数, 错误列表, 未处理的起始序号)
+
+    缓冲区已满时停止处理，从返回的序号开始的报工（含）都未缓冲；全部处理完时序号为 None。
+    """
+    accepted = 0
+    errors = []
+    for position, report in enumerate(reports):
+        try:
+            key, quantity = parse_report(report, plant_index)
+        except ReportError as e:
+            errors.append({'index': position, 'error': str(e)})
+            continue
+        try:
+            buffer.add(key, quantity)
+        except BufferFull as e:
+            errors.append({'index': position, 'error': str(e)})
+            return accepted, errors, position
+        accepted += 1
+    return accepted, errors, None
+
+
+def _read_reports():
+    """从请求体读取报工列表，支持 JSON 和 NDJSON"""
+    body = request.get_data(cache=False)
+    content_type = request.mimetype or ''
+    if content_type in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+    payload = json.loads(body or b'null')
+    if isinstance(payload, dict) and 'reports' in payload:
+        payload = payload['reports']
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list):
+        raise ValueError('请求体必须是报工对象或数组')
+    return payload
+
+
+def register_actuals_routes(app, db):
+
+    @app.route('/api/actuals', methods=['POST'])
+    @token_or_login_required('ACTUALS_API_TOKEN')
+    def ingest_actuals(user):
+        """上报实际产量（产线终端使用请求头 X-Api-Token，或已登录用户），返回 202 表示已缓冲"""
+        try:
+            reports = _read_reports()
+        except ValueError as e:
+            return jsonify({'error': f'请求体格式错误：{e}'}), 400
+
+        buffer = get_actuals_buffer(current_app._get_current_object(), db)
+        accepted, errors, retry_from = ingest_reports(reports, buffer, get_plant_index(db))
+        # 校验完成后立即归还连接，写入由后台线程批量完成
+        db.session.rollback()
+        if retry_from is not None:
+            # 缓冲区已满：retry_from 之前的报工已缓冲，终端稍后从 retry_from 开始重发
+            return jsonify({'accepted': accepted, 'retry_from': retry_from, 'errors': errors[:100]}), 503
+        return jsonify({'accepted': accepted, 'rejected': len(errors), 'errors': errors[:100]}), 202
+
+    @app.route('/api/actuals')
+    @login_required
+    def list_actuals(user):
+        """按小时查询实际产量汇总：?workshop_id=&date=YYYY-MM-DD"""
+        from app.models import ProductionActual
+
+        try:
+            day = datetime.strptime(request.args.get('date', ''), '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': '日期格式错误'}), 400
+
+        query = db.session.query(
+            ProductionActual.workshop_id, ProductionActual.process_id, ProductionActual.hour,
+            func.sum(ProductionActual.quantity), func.sum(ProductionActual.report_count)
+        ).filter(ProductionActual.schedule_date == day)
+        if request.args.get('workshop_id'):
+            query = query.filter(ProductionActual.workshop_id == request.args.get('workshop_id', type=int))
+        rows = query.group_by(
+            ProductionActual.workshop_id, ProductionActual.process_id, ProductionActual.hour
+        ).order_by(ProductionActual.workshop_id, ProductionActual.process_id, ProductionActual.hour).all()
+
+        buffer = _buffers.get(id(current_app._get_current_object()))
+        return jsonify({
+            'date': day.strftime('%Y-%m-%d'),
+            'actuals': [{'workshop_id': w, 'process_id': p, 'hour': h, 'quantity': int(q or 0),
+                         'report_count': int(c or 0)} for w, p, h, q, c in rows],
+            'pending': buffer.pending() if buffer else 0,
+        })
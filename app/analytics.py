@@ -0,0 +1,256 @@
+"""排产利用率与瓶颈分析
+
+用两条分组 SQL 读取排程：一条按 (车间, 工序, 日期, 产品) 汇总排产数量，一条按 (工序, 日期)
+统计不同的生产小时数（多个产品共用同一小时只算一次）；再用 NumPy 计算各工序每天的利用率热力图、
+占用小时数以及各订单的瓶颈工序。
+"""
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import request, jsonify
+
+from app.auth import login_required
+from app.scheduler import PROCESS_SEQUENCE
+
+
+# 每天可用的生产小时数（车间按24小时排产）
+HOURS_PER_DAY = 24
+
+
+def _process_rank(process_name):
+    """按标准工序流程排序，未知工序排在最后"""
+    try:
+        return PROCESS_SEQUENCE.index(process_name)
+    except ValueError:
+        return len(PROCESS_SEQUENCE)
+
+
+def _parse_date(value):
+    """解析 YYYY-MM-DD 格式的日期参数，为空时返回None"""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d')
+
+
+def load_schedule_aggregates(db, workshop_name=None, start_date=None, end_date=None):
+    """用分组SQL查询加载 (车间, 工序, 日期, 产品) 维度的排产汇总
+
+    返回的每一行包含：车间ID、车间名、工序ID、工序名、日期、产品ID、
+    排产数量、排产小时数以及该工序的每小时总产能。排产小时数按产品计，
+    同一小时的多个产品会重复计算，工序占用小时数由 load_busy_hours 单独查询。
+    """
+    from app.models import ProductionSchedule, Workshop, Process, Equipment
+
+    # 工序产能子查询：每个工序所有机台每小时产能之和
+    capacity = db.session.query(
+        Equipment.process_id.label('process_id'),
+        db.func.sum(Equipment.capacity_per_hour).label('capacity_per_hour')
+    ).group_by(Equipment.process_id).subquery()
+
+    day = db.func.date(ProductionSchedule.schedule_date)
+    query = db.session.query(
+        ProductionSchedule.workshop_id,
+        Workshop.name,
+        ProductionSchedule.process_id,
+        Process.name,
+        day.label('day'),
+        ProductionSchedule.product_id,
+        db.func.sum(ProductionSchedule.production_quantity),
+        db.func.count(ProductionSchedule.id),
+        db.func.coalesce(capacity.c.capacity_per_hour, 0)
+    ).join(
+        Workshop, Workshop.id == ProductionSchedule.workshop_id
+    ).join(
+        Process, Process.id == ProductionSchedule.process_id
+    ).outerjoin(
+        capacity, capacity.c.process_id == ProductionSchedule.process_id
+    )
+
+    query = _filter_schedules(query, workshop_name, start_date, end_date)
+    return query.group_by(
+        ProductionSchedule.workshop_id,
+        Workshop.name,
+        ProductionSchedule.process_id,
+        Process.name,
+        day,
+        ProductionSchedule.product_id,
+        capacity.c.capacity_per_hour
+    ).all()
+
+
+def _filter_schedules(query, workshop_name=None, start_date=None, end_date=None):
+    """按车间名和日期范围过滤排程查询（查询需已关联 Workshop）"""
+    from app.models import ProductionSchedule, Workshop
+
+    if workshop_name:
+        query = query.filter(Workshop.name == workshop_name)
+    # 使用日期范围过滤，便于命中 schedule_date 上的索引
+    if start_date:
+        query = query.filter(ProductionSchedule.schedule_date >= start_date)
+    if end_date:
+        query = query.filter(ProductionSchedule.schedule_date < end_date + timedelta(days=1))
+    return query
+
+
+def load_busy_hours(db, workshop_name=None, start_date=None, end_date=None):
+    """按 (工序, 日期) 统计有排产的不同小时数，返回 [(工序ID, 日期, 小时数)]
+
+    同一小时可能排了多个产品，按产品分组的行数会重复计算，这里对小时去重。
+    """
+    from app.models import ProductionSchedule, Workshop
+
+    day = db.func.date(ProductionSchedule.schedule_date)
+    query = db.session.query(
+        ProductionSchedule.process_id,
+        day.label('day'),
+        db.func.count(db.distinct(ProductionSchedule.hour))
+    ).join(
+        Workshop, Workshop.id == ProductionSchedule.workshop_id
+    ).filter(ProductionSchedule.production_quantity > 0)
+    query = _filter_schedules(query, workshop_name, start_date, end_date)
+    return query.group_by(ProductionSchedule.process_id, day).all()
+
+
+def _factorize(values):
+    """将值列表编码为 (去重后的有序取值, 每个元素对应的整数下标)"""
+    uniques, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+    return uniques, codes
+
+
+def compute_utilization(rows, busy_hours=None):
+    """基于分组查询结果，用NumPy计算利用率热力图和各订单的瓶颈工序
+
+    利用率 = 排产数量 / (工序每小时产能 × 当天可用小时数)。
+    busy_hours 为 load_busy_hours 的结果，用作各工序每天的占用小时数；不传时按产品行数累加，
+    并截断到当天可用小时数。
+    瓶颈工序为该产品占用小时数最多的工序（小时数相同时取产能较小者）。
+    """
+    if not rows:
+        return {'workshops': [], 'bottlenecks': {}}
+
+    columns = list(zip(*rows))
+    workshop_ids = np.asarray(columns[0], dtype=np.int64)
+    workshop_names = columns[1]
+    process_ids = np.asarray(columns[2], dtype=np.int64)
+    process_names = columns[3]
+    days = [str(d)[:10] for d in columns[4]]
+    product_ids = np.asarray(columns[5], dtype=np.int64)
+    quantities = np.asarray(columns[6], dtype=np.float64)
+    hours = np.asarray(columns[7], dtype=np.int64)
+    capacities = np.asarray(columns[8], dtype=np.float64)
+
+    day_values, day_codes = _factorize(days)
+    n_days = len(day_values)
+
+    # 工序元数据（名称、所属车间、产能），每个工序ID只取一次
+    unique_process_ids, first_index, process_codes = np.unique(
+        process_ids, return_index=True, return_inverse=True)
+    n_processes = len(unique_process_ids)
+
+    # 按 (工序, 日期) 累加排产数量和占用小时数
+    cell_index = process_codes * n_days + day_codes
+    cell_quantity = np.bincount(cell_index, weights=quantities,
+                                minlength=n_processes * n_days).reshape(n_processes, n_days)
+    if busy_hours is None:
+        cell_hours = np.minimum(np.bincount(cell_index, weights=hours,
+                                            minlength=n_processes * n_days).reshape(n_processes, n_days),
+                                HOURS_PER_DAY)
+    else:
+        process_lookup = {int(process_id): code for code, process_id in enumerate(unique_process_ids.tolist())}
+        day_lookup = {day: code for code, day in enumerate(day_values.tolist())}
+        cell_hours = np.zeros((n_processes, n_days))
+        for process_id, day, count in busy_hours:
+            process_code = process_lookup.get(int(process_id))
+            day_code = day_lookup.get(str(day)[:10])
+            if process_code is not None and day_code is not None:
+                cell_hours[process_code, day_code] = count
+
+    process_capacity = capacities[first_index]
+    available = process_capacity[:, None] * HOURS_PER_DAY
+    with np.errstate(divide='ignore', invalid='ignore'):
+        utilization = np.where(available > 0, cell_quantity / available, 0.0)
+
+    # 按车间组织热力图数据
+    workshops = OrderedDict()
+    for code in range(n_processes):
+        idx = first_index[code]
+        workshop_id = int(workshop_ids[idx])
+        if workshop_id not in workshops:
+            workshops[workshop_id] = {'name': workshop_names[idx], 'codes': []}
+        workshops[workshop_id]['codes'].append(code)
+
+    heatmaps = []
+    for workshop_id, info in sorted(workshops.items(), key=lambda item: item[1]['name']):
+        codes = sorted(info['codes'], key=lambda c: _process_rank(process_names[first_index[c]]))
+        codes = np.asarray(codes, dtype=np.int64)
+        workshop_util = utilization[codes]
+        # 车间瓶颈：平均利用率最高的工序
+        mean_util = workshop_util.mean(axis=1)
+        bottleneck_code = codes[int(np.argmax(mean_util))]
+        heatmaps.append({
+            'workshop_id': workshop_id,
+            'workshop': info['name'],
+            'processes': [process_names[first_index[c]] for c in codes],
+            'process_ids': unique_process_ids[codes].tolist(),
+            'capacity_per_hour': np.round(process_capacity[codes], 2).tolist(),
+            'days': day_values.tolist(),
+            'utilization': np.round(workshop_util, 4).tolist(),
+            'scheduled_quantity': cell_quantity[codes].astype(np.int64).tolist(),
+            'busy_hours': cell_hours[codes].astype(np.int64).tolist(),
+            'peak_utilization': round(float(workshop_util.max()), 4) if workshop_util.size else 0.0,
+            'bottleneck_process': process_names[first_index[bottleneck_code]],
+        })
+
+    # 产品维度：按 (产品, 工序) 汇总占用小时数，取小时数最多的工序为瓶颈
+    unique_products, product_codes = np.unique(product_ids, return_inverse=True)
+    pair_index = product_codes * n_processes + process_codes
+    pair_hours = np.bincount(pair_index, weights=hours,
+                             minlength=len(unique_products) * n_processes
+                             ).reshape(len(unique_products), n_processes)
+    # 小时数相同时优先选择产能较小的工序
+    tie_break = 1.0 / (1.0 + process_capacity)
+    score = np.where(pair_hours > 0, pair_hours + tie_break[None, :], -1.0)
+    bottleneck_codes = np.argmax(score, axis=1)
+
+    bottlenecks = {}
+    for row, (product_id, code) in enumerate(zip(unique_products.tolist(), bottleneck_codes.tolist())):
+        idx = first_index[code]
+        bottlenecks[product_id] = {
+            'process_id': int(unique_process_ids[code]),
+            'process': process_names[idx],
+            'workshop': workshop_names[idx],
+            'hours': int(pair_hours[row, code]),
+            'capacity_per_hour': round(float(process_capacity[code]), 2),
+        }
+
+    return {'workshops': heatmaps, 'bottlenecks': bottlenecks}
+
+
+def register_analytics_routes(app, db):
+    from app.models import Order
+
+    @app.route('/api/analytics/utilization')
+    @login_required
+    def utilization_analytics(user):
+        """工序利用率热力图与订单瓶颈分析"""
+        try:
+            start_date = _parse_date(request.args.get('start'))
+            end_date = _parse_date(request.args.get('end'))
+        except ValueError:
+            return jsonify({'error': '日期格式应为 YYYY-MM-DD'}), 400
+
+        filters = dict(workshop_name=request.args.get('workshop') or None, start_date=start_date, end_date=end_date)
+        rows = load_schedule_aggregates(db, **filters)
+        result = compute_utilization(rows, load_busy_hours(db, **filters))
+
+        # 将产品维度的瓶颈映射到订单
+        product_bottlenecks = result.pop('bottlenecks')
+        orders = db.session.query(Order.id, Order.order_number, Order.product_id).filter(
+            Order.product_id.in_(list(product_bottlenecks.keys()))
+        ).all() if product_bottlenecks else []
+        result['orders'] = [
+            dict(order_id=order_id, order_number=order_number, **product_bottlenecks[product_id])
+            for order_id, order_number, product_id in orders
+        ]
+        return jsonify(result)
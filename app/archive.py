@@ -0,0 +1,385 @@
+"""已完成订单和历史排程归档
+
+生产计划表只增不减：已经完工、出货的订单和它们的逐小时排程会一直留在 orders、
+production_schedules 表中，拖慢排程删除、汇总和排产页面的查询。归档任务把截止时间
+之前已完工（排产已排完、最后一道工序的排程数量达到投产数量，预计完工时间和出货日期都早于
+截止时间）的订单连同产品、各工序汇总和全部
+排程记录写入 gzip 压缩的数据块文件，再从数据库中删除；archived_orders 表记录每个订单
+所在的数据块，订单详情页找不到订单时从数据块中读取。
+
+数据块文件写入后不再修改（只新增文件），格式（gzip 压缩前，小端）：
+  头部 12 字节：b'TPAR'、uint16 版本、uint16 保留、uint32 JSON 字节数
+  JSON：订单、产品、各工序汇总（含工序名）和排程涉及的工序表
+  排程记录按列存放，每列为 uint32 数组：产品ID、工序ID、车间ID、小时（1970-01-01 起）、数量，
+  记录按 (产品ID, 小时, 工序ID) 排序
+
+只有产品不被其他订单共用、且截止时间之后没有排程记录的订单才会归档。
+"""
+import gzip
+import hashlib
+import json
+import os
+import struct
+from datetime import datetime, timedelta
+from functools import lru_cache
+from types import SimpleNamespace
+
+import numpy as np
+from flask import current_app, jsonify
+from sqlalchemy import DateTime, case, func
+from sqlalchemy.orm import aliased
+
+from app.auth import login_required
+from app.order_summaries import final_process_ids
+from app.schedule_maintenance import _chunks, delete_orders
+from app.scheduler import PROCESS_SEQUENCE
+from app.versioning import from_hour_index, to_hour_index
+
+MAGIC = b'TPAR'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHI')
+COLUMNS = ('product_id', 'process_id', 'workshop_id', 'hour', 'quantity')
+
+
+class ArchiveError(Exception):
+    """归档文件缺失、损坏或格式无法识别"""
+
+
+def archive_dir(app=None):
+    """归档文件目录：ARCHIVE_DIR，相对路径位于 instance 目录"""
+    app = app or current_app
+    path = app.config.get('ARCHIVE_DIR') or 'archive'
+    if not os.path.isabs(path):
+        path = os.path.join(app.instance_path, path)
+    return path
+
+
+def archive_cutoff(days=None, now=None):
+    """默认截止时间：当前时间之前 ARCHIVE_AFTER_DAYS 天"""
+    if days is None:
+        days = current_app.config.get('ARCHIVE_AFTER_DAYS', 180)
+    return (now or datetime.now()) - timedelta(days=days)
+
+
+def _column_values(instance):
+    """按表字段导出为可 JSON 序列化的字典，时间字段转为 ISO 格式字符串"""
+    values = {}
+    for column in instance.__table__.columns:
+        value = getattr(instance, column.key)
+        values[column.key] = value.isoformat() if isinstance(value, datetime) else value
+    return values
+
+
+def _parse_values(model, values):
+    """_column_values 的逆操作：按模型字段类型将时间字符串还原为 datetime"""
+    parsed = dict(values)
+    for column in model.__table__.columns:
+        value = parsed.get(column.key)
+        if isinstance(column.type, DateTime) and value:
+            parsed[column.key] = datetime.fromisoformat(value)
+    return parsed
+
+
+def archivable_order_ids(db, cutoff, limit=None):
+    """可归档的订单ID：截止时间前已完工且已过出货日期，产品不与其他订单共用，截止日之后没有排程
+
+    已完工要求排产结果为排完（plan_complete），并且车间最后一道工序的排程数量合计达到投产数量；
+    排不完或汇总早于排完标记的订单不归档。实际产量按 (车间, 工序, 小时) 上报，不能对应到订单，
+    因此以排程为准。
+    """
+    from app.models import Order, Product, ProductionSchedule
+
+    final_processes = final_process_ids(db)
+    if not final_processes:
+        return []
+    cutoff_day = datetime(cutoff.year, cutoff.month, cutoff.day)
+    other = aliased(Order)
+    shared = db.session.query(other.id).filter(
+        other.product_id == Order.product_id, other.id != Order.id).exists()
+    later = db.session.query(ProductionSchedule.id).filter(
+        ProductionSchedule.product_id == Order.product_id,
+        ProductionSchedule.schedule_date >= cutoff_day).exists()
+
+    final_quantity = db.session.query(
+        func.coalesce(func.sum(ProductionSchedule.production_quantity), 0)
+    ).filter(
+        ProductionSchedule.product_id == Order.product_id,
+        ProductionSchedule.process_id == case(final_processes, value=Product.workshop),
+    ).scalar_subquery()
+
+    query = db.session.query(Order.id).join(Product, Product.id == Order.product_id).filter(
+        Order.plan_complete.is_(True), Order.planned_completion < cutoff, Product.shipping_date < cutoff,
+        final_quantity >= Product.calculated_quantity, ~shared, ~later
+    ).order_by(Order.id)
+    if limit:
+        query = query.limit(limit)
+    return [order_id for (order_id,) in query.all()]
+
+
+def encode_archive(header, columns):
+    """将 JSON 头部和排程列编码为数据块（未压缩）
+
+    各列长度应等于 header['row_count']，数值应在 uint32 范围内，否则抛出 ValueError。
+    """
+    count = header['row_count']
+    arrays = []
+    for name in COLUMNS:
+        values = np.asarray(columns[name], dtype=np.int64)
+        if len(values) != count:
+            raise ValueError(f'排程列 {name} 的长度与记录数不符')
+        if count and (values.min() < 0 or values.max() > 0xFFFFFFFF):
+            raise ValueError(f'排程列 {name} 超出 uint32 范围')
+        arrays.append(values.astype('<u4'))
+    payload = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(payload)), payload]
+    for values in arrays:
+        parts.append(values.tobytes())
+    return b''.join(parts)
+
+
+def decode_archive(raw):
+    """解码数据块（已解压），返回 (头部字典, {列名: 数组})"""
+    try:
+        magic, version, _, length = HEADER.unpack_from(raw)
+    except struct.error:
+        raise ArchiveError('归档数据不完整')
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ArchiveError('无法识别的归档格式')
+    position = HEADER.size
+    try:
+        header = json.loads(raw[position:position + length].decode('utf-8'))
+        position += length
+        count = header['row_count']
+        columns = {}
+        for name in COLUMNS:
+            columns[name] = np.frombuffer(raw, dtype='<u4', count=count, offset=position)
+            position += count * 4
+    except (KeyError, TypeError, ValueError):
+        raise ArchiveError('归档数据不完整')
+    if position != len(raw):
+        raise ArchiveError('归档数据长度与记录数不符')
+    return header, columns
+
+
+def build_archive_chunk(db, order_ids, cutoff):
+    """读取订单、产品、各工序汇总和排程记录，返回 (头部字典, 排程列)"""
+    from app.models import Order, OrderProcessSummary, Process, ProductionSchedule, Workshop
+
+    orders = Order.query.filter(Order.id.in_(order_ids)).order_by(Order.id).all()
+    product_ids = sorted({order.product_id for order in orders})
+
+    summaries = {}
+    for summary in OrderProcessSummary.query.filter(OrderProcessSummary.order_id.in_(order_ids)).all():
+        summaries.setdefault(summary.order_id, []).append(summary)
+
+    rows = []
+    for chunk in _chunks(product_ids, 500):
+        rows.extend(db.session.query(
+            ProductionSchedule.product_id, ProductionSchedule.process_id, ProductionSchedule.workshop_id,
+            ProductionSchedule.schedule_date, ProductionSchedule.hour, ProductionSchedule.production_quantity
+        ).filter(ProductionSchedule.product_id.in_(chunk)).all())
+    rows.sort(key=lambda row: (row[0], to_hour_index(row[3], row[4]), row[1]))
+    columns = {
+        'product_id': [row[0] for row in rows],
+        'process_id': [row[1] for row in rows],
+        'workshop_id': [row[2] for row in rows],
+        'hour': [to_hour_index(row[3], row[4]) for row in rows],
+        'quantity': [row[5] for row in rows],
+    }
+
+    process_ids = set(columns['process_id'])
+    for order_summaries in summaries.values():
+        process_ids.update(summary.process_id for summary in order_summaries)
+    processes = {
+        str(process_id): [workshop_name, process_name]
+        for process_id, workshop_name, process_name in db.session.query(
+            Process.id, Workshop.name, Process.name
+        ).join(Workshop, Workshop.id == Process.workshop_id).filter(Process.id.in_(process_ids or {-1})).all()
+    }
+
+    header = {
+        'created_at': datetime.now().isoformat(),
+        'cutoff': cutoff.isoformat(),
+        'processes': processes,
+        'row_count': len(rows),
+        'orders': [dict(
+            _column_values(order),
+            product=_column_values(order.product),
+            process_summaries=[_column_values(summary) for summary in summaries.get(order.id, [])],
+        ) for order in orders],
+    }
+    return header, columns
+
+
+def write_archive_file(directory, name, payload):
+    """gzip 压缩后写入新文件（先写临时文件再改名，不覆盖已有文件），返回 (相对路径, 字节数, sha256)"""
+    compressed = gzip.compress(payload, 9)
+    relative = f"{datetime.now().strftime('%Y-%m')}/{name}"
+    path = os.path.join(directory, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        raise ArchiveError(f'归档文件已存在：{relative}')
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(compressed)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    return relative, len(compressed), hashlib.sha256(compressed).hexdigest()
+
+
+def archive_orders(db, cutoff, chunk_orders=None, limit=None, dry_run=False):
+    """归档截止时间前已完工的订单，返回 {'chunks', 'orders', 'rows', 'bytes'}
+
+    每个数据块写入文件并提交索引后，再按 delete_orders 分批删除订单、产品和排程；
+    上次归档在删除前中断时，已写入数据块的订单在这里先补删。
+    """
+    from app.models import ArchiveChunk, ArchivedOrder, Order, ProductionSchedule
+
+    if chunk_orders is None:
+        chunk_orders = current_app.config.get('ARCHIVE_CHUNK_ORDERS', 500)
+    directory = archive_dir()
+    result = {'chunks': 0, 'orders': 0, 'rows': 0, 'bytes': 0}
+
+    if not dry_run:
+        leftover = [order_id for (order_id,) in db.session.query(Order.id).join(
+            ArchivedOrder, (ArchivedOrder.order_id == Order.id) & (ArchivedOrder.order_number == Order.order_number)
+        ).all()]
+        if leftover:
+            delete_orders(db, leftover)
+
+    order_ids = archivable_order_ids(db, cutoff, limit=limit)
+    if dry_run:
+        result['orders'] = len(order_ids)
+        if order_ids:
+            product_ids = db.session.query(Order.product_id).filter(Order.id.in_(order_ids))
+            result['rows'] = db.session.query(ProductionSchedule.id).filter(
+                ProductionSchedule.product_id.in_(product_ids)).count()
+        return result
+
+    for chunk in _chunks(order_ids, max(1, int(chunk_orders))):
+        header, columns = build_archive_chunk(db, chunk, cutoff)
+        name = f"orders-{datetime.now().strftime('%Y%m%d%H%M%S')}-{chunk[0]}-{chunk[-1]}.tpa.gz"
+        path, size, digest = write_archive_file(directory, name, encode_archive(header, columns))
+
+        archive_chunk = ArchiveChunk(path=path, cutoff=cutoff, order_count=len(header['orders']),
+                                     row_count=header['row_count'], size_bytes=size, sha256=digest)
+        db.session.add(archive_chunk)
+        db.session.flush()
+        db.session.add_all([ArchivedOrder(
+            order_id=order['id'], order_number=order['order_number'], product_id=order['product_id'],
+            chunk_id=archive_chunk.id
+        ) for order in header['orders']])
+        db.session.commit()
+        delete_orders(db, chunk)
+
+        result['chunks'] += 1
+        result['orders'] += archive_chunk.order_count
+        result['rows'] += archive_chunk.row_count
+        result['bytes'] += size
+    return result
+
+
+@lru_cache(maxsize=8)
+def _load_chunk(path, digest):
+    # 数据块文件不会修改，按 (路径, 摘要) 缓存解码结果，同一数据块中的订单连续查看时不必重复解压
+    try:
+        with open(path, 'rb') as f:
+            compressed = f.read()
+    except OSError as e:
+        raise ArchiveError(f'无法读取归档文件：{e}')
+    if hashlib.sha256(compressed).hexdigest() != digest:
+        raise ArchiveError('归档文件校验失败')
+    return decode_archive(gzip.decompress(compressed))
+
+
+def read_archive_chunk(chunk):
+    """读取 ArchiveChunk 对应的数据块，返回 (头部字典, 排程列)"""
+    return _load_chunk(os.path.join(archive_dir(), chunk.path), chunk.sha256)
+
+
+def find_archived_order(order_id):
+    """按原订单ID查找归档索引（ID 被复用过时取最近归档的一条），没有返回None"""
+    from app.models import ArchivedOrder
+
+    return ArchivedOrder.query.filter_by(order_id=order_id).order_by(
+        ArchivedOrder.archived_at.desc(), ArchivedOrder.id.desc()).first()
+
+
+def _archived_entry(archived):
+    header, columns = read_archive_chunk(archived.chunk)
+    for entry in header['orders']:
+        if entry['id'] == archived.order_id and entry['order_number'] == archived.order_number:
+            return header, columns, entry
+    raise ArchiveError(f'归档文件中没有订单 {archived.order_number}')
+
+
+def load_archived_order(archived):
+    """从数据块还原订单详情页使用的 (订单, 各工序汇总)，字段与 Order、OrderProcessSummary 一致"""
+    from app.models import Order, OrderProcessSummary, Product
+
+    header, _, entry = _archived_entry(archived)
+    values = _parse_values(Order, entry)
+    order = SimpleNamespace(**values)
+    order.product = SimpleNamespace(**_parse_values(Product, entry['product']))
+    order.plan_complete = values.get('plan_complete')
+    order.is_late = order.plan_complete is False or (order.slack_hours is not None and order.slack_hours < 0)
+
+    processes = header['processes']
+    summaries = []
+    for summary in entry['process_summaries']:
+        summary = SimpleNamespace(**_parse_values(OrderProcessSummary, summary))
+        name = processes.get(str(summary.process_id), [None, ''])[1]
+        summary.process = SimpleNamespace(id=summary.process_id, name=name)
+        summaries.append(summary)
+    summaries.sort(key=lambda s: (
+        PROCESS_SEQUENCE.index(s.process.name) if s.process.name in PROCESS_SEQUENCE else len(PROCESS_SEQUENCE),
+        s.first_start))
+    return order, summaries
+
+
+def archived_schedule_rows(archived):
+    """已归档订单的逐小时排程记录"""
+    header, columns, entry = _archived_entry(archived)
+    product_ids = columns['product_id']
+    # 记录按产品ID排序，二分查找该产品的记录范围
+    begin, end = np.searchsorted(product_ids, [entry['product_id'], entry['product_id'] + 1])
+    processes = header['processes']
+    rows = []
+    for process_id, workshop_id, hour, quantity in zip(
+            columns['process_id'][begin:end].tolist(), columns['workshop_id'][begin:end].tolist(),
+            columns['hour'][begin:end].tolist(), columns['quantity'][begin:end].tolist()):
+        schedule_date, hour_of_day = from_hour_index(hour)
+        workshop_name, process_name = processes.get(str(process_id), ['', ''])
+        rows.append({
+            'date': schedule_date.strftime('%Y-%m-%d'),
+            'hour': hour_of_day,
+            'workshop_id': workshop_id,
+            'workshop': workshop_name,
+            'process_id': process_id,
+            'process': process_name,
+            'quantity': quantity,
+        })
+    return rows
+
+
+def register_archive_routes(app, db):
+
+    @app.route('/api/archive/orders/<int:order_id>')
+    @login_required
+    def archived_order_schedule(order_id, user):
+        """已归档订单的信息和逐小时排程"""
+        archived = find_archived_order(order_id)
+        if archived is None:
+            return jsonify({'error': '归档中没有该订单'}), 404
+        try:
+            rows = archived_schedule_rows(archived)
+        except ArchiveError as e:
+            return jsonify({'error': str(e)}), 500
+        return jsonify({
+            'order_id': archived.order_id,
+            'order_number': archived.order_number,
+            'archived_at': archived.archived_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'archive_file': archived.chunk.path,
+            'schedule': rows,
+        })
@@ -0,0 +1,60 @@
+"""归档命令行：flask archive run|list|verify
+
+与 app.archive 分开，命令执行时才导入归档模块（NumPy、排产模块），
+create_app 注册命令组时不增加 init_db.py、flask db 等命令行脚本的启动开销。
+"""
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+
+archive_cli = AppGroup('archive', help='已完成订单和历史排程归档')
+
+
+@archive_cli.command('run')
+@click.option('--days', type=int, default=None, help='归档多少天之前完工的订单，默认 ARCHIVE_AFTER_DAYS')
+@click.option('--before', default=None, help='截止日期（YYYY-MM-DD），优先于 --days')
+@click.option('--limit', type=int, default=None, help='本次最多归档的订单数')
+@click.option('--dry-run', is_flag=True, help='只统计可归档的订单和排程记录数')
+def run_command(days, before, limit, dry_run):
+    """归档截止时间前已完工的订单及其排程，建议每天定时执行"""
+    from app.archive import archive_cutoff, archive_orders
+    from app.extensions import db
+
+    cutoff = datetime.strptime(before, '%Y-%m-%d') if before else archive_cutoff(days)
+    result = archive_orders(db, cutoff, limit=limit, dry_run=dry_run)
+    if dry_run:
+        click.echo(f"截止 {cutoff:%Y-%m-%d %H:%M}：可归档 {result['orders']} 个订单，{result['rows']} 条排程记录。")
+    else:
+        click.echo(f"截止 {cutoff:%Y-%m-%d %H:%M}：归档 {result['orders']} 个订单、{result['rows']} 条排程记录，"
+                   f"写入 {result['chunks']} 个文件（{result['bytes'] / 1024:,.1f} KB）。")
+
+
+@archive_cli.command('list')
+def list_command():
+    """列出归档文件"""
+    from app.models import ArchiveChunk
+
+    for chunk in ArchiveChunk.query.order_by(ArchiveChunk.id).all():
+        click.echo(f'{chunk.id}\t{chunk.created_at:%Y-%m-%d %H:%M}\t截止 {chunk.cutoff:%Y-%m-%d}\t'
+                   f'{chunk.order_count} 个订单\t{chunk.row_count} 条排程\t{chunk.size_bytes / 1024:,.1f} KB\t{chunk.path}')
+
+
+@archive_cli.command('verify')
+def verify_command():
+    """校验所有归档文件的摘要和格式"""
+    from app.archive import ArchiveError, read_archive_chunk
+    from app.models import ArchiveChunk
+
+    failed = 0
+    for chunk in ArchiveChunk.query.order_by(ArchiveChunk.id).all():
+        try:
+            header, _ = read_archive_chunk(chunk)
+            if len(header['orders']) != chunk.order_count or header['row_count'] != chunk.row_count:
+                raise ArchiveError('记录数与索引不一致')
+        except ArchiveError as e:
+            failed += 1
+            click.echo(f'{chunk.path}：{e}')
+    click.echo('全部归档文件校验通过。' if not failed else f'{failed} 个归档文件校验失败。')
+    if failed:
+        raise SystemExit(1)
@@ -0,0 +1,89 @@
+"""登录与权限验证装饰器"""
+import hmac
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, request, redirect, url_for, flash, session
+
+from app.models import User
+
+
+def login_required(f):
+    """登录验证装饰器，检查会话是否超时"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # 检查session中是否有用户信息
+        user_id = request.cookies.get('user_id')
+        if not user_id:
+            return redirect(url_for('users.login'))
+        
+        # 检查会话时间
+        last_activity = session.get('last_activity')
+        if last_activity:
+            # 将字符串转换为datetime对象
+            last_activity = datetime.fromisoformat(last_activity)
+            # 检查是否超过30分钟
+            if datetime.now() - last_activity > timedelta(minutes=30):
+                # 清除会话
+                session.clear()
+                flash('会话已超时，请重新登录！', 'error')
+                return redirect(url_for('users.login'))
+        
+        # 更新最后活动时间
+        session['last_activity'] = datetime.now().isoformat()
+        
+        user = User.query.get(int(user_id))
+        if not user:
+            return redirect(url_for('users.login'))
+        
+        # 将用户信息传递给视图函数
+        return f(user=user, *args, **kwargs)
+    
+    return decorated_function
+
+
+def admin_required(f):
+    """管理员权限验证装饰器，检查会话是否超时"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        user_id = request.cookies.get('user_id')
+        if not user_id:
+            return redirect(url_for('users.login'))
+        
+        # 检查会话时间
+        last_activity = session.get('last_activity')
+        if last_activity:
+            last_activity = datetime.fromisoformat(last_activity)
+            if datetime.now() - last_activity > timedelta(minutes=30):
+                session.clear()
+                flash('会话已超时，请重新登录！', 'error')
+                return redirect(url_for('users.login'))
+        
+        # 更新最后活动时间
+        session['last_activity'] = datetime.now().isoformat()
+        
+        user = User.query.get(int(user_id))
+        if not user or user.role.name != 'ADMIN':
+            flash('权限不足！', 'error')
+            return redirect(url_for('orders.index'))
+        
+        return f(user=user, *args, **kwargs)
+    
+    return decorated_function
+
+
+def token_or_login_required(config_key):
+    """接口验证装饰器：请求头 X-Api-Token 与配置项 config_key 一致时直接放行（user 为 None），
+    否则按 login_required 验证登录。供产线终端等无法登录的客户端使用。"""
+    def decorator(f):
+        login_view = login_required(f)
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            token = current_app.config.get(config_key)
+            if token and hmac.compare_digest(request.headers.get('X-Api-Token', ''), token):
+                return f(user=None, *args, **kwargs)
+            return login_view(*args, **kwargs)
+
+        return decorated_function
+    return decorator
@@ -0,0 +1,21 @@
+"""蓝图注册
+
+蓝图模块在应用工厂中按需导入，只导入 app 包、模型或执行数据库命令时
+不会加载视图代码及其依赖（如 NumPy）。
+"""
+from importlib import import_module
+
+# (模块路径, 蓝图变量名)
+BLUEPRINTS = [
+    ('app.blueprints.users', 'bp'),
+    ('app.blueprints.orders', 'bp'),
+    ('app.blueprints.capacity', 'bp'),
+    ('app.blueprints.schedule', 'bp'),
+]
+
+
+def register_blueprints(app):
+    """导入并注册所有蓝图"""
+    for module_name, attribute in BLUEPRINTS:
+        module = import_module(module_name)
+        app.register_blueprint(getattr(module, attribute))
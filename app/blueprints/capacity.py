@@ -0,0 +1,121 @@
+"""产能蓝图：车间工序和机台管理，以及机台批量更新和换型规则接口"""
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+
+from app.auth import admin_required
+from app.capacity_import import register_capacity_import_routes
+from app.changeover import register_changeover_routes
+from app.extensions import db
+from app.models import Workshop, Process, Equipment
+from app.scheduler import calculate_capacity_per_hour, invalidate_plant_snapshot
+
+bp = Blueprint('capacity', __name__)
+
+
+@bp.route('/capacity_management')
+@admin_required
+def capacity_management(user):
+    """产能管理页面"""
+    workshops = Workshop.query.all()
+    processes = Process.query.all()
+    equipments = Equipment.query.all()
+
+    # 按工序组织设备数据
+    equipment_data = {}
+    for equipment in equipments:
+        if equipment.process_id not in equipment_data:
+            equipment_data[equipment.process_id] = []
+        equipment_data[equipment.process_id].append(equipment)
+
+    return render_template('capacity_management.html', 
+                           workshops=workshops, 
+                           processes=processes, 
+                           equipments=equipments,
+                           equipment_data=equipment_data,
+                           user=user)
+
+
+@bp.route('/add_equipment', methods=['POST'])
+@admin_required
+def add_equipment(user):
+    """添加机台 - 仅管理员"""
+    name = request.form.get('name')
+    process_id = request.form.get('process_id')
+    quantity = request.form.get('quantity')
+    beat = request.form.get('beat')
+    batch_size = request.form.get('batch_size', 1)  # 批次大小，默认为1
+
+    # 计算每小时产能：3600秒/节拍*机台数量*每批次数量
+    capacity_per_hour = calculate_capacity_per_hour(beat, quantity, batch_size)
+
+    equipment = Equipment(
+        name=name,
+        process_id=process_id,
+        quantity=int(quantity),
+        beat=float(beat),
+        batch_size=int(batch_size),
+        capacity_per_hour=capacity_per_hour
+    )
+
+    db.session.add(equipment)
+    db.session.commit()
+    invalidate_plant_snapshot()
+
+    flash('机台添加成功！', 'success')
+    return redirect(url_for('capacity.capacity_management'))
+
+
+@bp.route('/add_process', methods=['POST'])
+@admin_required
+def add_process(user):
+    """添加工序 - 仅管理员"""
+    name = request.form.get('name')
+    workshop_id = request.form.get('workshop_id')
+
+    process = Process(
+        name=name,
+        workshop_id=workshop_id
+    )
+
+    db.session.add(process)
+    db.session.commit()
+    invalidate_plant_snapshot()
+
+    flash('工序添加成功！', 'success')
+    return redirect(url_for('capacity.capacity_management'))
+
+
+@bp.route('/update_equipment/<int:equipment_id>', methods=['POST'])
+@admin_required
+def update_equipment(equipment_id, user):
+    """更新设备信息 - 仅管理员"""
+    equipment = Equipment.query.get_or_404(equipment_id)
+    equipment.name = request.form.get('name')
+    equipment.quantity = int(request.form.get('quantity'))
+    equipment.beat = float(request.form.get('beat'))
+    equipment.batch_size = int(request.form.get('batch_size', 1))  # 更新批次大小
+
+    # 重新计算每小时产能
+    equipment.capacity_per_hour = calculate_capacity_per_hour(
+        equipment.beat, equipment.quantity, equipment.batch_size)
+
+    db.session.commit()
+    invalidate_plant_snapshot()
+    flash('设备信息更新成功！', 'success')
+    return redirect(url_for('capacity.capacity_management'))
+
+
+@bp.route('/delete_equipment/<int:equipment_id>', methods=['POST'])
+@admin_required
+def delete_equipment(equipment_id, user):
+    """删除设备 - 仅管理员"""
+    equipment = Equipment.query.get_or_404(equipment_id)
+    db.session.delete(equipment)
+    db.session.commit()
+    invalidate_plant_snapshot()
+    flash('设备删除成功！', 'success')
+    return redirect(url_for('capacity.capacity_management'))
+
+
+# 机台批量更新和换型规则接口注册到产能蓝图
+register_capacity_import_routes(bp, db)
+register_changeover_routes(bp, db)
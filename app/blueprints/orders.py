@@ -0,0 +1,220 @@
+"""订单蓝图：首页、订单的增删改查、已归档订单查询和车间负载均衡接口"""
+import math
+from datetime import datetime
+
+from flask import Blueprint, abort, render_template, request, redirect, url_for, flash
+
+from app.archive import ArchiveError, find_archived_order, load_archived_order, register_archive_routes
+from app.auth import login_required, admin_required
+from app.extensions import db
+from app.live_updates import capture_cells_for_orders, publish_cell_changes, publish_quietly
+from app.load_balancing import register_load_balancing_routes
+from app.models import Product, Order, OrderProcessSummary, UserRole
+from app.product_master import apply_product_master, get_product_master
+from app.schedule_maintenance import delete_orders
+from app.scheduler import PROCESS_SEQUENCE
+
+bp = Blueprint('orders', __name__)
+
+
+@bp.route('/')
+@login_required
+def index(user):
+    """首页"""
+    return render_template('index.html', user=user)
+
+
+@bp.route('/order_management')
+@login_required
+def order_management(user):
+    """订单管理页面，支持按预计完工时间或交期余量排序，以及只显示延期订单"""
+    sort = request.args.get('sort', '')
+    late_only = request.args.get('late') == '1'
+
+    query = Order.query
+    if late_only:
+        # 排不完的订单也视为延期
+        query = query.filter(db.or_(Order.slack_hours < 0, Order.plan_complete.is_(False)))
+    if sort == 'completion':
+        # 未排产和排不完的订单排在最后
+        query = query.order_by(Order.planned_completion.is_(None), Order.planned_completion)
+    elif sort == 'slack':
+        # 排不完的订单排在最前，未排产的订单排在最后
+        query = query.order_by(db.case((Order.plan_complete.is_(False), 0), else_=1),
+                               Order.slack_hours.is_(None), Order.slack_hours)
+    orders = query.all()
+    return render_template('order_management.html', orders=orders, sort=sort, late_only=late_only, user=user)
+
+
+@bp.route('/order/create', methods=['GET', 'POST'])
+@login_required
+def create_order(user):
+    """创建订单 - 普通用户及以上权限"""
+    # 检查用户权限
+    if user.role != UserRole.ADMIN and user.role != UserRole.USER:
+        flash('权限不足！', 'error')
+        return redirect(url_for('orders.index'))
+
+    if request.method == 'POST':
+        # 获取表单数据
+        customer_name = request.form.get('customer_name', '')
+        product_model = request.form.get('product_model')
+        length = float(request.form.get('length'))
+        width = float(request.form.get('width'))
+        thickness_mm = float(request.form.get('thickness'))  # 用户输入的厚度单位是毫米，直接使用
+        shipping_quantity = int(request.form.get('shipping_quantity'))
+        yield_rate = float(request.form.get('yield_rate'))
+        shipping_date_str = request.form.get('shipping_date')
+        shipping_date = datetime.strptime(shipping_date_str, '%Y-%m-%d')
+        raw_glass_size = request.form.get('raw_glass_size')
+        workshop = request.form.get('workshop')
+        workshop_flexible = request.form.get('workshop_flexible') == '1'
+
+        # 计算投产数量
+        calculated_quantity = math.ceil(shipping_quantity / yield_rate)
+
+        # 按规格查找产品主数据，叠数、切数只在新规格时计算
+        master = get_product_master(db, product_model, length, width, thickness_mm, raw_glass_size)
+
+        # 创建产品 - 直接存储毫米单位
+        product = Product(
+            product_model=product_model,
+            length=length,
+            width=width,
+            thickness=thickness_mm,  # 直接存储为毫米单位
+            shipping_quantity=shipping_quantity,
+            yield_rate=yield_rate,
+            shipping_date=shipping_date,
+            raw_glass_size=raw_glass_size,
+            workshop=workshop,
+            workshop_flexible=workshop_flexible,
+            calculated_quantity=calculated_quantity,
+            nesting_count=master.nesting_count,
+            cutting_count=master.cutting_count,
+            product_master_id=master.id
+        )
+
+        db.session.add(product)
+        db.session.flush()  # 获取ID但不提交
+
+        # 创建订单
+        order = Order(
+            order_number=f"ORDER_{product.id}_{int(datetime.now().timestamp())}",
+            product_id=product.id,
+            product_master_id=master.id,
+            customer_name=customer_name,
+            order_status='pending'
+        )
+
+        db.session.add(order)
+        db.session.commit()
+
+        flash('订单创建成功！', 'success')
+        return redirect(url_for('orders.order_management'))
+
+    return render_template('create_order.html', user=user)
+
+
+@bp.route('/order/<int:order_id>/view')
+@login_required
+def view_order(order_id, user):
+    """查看订单详情，订单已归档时从归档文件读取"""
+    order = Order.query.get(order_id)
+    if order is None:
+        archived = find_archived_order(order_id)
+        if archived is None:
+            abort(404)
+        try:
+            order, process_summaries = load_archived_order(archived)
+        except ArchiveError as e:
+            flash(f'读取归档订单失败：{e}', 'error')
+            return redirect(url_for('orders.order_management'))
+        return render_template('view_order.html', order=order, process_summaries=process_summaries,
+                               archived=archived, user=user)
+    # 各工序排产汇总，按标准流程顺序显示
+    process_summaries = OrderProcessSummary.query.filter_by(order_id=order.id).all()
+    process_summaries.sort(key=lambda s: (
+        PROCESS_SEQUENCE.index(s.process.name) if s.process.name in PROCESS_SEQUENCE else len(PROCESS_SEQUENCE),
+        s.first_start))
+    return render_template('view_order.html', order=order, process_summaries=process_summaries, user=user)
+
+
+@bp.route('/order/<int:order_id>/edit', methods=['GET', 'POST'])
+@admin_required
+def edit_order(order_id, user):
+    """编辑订单 - 仅管理员"""
+    order = Order.query.get_or_404(order_id)
+    if request.method == 'POST':
+        # 更新订单数据
+        product = order.product
+        product.product_model = request.form.get('product_model')
+        product.length = float(request.form.get('length'))
+        product.width = float(request.form.get('width'))
+        thickness_mm = float(request.form.get('thickness'))  # 用户输入的厚度单位是毫米，直接使用
+        product.thickness = thickness_mm  # 直接存储为毫米单位
+        product.shipping_quantity = int(request.form.get('shipping_quantity'))
+        product.yield_rate = float(request.form.get('yield_rate'))
+        shipping_date_str = request.form.get('shipping_date')
+        product.shipping_date = datetime.strptime(shipping_date_str, '%Y-%m-%d')
+        product.raw_glass_size = request.form.get('raw_glass_size')
+        product.workshop = request.form.get('workshop')
+        product.workshop_flexible = request.form.get('workshop_flexible') == '1'
+
+        # 更新订单信息
+        order.customer_name = request.form.get('customer_name', '')
+
+        # 重新计算相关值
+        product.calculated_quantity = math.ceil(product.shipping_quantity / product.yield_rate)
+        # 规格变化后重新关联产品主数据（叠数、切数取自主数据）
+        master = get_product_master(db, product.product_model, product.length, product.width,
+                                    product.thickness, product.raw_glass_size)
+        apply_product_master(product, master, product.orders)
+
+        # 出货日期变化后更新交期余量
+        if order.planned_completion:
+            order.slack_hours = round((product.shipping_date - order.planned_completion).total_seconds() / 3600, 1)
+
+        db.session.commit()
+        flash('订单更新成功！', 'success')
+        return redirect(url_for('orders.order_management'))
+
+    return render_template('edit_order.html', order=order, user=user)
+
+
+@bp.route('/order/<int:order_id>/delete', methods=['POST'])
+@admin_required
+def delete_order(order_id, user):
+    """删除订单 - 仅管理员"""
+    Order.query.get_or_404(order_id)
+
+    # 删除订单、对应产品及其所有排程，并推送排产页面的变化
+    captured = capture_cells_for_orders(db, [order_id])
+    delete_orders(db, [order_id])
+    publish_quietly(db, publish_cell_changes, captured)
+
+    flash('订单删除成功！', 'success')
+    return redirect(url_for('orders.order_management'))
+
+
+@bp.route('/orders/bulk_delete', methods=['POST'])
+@admin_required
+def bulk_delete_orders(user):
+    """批量删除订单 - 仅管理员"""
+    order_ids = request.form.getlist('order_ids', type=int)
+    if not order_ids:
+        flash('请选择要删除的订单！', 'error')
+        return redirect(url_for('orders.order_management'))
+
+    captured = capture_cells_for_orders(db, order_ids)
+    deleted_orders, deleted_schedules = delete_orders(db, order_ids)
+    publish_quietly(db, publish_cell_changes, captured)
+
+    flash(f'已删除 {deleted_orders} 个订单及 {deleted_schedules} 条排程记录！', 'success')
+    return redirect(url_for('orders.order_management'))
+
+
+# 订单车间负载均衡接口注册到订单蓝图
+register_load_balancing_routes(bp, db)
+
+# 已归档订单查询接口
+register_archive_routes(bp, db)
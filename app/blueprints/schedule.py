@@ -0,0 +1,242 @@
+"""排产蓝图：整体排产查看、排程生成与删除，以及排产分析、产能模拟、排程版本、实时更新、实际产量、计划与实际对比、原玻需求、机台派工和排程二进制数据接口"""
+from datetime import datetime
+
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash
+
+from app.actuals import register_actuals_routes
+from app.analytics import register_analytics_routes
+from app.auth import login_required, admin_required
+from app.changeover import get_changeover_model
+from app.dispatch import register_dispatch_routes
+from app.extensions import db
+from app.live_updates import (
+    capture_cells, publish_cell_changes, publish_clear, publish_quietly, publish_reload, latest_event_id,
+    register_live_update_routes, scheduled_workshop_ids
+)
+from app.materials import register_material_routes
+from app.models import Workshop, Order, ProductionSchedule, User, ScheduleVersion
+from app.order_summaries import summarize_rows, write_order_summaries, refresh_order_summaries, scheduled_product_ids
+from app.passwords import verify_password
+from app.rate_limit import get_login_limiter
+from app.sandbox import register_sandbox_routes
+from app.schedule_feed import register_schedule_feed_routes
+from app.schedule_maintenance import (
+    ScheduleCleanupError, chunked_delete_schedules, delete_schedules_for_day, day_range, replace_schedules,
+    truncate_schedules
+)
+from app.schedule_view import build_schedule_view
+from app.scheduler import get_schedule_engine, load_order_snapshot, load_plant_snapshot, run_schedule
+from app.variance import register_variance_routes
+from app.versioning import record_schedule_version, prune_schedule_versions, register_versioning_routes
+
+bp = Blueprint('schedule', __name__)
+
+
+@bp.route('/overall_production_schedule')
+@login_required
+def overall_production_schedule(user):
+    """整体排产查看页面"""
+    # 获取请求参数中的车间过滤条件
+    selected_workshop_name = request.args.get('workshop', 'UTG1车间')  # 默认为UTG1车间
+
+    workshops = Workshop.query.all()
+
+    # 获取当前选中车间的ID
+    selected_workshop = Workshop.query.filter_by(name=selected_workshop_name).first()
+    selected_workshop_id = selected_workshop.id if selected_workshop else None
+
+    # 缩放级别（day/week/month）和当前页的起始日期
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d') if request.args.get('start') else None
+    except ValueError:
+        start = None
+    view = build_schedule_view(db, selected_workshop_id, request.args.get('zoom', 'day'), start)
+
+    # 最近的排程版本，用于对比和恢复
+    schedule_versions = ScheduleVersion.query.order_by(ScheduleVersion.id.desc()).limit(10).all()
+
+    return render_template('overall_production_schedule.html', 
+                           view=view,
+                           last_event_id=latest_event_id(db),
+                           schedule_versions=schedule_versions,
+                           workshops=workshops,
+                           selected_workshop=selected_workshop_name,
+                           selected_workshop_id=selected_workshop_id,
+                           user=user)
+
+
+@bp.route('/delete_schedule_by_workshop', methods=['POST'])
+@admin_required
+def delete_schedule_by_workshop(user):
+    """按车间删除排程 - 仅管理员"""
+    workshop_id = request.form.get('workshop_id')
+
+    if not workshop_id:
+        flash('请选择要删除排程的车间！', 'error')
+        return redirect(url_for('schedule.overall_production_schedule'))
+
+    workshop = Workshop.query.get(workshop_id)
+    if not workshop:
+        flash('无效的车间！', 'error')
+        return redirect(url_for('schedule.overall_production_schedule'))
+
+    # 分批删除指定车间的所有排程数据，只刷新涉及的订单的排产汇总
+    product_ids = scheduled_product_ids(db, ProductionSchedule.workshop_id == workshop.id)
+    deleted_count = chunked_delete_schedules(db, ProductionSchedule.workshop_id == workshop.id)
+    refresh_order_summaries(db, product_ids)
+    publish_quietly(db, publish_clear, workshop.id)
+
+    flash(f'已成功删除 {workshop.name} 的 {deleted_count} 条排程数据！', 'success')
+    return redirect(url_for('schedule.overall_production_schedule'))
+
+
+@bp.route('/generate_schedule', methods=['POST'])
+@admin_required
+def generate_schedule(user):
+    """根据订单和产能信息生成排程计划（流水线式）- 仅管理员"""
+    # 获取所有订单
+    orders = Order.query.all()
+
+    # 读取订单和产能快照，在内存中完成排产计算（正式排产不使用缓存的产能快照）
+    order_snapshot = load_order_snapshot(db)
+    plant = load_plant_snapshot(db)
+    plan_start = datetime.now()
+    rows, plans = run_schedule(order_snapshot, plant, plan_start, get_changeover_model(db), get_schedule_engine())
+
+    # 替换全部排程：不对比单元格，写入后向原有和新排程涉及的车间推送整页刷新
+    affected_workshops = scheduled_workshop_ids(db) | {row['workshop_id'] for row in rows}
+
+    try:
+        # 保存排程版本（为排程行设置版本ID），并按保留策略清理旧版本
+        record_schedule_version(db, rows, created_by=user.username, plan_start=plan_start)
+        prune_schedule_versions(db)
+
+        # 写入订单排产汇总（计划开始、预计完工、交期余量和各工序起止时间），是否排完和完工时间取自排产结果
+        write_order_summaries(db, summarize_rows(rows), plans=plans)
+
+        # 更新所有订单状态为已完成
+        for order in orders:
+            order.order_status = 'completed'
+
+        # 先写入并提交新排程，再分批删除旧排程，写入失败时原有排程不受影响
+        replace_schedules(db, rows)
+    except ScheduleCleanupError:
+        current_app.logger.exception('删除旧排程失败')
+        publish_quietly(db, publish_reload, affected_workshops)
+        flash('新排程已生成，但旧排程没有删除完，排程中可能有重复数据，请重新生成排程！', 'error')
+        return redirect(url_for('schedule.overall_production_schedule'))
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('生成排程失败')
+        flash('生成排程失败，原有排程未改变！', 'error')
+        return redirect(url_for('schedule.overall_production_schedule'))
+
+    publish_quietly(db, publish_reload, affected_workshops)
+    flash('排程计划生成成功！', 'success')
+    return redirect(url_for('schedule.overall_production_schedule'))
+
+
+@bp.route('/delete_schedule_by_date/<date>', methods=['POST'])
+@admin_required
+def delete_schedule_by_date(date, user):
+    """根据日期删除排程 - 仅管理员"""
+    try:
+        # 受影响的是当天有排程的车间，当天及之后的累积已投都会变化
+        start, end = day_range(date)
+        day_criteria = [ProductionSchedule.schedule_date >= start, ProductionSchedule.schedule_date < end]
+        workshop_ids = [w for (w,) in db.session.query(ProductionSchedule.workshop_id).filter(
+            *day_criteria).distinct().all()]
+        product_ids = scheduled_product_ids(db, *day_criteria)
+        captured = capture_cells(db, workshop_ids, since=start)
+
+        # 按日期范围分批删除指定日期的排程
+        delete_schedules_for_day(db, date)
+        refresh_order_summaries(db, product_ids)
+        publish_quietly(db, publish_cell_changes, captured)
+        flash(f'{date} 的排程数据已删除！', 'success')
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('按日期删除排程失败：%s', date)
+        flash('删除排程数据失败！', 'error')
+
+    return redirect(url_for('schedule.overall_production_schedule'))
+
+
+@bp.route('/delete_schedule_by_process', methods=['POST'])
+@admin_required
+def delete_schedule_by_process(user):
+    """根据工序和日期删除排程 - 仅管理员"""
+    date_str = request.form.get('date')
+    process_id = request.form.get('process_id')
+    workshop_id = request.form.get('workshop_id')
+
+    try:
+        start, end = day_range(date_str)
+        captured = capture_cells(db, [int(workshop_id)], since=start)
+        product_ids = scheduled_product_ids(
+            db, ProductionSchedule.schedule_date >= start, ProductionSchedule.schedule_date < end,
+            ProductionSchedule.workshop_id == int(workshop_id), ProductionSchedule.process_id == int(process_id))
+
+        # 删除指定日期、工序和车间的排程
+        delete_schedules_for_day(db, date_str, workshop_id=int(workshop_id), process_id=int(process_id))
+        refresh_order_summaries(db, product_ids)
+        publish_quietly(db, publish_cell_changes, captured)
+        flash(f'{date_str} 的排程数据已删除！', 'success')
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('按工序删除排程失败：%s 工序 %s', date_str, process_id)
+        flash('删除排程数据失败！', 'error')
+
+    return redirect(url_for('schedule.overall_production_schedule'))
+
+
+@bp.route('/delete_all_schedules', methods=['POST'])
+@admin_required
+def delete_all_schedules(user):
+    """删除所有排程 - 仅管理员，需要密码确认"""
+
+    password = request.form.get('password')
+
+    # 验证密码
+    if not password:
+        flash('请输入管理员密码！', 'error')
+        return redirect(url_for('schedule.overall_production_schedule'))
+
+    # 获取当前登录用户（管理员）并验证密码（与登录共用限流）
+    current_user = User.query.get(user.id)
+    if get_login_limiter().hit(ip=request.remote_addr, user=current_user.username):
+        flash('尝试过于频繁，请稍后再试！', 'error')
+        return redirect(url_for('schedule.overall_production_schedule'))
+    if not verify_password(current_user, password):
+        flash('密码错误！', 'error')
+        return redirect(url_for('schedule.overall_production_schedule'))
+
+    # 删除所有排程记录
+    try:
+        product_ids = scheduled_product_ids(db)
+        deleted_count = truncate_schedules(db)
+        refresh_order_summaries(db, product_ids)
+        publish_quietly(db, publish_clear)
+        if deleted_count is None:
+            flash('已清空所有排程记录！', 'success')
+        else:
+            flash(f'成功删除 {deleted_count} 条排程记录！', 'success')
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('删除全部排程失败')
+        flash('删除排程记录失败！', 'error')
+
+    return redirect(url_for('schedule.overall_production_schedule'))
+
+
+
+# 排产分析、产能模拟、排程版本、实时更新、实际产量、计划与实际对比、原玻需求、机台派工和排程二进制数据接口注册到排产蓝图
+register_analytics_routes(bp, db)
+register_sandbox_routes(bp, db)
+register_versioning_routes(bp, db)
+register_live_update_routes(bp, db)
+register_actuals_routes(bp, db)
+register_variance_routes(bp, db)
+register_material_routes(bp, db)
+register_dispatch_routes(bp, db)
+register_schedule_feed_routes(bp, db)
@@ -0,0 +1,165 @@
+"""用户蓝图：登录、登出、修改密码和用户管理"""
+import math
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, make_response
+
+from app.auth import login_required, admin_required
+from app.extensions import db
+from app.models import User, UserRole
+from app.passwords import hash_password, verify_password
+from app.rate_limit import get_login_limiter
+
+bp = Blueprint('users', __name__)
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    """用户登录"""
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+
+        # 按来源 IP 和用户名限流，被限流的请求不做密码验证
+        limiter = get_login_limiter()
+        retry_after = limiter.hit(ip=request.remote_addr, user=username)
+        if retry_after:
+            wait = math.ceil(min(retry_after, 3600))
+            flash(f'登录尝试过于频繁，请 {wait} 秒后再试！', 'error')
+            response = make_response(render_template('login.html'), 429)
+            response.headers['Retry-After'] = str(wait)
+            return response
+
+        user = User.query.filter_by(username=username).first()
+
+        if user and verify_password(user, password, rehash=True):
+            # 哈希参数与当前配置不一致时已按新参数重新哈希
+            db.session.commit()
+            limiter.reset('user', username)
+            # 登录成功，设置session信息
+            response = make_response(redirect(url_for('orders.index')))
+            response.set_cookie('user_id', str(user.id))
+            return response
+        else:
+            flash('用户名或密码错误！', 'error')
+
+    return render_template('login.html')
+
+
+@bp.route('/logout')
+def logout():
+    """用户登出"""
+    response = make_response(redirect(url_for('users.login')))
+    response.set_cookie('user_id', '', expires=0)
+    flash('已成功退出登录！', 'success')
+    return response
+
+
+@bp.route('/user_management')
+@admin_required
+def user_management(user):
+    """用户管理页面 - 仅管理员"""
+    users = User.query.all()
+    return render_template('user_management.html', users=users, user=user)
+
+
+@bp.route('/add_user', methods=['POST'])
+@admin_required
+def add_user(user):
+    """添加用户 - 仅管理员"""
+
+    username = request.form.get('username')
+    password = request.form.get('password')
+    role = request.form.get('role', 'USER')  # 默认为普通用户
+
+    # 检查用户名是否已存在
+    existing_user = User.query.filter_by(username=username).first()
+    if existing_user:
+        flash('用户名已存在，请选择其他用户名！', 'error')
+        return redirect(url_for('users.user_management'))
+
+    # 创建新用户
+    new_user = User(
+        username=username,
+        password=hash_password(password),  # 使用哈希存储密码
+        role=UserRole[role] if role in ['ADMIN', 'USER'] else UserRole.USER
+    )
+
+    db.session.add(new_user)
+    db.session.commit()
+
+    flash(f'用户 {username} 已成功添加！', 'success')
+    return redirect(url_for('users.user_management'))
+
+
+@bp.route('/update_user/<int:user_id>', methods=['POST'])
+@admin_required
+def update_user(user, user_id):
+    """更新用户权限 - 仅管理员"""
+
+    target_user = User.query.get_or_404(user_id)
+
+    # 更新用户角色
+    new_role = request.form.get('role')
+    if new_role in ['ADMIN', 'USER']:
+        target_user.role = UserRole[new_role]
+
+    # 更新密码（如果提供了新密码）
+    new_password = request.form.get('password')
+    if new_password:
+        target_user.password = hash_password(new_password)
+
+    db.session.commit()
+    flash(f'用户 {target_user.username} 的信息已更新！', 'success')
+    return redirect(url_for('users.user_management'))
+
+
+@bp.route('/delete_user/<int:user_id>', methods=['POST'])
+@admin_required
+def delete_user(user, user_id):
+    """删除用户 - 仅管理员"""
+
+    target_user = User.query.get_or_404(user_id)
+
+    # 防止管理员删除自己
+    if target_user.id == user.id:
+        flash('您不能删除自己的账户！', 'error')
+        return redirect(url_for('users.user_management'))
+
+    db.session.delete(target_user)
+    db.session.commit()
+
+    flash(f'用户 {target_user.username} 已被删除！', 'success')
+    return redirect(url_for('users.user_management'))
+
+
+@bp.route('/change_password', methods=['GET', 'POST'])
+@login_required
+def change_password(user=None):
+    """更改密码功能"""
+
+    if request.method == 'POST':
+        old_password = request.form.get('old_password')
+        new_password = request.form.get('new_password')
+        confirm_password = request.form.get('confirm_password')
+
+        # 验证旧密码（与登录共用限流）
+        if get_login_limiter().hit(ip=request.remote_addr, user=user.username):
+            flash('尝试过于频繁，请稍后再试！', 'error')
+            return redirect(url_for('users.change_password'))
+        if not verify_password(user, old_password):
+            flash('旧密码不正确！', 'error')
+            return redirect(url_for('users.change_password'))
+
+        # 验证新密码和确认密码是否一致
+        if new_password != confirm_password:
+            flash('新密码与确认密码不匹配！', 'error')
+            return redirect(url_for('users.change_password'))
+
+        # 更新密码
+        user.password = hash_password(new_password)
+        db.session.commit()
+
+        flash('密码已成功更新，请使用新密码重新登录！', 'success')
+        return redirect(url_for('users.logout'))  # 更改密码后自动退出登录
+
+    return render_template('change_password.html', user=user)
@@ -0,0 +1,254 @@
+"""机台批量更新与导入
+
+产能管理页面只能逐台添加、修改机台，每次在 Python 中计算 capacity_per_hour 并提交。
+工艺变更后整个车间的节拍需要更新时，这里在一个请求、一个事务内完成：
+
+1. 先校验全部行，任何一行有误都不做修改
+2. 一次查询解析工序和机台，新增、修改、删除分别用一条 executemany 语句写入
+3. 用一条 UPDATE 在数据库中按节拍、台数、每批数量重新计算受影响工序的全部机台产能
+4. 按工序分组对比修改前后的产能合计，返回各工序的产能变化
+
+每行可以用机台 ID 指定机台，也可以用 车间名 + 工序名 + 机台名称 指定（不存在时新增），
+便于直接导入从表格导出的 CSV。
+"""
+import csv
+import io
+import math
+
+from flask import jsonify, request
+from sqlalchemy import case, delete, func, insert, or_, tuple_, update
+
+from app.auth import admin_required
+from app.scheduler import invalidate_plant_snapshot
+
+EDITABLE_FIELDS = ('name', 'quantity', 'beat', 'batch_size')
+
+# 单次请求最多的行数
+MAX_ROWS = 5000
+
+
+def _parse_rows():
+    """读取请求中的行：JSON 列表（或 {'rows': [...]}），或带表头的 CSV（Content-Type: text/csv）"""
+    if request.mimetype == 'text/csv':
+        text = request.get_data(as_text=True).lstrip('\ufeff')
+        return list(csv.DictReader(io.StringIO(text)))
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        payload = payload.get('rows')
+    if not isinstance(payload, list):
+        raise ValueError('请求体应为机台列表')
+    return payload
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _clean_row(number, row):
+    """校验一行并转换字段类型，返回 (定位信息, 修改的字段, 是否删除)"""
+    if not isinstance(row, dict):
+        raise ValueError(f'第 {number} 行格式错误')
+    fields = {}
+    try:
+        if not _blank(row.get('name')):
+            fields['name'] = str(row['name']).strip()
+        if not _blank(row.get('quantity')):
+            fields['quantity'] = int(row['quantity'])
+        if not _blank(row.get('beat')):
+            fields['beat'] = float(row['beat'])
+            if not math.isfinite(fields['beat']):
+                raise ValueError
+        if not _blank(row.get('batch_size')):
+            fields['batch_size'] = int(row['batch_size'])
+        equipment_id = None if _blank(row.get('id')) else int(row['id'])
+        process_id = None if _blank(row.get('process_id')) else int(row['process_id'])
+    except (TypeError, ValueError):
+        raise ValueError(f'第 {number} 行数值格式错误')
+    if fields.get('quantity', 1) < 1 or fields.get('batch_size', 1) < 1:
+        raise ValueError(f'第 {number} 行机台数量和每批次数量应为正整数')
+    if fields.get('beat', 1) <= 0:
+        raise ValueError(f'第 {number} 行节拍应大于 0')
+
+    target = {
+        'id': equipment_id,
+        'process_id': process_id,
+        'workshop': str(row.get('workshop') or '').strip(),
+        'process': str(row.get('process') or '').strip(),
+    }
+    if equipment_id is None and process_id is None and not (target['workshop'] and target['process']):
+        raise ValueError(f'第 {number} 行需要指定机台 ID、工序 ID 或 车间+工序')
+    deleting = str(row.get('delete') or '').strip().lower() in ('1', 'true', 'yes', 'y', '是')
+    return target, fields, deleting
+
+
+def _capacity_by_process(db, process_ids):
+    """各工序的机台产能合计"""
+    from app.models import Equipment
+
+    if not process_ids:
+        return {}
+    return {process_id: float(total or 0) for process_id, total in db.session.query(
+        Equipment.process_id, func.sum(Equipment.capacity_per_hour)
+    ).filter(Equipment.process_id.in_(process_ids)).group_by(Equipment.process_id).all()}
+
+
+def recompute_capacity(db, process_ids):
+    """在数据库中重新计算这些工序全部机台的每小时产能（与 calculate_capacity_per_hour 一致）"""
+    from app.models import Equipment
+
+    return db.session.execute(
+        update(Equipment).where(Equipment.process_id.in_(process_ids)).values(
+            capacity_per_hour=case(
+                (Equipment.beat > 0, 3600.0 / Equipment.beat * Equipment.quantity * Equipment.batch_size),
+                else_=0.0,
+            )
+        ).execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def apply_equipment_rows(db, rows):
+    """在当前事务中应用批量修改（不提交），返回统计和各工序产能变化"""
+    from app.models import Equipment, Process, Workshop
+
+    if len(rows) > MAX_ROWS:
+        raise ValueError(f'单次最多 {MAX_ROWS} 行')
+    cleaned = [_clean_row(number, row) for number, row in enumerate(rows, 1)]
+
+    # 按 车间名+工序名 解析工序
+    names = {(t['workshop'], t['process']) for t, _, _ in cleaned if t['workshop'] and t['process']}
+    processes_by_name = {}
+    if names:
+        for process_id, workshop_name, process_name in db.session.query(
+            Process.id, Workshop.name, Process.name
+        ).join(Workshop, Workshop.id == Process.workshop_id).filter(
+            tuple_(Workshop.name, Process.name).in_(list(names))
+        ).order_by(Process.id).all():
+            processes_by_name.setdefault((workshop_name, process_name), process_id)
+
+    for number, (target, _, _) in enumerate(cleaned, 1):
+        if target['id'] is None and target['process_id'] is None:
+            target['process_id'] = processes_by_name.get((target['workshop'], target['process']))
+            if target['process_id'] is None:
+                raise ValueError(f"第 {number} 行工序不存在：{target['workshop']} {target['process']}")
+
+    # 一次查询读取涉及的机台：按 ID，以及按 工序+名称
+    ids = {t['id'] for t, _, _ in cleaned if t['id'] is not None}
+    named = {(t['process_id'], f['name']) for t, f, _ in cleaned if t['id'] is None and 'name' in f}
+    known_process_ids = {t['process_id'] for t, _, _ in cleaned if t['process_id'] is not None}
+    conditions = []
+    if ids:
+        conditions.append(Equipment.id.in_(ids))
+    if named:
+        conditions.append(tuple_(Equipment.process_id, Equipment.name).in_(list(named)))
+    existing = db.session.query(Equipment.id, Equipment.process_id, Equipment.name).filter(
+        or_(*conditions)).all() if conditions else []
+    by_id = {e.id: e for e in existing}
+    by_name = {}
+    for e in existing:
+        by_name.setdefault((e.process_id, e.name), e)
+    valid_process_ids = {pid for (pid,) in db.session.query(Process.id).filter(
+        Process.id.in_(known_process_ids)).all()} if known_process_ids else set()
+
+    updates, creates, deletes = {}, [], set()
+    affected = set()
+    for number, (target, fields, deleting) in enumerate(cleaned, 1):
+        if target['id'] is not None:
+            equipment = by_id.get(target['id'])
+            if equipment is None:
+                raise ValueError(f"第 {number} 行机台不存在：{target['id']}")
+        else:
+            if target['process_id'] not in valid_process_ids:
+                raise ValueError(f"第 {number} 行工序不存在：{target['process_id']}")
+            equipment = by_name.get((target['process_id'], fields.get('name')))
+            if equipment is not None:
+                # 名称用于定位，不作为修改
+                fields = {k: v for k, v in fields.items() if k != 'name'}
+
+        if equipment is not None:
+            affected.add(equipment.process_id)
+            if deleting:
+                deletes.add(equipment.id)
+            elif fields:
+                updates.setdefault(equipment.id, {'id': equipment.id}).update(fields)
+            continue
+        if deleting:
+            raise ValueError(f'第 {number} 行要删除的机台不存在')
+        missing = [field for field in EDITABLE_FIELDS if field not in fields and field != 'batch_size']
+        if missing:
+            raise ValueError(f"第 {number} 行新增机台缺少字段：{'、'.join(missing)}")
+        creates.append({'process_id': target['process_id'], 'batch_size': 1, **fields, 'capacity_per_hour': 0})
+        affected.add(target['process_id'])
+
+    before = _capacity_by_process(db, affected)
+
+    # 按主键批量更新（bulk_update_mappings 按修改的字段分组为 executemany）
+    for id_ in deletes:
+        updates.pop(id_, None)
+    if updates:
+        db.session.bulk_update_mappings(Equipment, list(updates.values()))
+    if creates:
+        # executemany 按字段分组（同一语句中各行字段需一致）
+        create_groups = {}
+        for params in creates:
+            create_groups.setdefault(tuple(sorted(params)), []).append(params)
+        for params in create_groups.values():
+            db.session.execute(insert(Equipment), params)
+    if deletes:
+        db.session.execute(delete(Equipment).where(Equipment.id.in_(deletes))
+                           .execution_options(synchronize_session=False))
+
+    recomputed = recompute_capacity(db, affected) if affected else 0
+    after = _capacity_by_process(db, affected)
+
+    names_by_id = {}
+    if affected:
+        for process_id, process_name, workshop_name in db.session.query(
+            Process.id, Process.name, Workshop.name
+        ).join(Workshop, Workshop.id == Process.workshop_id).filter(Process.id.in_(affected)).all():
+            names_by_id[process_id] = (workshop_name, process_name)
+
+    deltas = []
+    for process_id in sorted(affected):
+        workshop_name, process_name = names_by_id.get(process_id, ('', ''))
+        old, new = before.get(process_id, 0.0), after.get(process_id, 0.0)
+        deltas.append({
+            'process_id': process_id,
+            'workshop': workshop_name,
+            'process': process_name,
+            'capacity_before': round(old, 2),
+            'capacity_after': round(new, 2),
+            'delta': round(new - old, 2),
+        })
+    return {
+        'updated': len(updates),
+        'created': len(creates),
+        'deleted': len(deletes),
+        'recomputed': recomputed,
+        'processes': deltas,
+    }
+
+
+def register_capacity_import_routes(app, db):
+
+    @app.route('/api/equipments/bulk', methods=['POST'])
+    @admin_required
+    def bulk_update_equipments(user):
+        """批量新增、修改、删除机台（JSON 或 CSV），一个事务内完成；?dry_run=1 只返回产能变化不保存 - 仅管理员
+
+        每行字段：id 或 process_id 或 workshop+process 定位机台，name、quantity、beat、batch_size
+        为要修改的值（新增机台时 name、quantity、beat 必填），delete=1 表示删除。
+        """
+        try:
+            result = apply_equipment_rows(db, _parse_rows())
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+
+        if request.args.get('dry_run') in ('1', 'true'):
+            db.session.rollback()
+            result['dry_run'] = True
+            return jsonify(result)
+
+        db.session.commit()
+        invalidate_plant_snapshot()
+        return jsonify(result)
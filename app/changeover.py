@@ -0,0 +1,279 @@
+"""换型时间与订单排序
+
+产线从一种产品切换到另一种产品需要准备时间（切割、钢化尤其明显），原排产假设换型时间为 0，
+小订单多时计划明显偏乐观。这里提供：
+
+- 换型矩阵：每个工序一组规则，按产品型号对或规格类别对（"厚度/原玻尺寸"）给出换型分钟数，
+  匹配优先级为 型号对 > 规格类别对 > 含 * 的型号规则 > 含 * 的规格类别规则；型号和规格都相同时为 0。
+  只对作业中出现的不同 (型号, 规格类别) 查表，再按下标展开为 (作业, 作业) 矩阵
+- 排序：车间内订单按各工序换型时间之和排序，先用最近邻构造初始顺序，再在时间预算内做 2-opt
+  （换型时间不对称，翻转片段的代价用正反两个方向的前缀和 O(1) 计算，每个起点对所有终点一次向量化求值）
+- 排产：启用 SCHEDULE_CHANGEOVERS 后，run_schedule 按排好的顺序在各工序上依次生产，
+  每个订单在某工序上开工前先扣除换型时间，损失的工时直接推迟后续订单
+"""
+import math
+import time
+
+import numpy as np
+from flask import current_app, jsonify, request
+
+from app.auth import admin_required, login_required
+
+MATCH_TYPES = ('model', 'class')
+
+WILDCARD = '*'
+
+
+def spec_class(thickness, raw_glass_size):
+    """规格类别："厚度/原玻尺寸"，如 0.1/500x400"""
+    if thickness is None:
+        return raw_glass_size or ''
+    return f'{float(thickness):g}/{raw_glass_size or ""}'
+
+
+def load_changeover_rules(db):
+    """读取换型规则，返回 {工序名: {(match_by, 切换前, 切换后): 分钟}}"""
+    from app.models import ChangeoverRule
+
+    rules = {}
+    for rule in db.session.query(
+        ChangeoverRule.process_name, ChangeoverRule.match_by,
+        ChangeoverRule.from_value, ChangeoverRule.to_value, ChangeoverRule.minutes
+    ).all():
+        rules.setdefault(rule.process_name, {})[(rule.match_by, rule.from_value, rule.to_value)] = float(rule.minutes)
+    return rules
+
+
+def _lookup(process_rules, source, target):
+    """两个作业键 (型号, 规格类别) 之间的换型分钟数"""
+    if source == target:
+        return 0.0
+    (from_model, from_class), (to_model, to_class) = source, target
+    candidates = []
+    if from_model != to_model:
+        candidates.append(('model', from_model, to_model))
+    if from_class != to_class:
+        candidates.append(('class', from_class, to_class))
+    for match_by, from_value, to_value in candidates:
+        minutes = process_rules.get((match_by, from_value, to_value))
+        if minutes is not None:
+            return minutes
+    for match_by, from_value, to_value in candidates:
+        for key in ((match_by, from_value, WILDCARD), (match_by, WILDCARD, to_value), (match_by, WILDCARD, WILDCARD)):
+            minutes = process_rules.get(key)
+            if minutes is not None:
+                return minutes
+    return 0.0
+
+
+def job_key(order):
+    return (order['product_model'], spec_class(order.get('thickness'), order.get('raw_glass_size')))
+
+
+class ChangeoverModel:
+    """换型矩阵和订单排序
+
+    rules: load_changeover_rules 的结果；time_budget: 每个车间 2-opt 改进的最长秒数。
+    """
+
+    def __init__(self, rules, time_budget=1.0):
+        self.rules = rules
+        self.time_budget = time_budget
+
+    def matrices(self, process_names, jobs):
+        """各工序的 (作业, 作业) 换型分钟数矩阵，jobs 为作业键列表；没有规则的工序不返回"""
+        keys = sorted(set(jobs))
+        index = {key: i for i, key in enumerate(keys)}
+        codes = np.fromiter((index[key] for key in jobs), dtype=np.int64, count=len(jobs))
+        result = {}
+        for name in process_names:
+            process_rules = self.rules.get(name)
+            if not process_rules:
+                continue
+            table = np.array([[_lookup(process_rules, a, b) for b in keys] for a in keys], dtype=np.float64)
+            result[name] = table[np.ix_(codes, codes)]
+        return result
+
+    def order(self, cost):
+        """按 (作业, 作业) 换型时间矩阵求作业顺序：最近邻 + 2-opt"""
+        return improve_sequence(cost, nearest_neighbor(cost), self.time_budget)
+
+    def sequence(self, orders, processes):
+        """对同一车间的订单排序，返回 (排序后的订单, 每个订单在各工序上的换型分钟数列表)
+
+        第一个订单没有换型时间；没有换型规则时保持原顺序。
+        """
+        names = [p['name'] for p in processes]
+        matrices = self.matrices(names, [job_key(order) for order in orders])
+        if not matrices or len(orders) < 2:
+            return list(orders), [[0.0] * len(processes) for _ in orders]
+
+        order = self.order(sum(matrices.values()))
+        setups = []
+        for position, job in enumerate(order):
+            previous = order[position - 1] if position else None
+            setups.append([float(matrices[name][previous, job]) if previous is not None and name in matrices else 0.0
+                           for name in names])
+        return [orders[i] for i in order], setups
+
+
+def get_changeover_model(db):
+    """按配置返回换型模型：未启用 SCHEDULE_CHANGEOVERS 时返回 None（订单独立排产）"""
+    if not current_app.config.get('SCHEDULE_CHANGEOVERS'):
+        return None
+    return ChangeoverModel(load_changeover_rules(db), current_app.config.get('CHANGEOVER_TIME_BUDGET', 1.0))
+
+
+def path_cost(cost, order):
+    order = np.asarray(order)
+    return float(cost[order[:-1], order[1:]].sum()) if len(order) > 1 else 0.0
+
+
+def nearest_neighbor(cost, start=0):
+    """最近邻构造初始顺序：从 start 出发，每次选择换型时间最短的未排作业（相同时取原顺序靠前的）"""
+    n = len(cost)
+    visited = np.zeros(n, dtype=bool)
+    order = [start]
+    visited[start] = True
+    current = start
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, cost[current])
+        current = int(np.argmin(row))
+        visited[current] = True
+        order.append(current)
+    return order
+
+
+def improve_sequence(cost, order, time_budget=1.0):
+    """2-opt 改进（开放路径，首尾不相连），直到没有改进或超出时间预算"""
+    deadline = time.perf_counter() + time_budget
+    p = np.asarray(order, dtype=np.int64)
+    n = len(p)
+    if n < 3:
+        return p.tolist()
+
+    def prefix_sums():
+        # forward[k]、backward[k]：前 k 条边正向、反向的累计换型时间
+        return (np.concatenate(([0.0], np.cumsum(cost[p[:-1], p[1:]]))),
+                np.concatenate(([0.0], np.cumsum(cost[p[1:], p[:-1]]))))
+
+    forward, backward = prefix_sums()
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(n - 1):
+            j = np.arange(i + 1, n)
+            # 翻转片段 [i, j] 后内部各边方向相反
+            delta = (backward[j] - backward[i]) - (forward[j] - forward[i])
+            if i > 0:
+                delta += cost[p[i - 1], p[j]] - cost[p[i - 1], p[i]]
+            right = p[np.minimum(j + 1, n - 1)]
+            delta += np.where(j < n - 1, cost[p[i], right] - cost[p[j], right], 0.0)
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                end = i + 1 + best
+                p[i:end + 1] = p[i:end + 1][::-1].copy()
+                forward, backward = prefix_sums()
+                improved = True
+            if time.perf_counter() >= deadline:
+                break
+    return p.tolist()
+
+
+def _parse_rule(item):
+    process_name = str(item.get('process_name') or '').strip()
+    match_by = item.get('match_by', 'model')
+    from_value = str(item.get('from_value') or '').strip()
+    to_value = str(item.get('to_value') or '').strip()
+    if not process_name or not from_value or not to_value:
+        raise ValueError('工序、切换前和切换后不能为空')
+    if match_by not in MATCH_TYPES:
+        raise ValueError(f"匹配方式只能是：{'、'.join(MATCH_TYPES)}")
+    minutes = float(item.get('minutes'))
+    if not math.isfinite(minutes) or minutes < 0:
+        raise ValueError('换型时间应为非负数')
+    return process_name, match_by, from_value, to_value, minutes
+
+
+def register_changeover_routes(app, db):
+
+    @app.route('/api/changeovers')
+    @login_required
+    def list_changeovers(user):
+        """换型规则列表"""
+        from app.models import ChangeoverRule
+
+        rules = ChangeoverRule.query.order_by(ChangeoverRule.process_name, ChangeoverRule.id).all()
+        return jsonify([{
+            'id': rule.id,
+            'process_name': rule.process_name,
+            'match_by': rule.match_by,
+            'from_value': rule.from_value,
+            'to_value': rule.to_value,
+            'minutes': rule.minutes,
+        } for rule in rules])
+
+    @app.route('/api/changeovers', methods=['POST'])
+    @admin_required
+    def save_changeovers(user):
+        """新增或更新换型规则（JSON 列表，按 工序+匹配方式+切换前+切换后 覆盖）- 仅管理员"""
+        from app.models import ChangeoverRule
+
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, list):
+            return jsonify({'error': '请求体应为换型规则列表'}), 400
+        try:
+            parsed = [_parse_rule(item) for item in payload]
+        except (TypeError, ValueError, AttributeError) as e:
+            return jsonify({'error': f'换型规则参数错误：{e}'}), 400
+
+        existing = {(r.process_name, r.match_by, r.from_value, r.to_value): r for r in ChangeoverRule.query.all()}
+        for process_name, match_by, from_value, to_value, minutes in parsed:
+            rule = existing.get((process_name, match_by, from_value, to_value))
+            if rule is None:
+                rule = existing[(process_name, match_by, from_value, to_value)] = ChangeoverRule(
+                    process_name=process_name, match_by=match_by, from_value=from_value, to_value=to_value)
+                db.session.add(rule)
+            rule.minutes = minutes
+        db.session.commit()
+        return jsonify({'saved': len(parsed)})
+
+    @app.route('/api/changeovers/sequence')
+    @login_required
+    def preview_sequence(user):
+        """换型排序预览：?workshop=车间名，比较原顺序与排序后的换型时间（不修改排程）"""
+        from app.scheduler import get_plant_snapshot, load_order_snapshot
+
+        workshop_name = request.args.get('workshop', '')
+        workshop = get_plant_snapshot(db).get(workshop_name)
+        if workshop is None:
+            return jsonify({'error': '车间不存在'}), 404
+        orders = [o for o in load_order_snapshot(db) if o['workshop'] == workshop_name]
+        model = get_changeover_model(db) or ChangeoverModel(
+            load_changeover_rules(db), current_app.config.get('CHANGEOVER_TIME_BUDGET', 1.0))
+        db.session.rollback()
+
+        started = time.perf_counter()
+        sequenced, setups = model.sequence(orders, workshop['processes'])
+        elapsed = time.perf_counter() - started
+        baseline = model.matrices([p['name'] for p in workshop['processes']], [job_key(o) for o in orders])
+        baseline_minutes = sum(path_cost(matrix, range(len(orders))) for matrix in baseline.values())
+        return jsonify({
+            'workshop': workshop_name,
+            'orders': [{'order_number': o['order_number'], 'product_model': o['product_model'],
+                        'setup_minutes': round(sum(setup), 1)} for o, setup in zip(sequenced, setups)],
+            'baseline_setup_minutes': round(baseline_minutes, 1),
+            'setup_minutes': round(sum(sum(setup) for setup in setups), 1),
+            'elapsed_ms': round(elapsed * 1000, 1),
+        })
+
+    @app.route('/api/changeovers/<int:rule_id>', methods=['DELETE'])
+    @admin_required
+    def delete_changeover(rule_id, user):
+        """删除换型规则 - 仅管理员"""
+        from app.models import ChangeoverRule
+
+        rule = ChangeoverRule.query.get_or_404(rule_id)
+        db.session.delete(rule)
+        db.session.commit()
+        return jsonify({'deleted': rule_id})
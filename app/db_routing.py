@@ -0,0 +1,108 @@
+"""读写分离
+
+配置 DATABASE_REPLICA_URL 后，只读请求（GET、HEAD）的查询发往只读副本（绑定名 replica），
+其余请求和所有写入发往主库，生成排程写入大量数据时，排产页面、分析和导出等查询不再与其争用主库。
+
+- 路由在会话的 get_bind 中完成：只有 SELECT 语句可能发往副本；flush、批量写入、
+  INSERT/UPDATE/DELETE 和文本 SQL 一律发往主库，一旦本次请求写过数据，之后的查询也改为读主库
+- 读己之写：某个用户的请求写入数据后，DB_READ_YOUR_WRITES_SECONDS 秒内该用户（按会话 Cookie）
+  的只读请求仍读主库，避免刚提交的修改因副本延迟而“消失”
+- 本地测试可以用两个 SQLite 文件代替主库和副本，用 flask replica sync 把主库复制到副本
+"""
+import sqlite3
+import time
+
+import click
+from flask import g, has_request_context, request, session
+from flask.cli import AppGroup
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select
+
+REPLICA_BIND = 'replica'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# 会话 Cookie 中记录读主库截止时间的键
+PRIMARY_UNTIL_KEY = '_db_primary_until'
+
+
+class RoutingSession(Session):
+    """按请求类型在主库和只读副本之间选择连接的会话"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and REPLICA_BIND in self._db.engines:
+            if self._flushing or (clause is not None and not isinstance(clause, Select)):
+                # 写入（以及无法判断是否写入的文本 SQL）发往主库，本次请求之后的查询也读主库
+                self.info['wrote'] = True
+            elif (isinstance(clause, Select) and not self.info.get('wrote')
+                  and has_request_context() and g.get('db_use_replica')):
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_enabled(app):
+    return REPLICA_BIND in (app.config.get('SQLALCHEMY_BINDS') or {})
+
+
+def init_db_routing(app, db):
+    """注册按请求选择主库或副本的钩子（未配置副本时不做任何事）"""
+    if not replica_enabled(app):
+        return
+
+    window = app.config.get('DB_READ_YOUR_WRITES_SECONDS', 5)
+
+    @app.before_request
+    def choose_database():
+        g.db_use_replica = (request.method in SAFE_METHODS
+                            and time.time() >= session.get(PRIMARY_UNTIL_KEY, 0))
+
+    @app.after_request
+    def remember_writes(response):
+        wrote = db.session().info.get('wrote') or request.method not in SAFE_METHODS
+        if wrote and window > 0:
+            session[PRIMARY_UNTIL_KEY] = time.time() + window
+        return response
+
+
+def _sqlite_path(engine):
+    if engine.dialect.name != 'sqlite' or not engine.url.database or engine.url.database == ':memory:':
+        return None
+    return engine.url.database
+
+
+# 命令行：flask replica ...
+replica_cli = AppGroup('replica', help='只读副本（读写分离）')
+
+
+@replica_cli.command('status')
+def status_command():
+    """显示主库和副本的连接地址"""
+    from app.extensions import db
+
+    for key, engine in db.engines.items():
+        click.echo(f"{key or 'primary'}: {engine.url.render_as_string(hide_password=True)}")
+    if REPLICA_BIND not in db.engines:
+        click.echo('未配置 DATABASE_REPLICA_URL，所有查询使用主库。')
+
+
+@replica_cli.command('sync')
+def sync_command():
+    """将主库复制到副本（仅用于本地两个 SQLite 文件模拟主从，生产环境由数据库复制完成）"""
+    from app.extensions import db
+
+    if REPLICA_BIND not in db.engines:
+        raise click.ClickException('未配置 DATABASE_REPLICA_URL')
+    primary, replica = _sqlite_path(db.engine), _sqlite_path(db.engines[REPLICA_BIND])
+    if not primary or not replica:
+        raise click.ClickException('只支持主库和副本均为 SQLite 文件的本地环境')
+
+    db.session.remove()
+    source = sqlite3.connect(primary)
+    target = sqlite3.connect(replica)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    db.engines[REPLICA_BIND].dispose()
+    click.echo(f'已将 {primary} 复制到 {replica}')
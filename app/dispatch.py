@@ -0,0 +1,184 @@
+"""机台级派工
+
+排产按工序汇总产能（各机台 capacity_per_hour 之和）进行，没有考虑机台只能按整批生产
+（如钢化炉一炉一批）以及单台机台可能空闲。这里把每个工序每小时的排产数量拆分到该工序的
+各条机台记录上，全部用整数数组计算：
+
+- 每条机台记录第 h 小时可开工的整批数 = floor((h+1)·3600·台数/节拍) − floor(h·3600·台数/节拍)，
+  节拍超过一小时的机台（如一批 1.5 小时）按长期平均速率隔小时开批，h 从固定起点计数；
+  节拍按毫秒取整后做整数运算（带小数的节拍如 2.5 秒不会被取整为 2 或 3 秒），与排产的产能一致
+- 先按各机台本小时的整批产能比例分配批数并向下取整，剩余数量按小数部分从大到小
+  逐台追加一批，直到覆盖本小时数量；最后一批可以不满
+- 本小时所有机台的整批产能仍不足时，差额记为未派工数量
+
+(小时, 机台) 矩阵一次计算完成，耗时与机台数、小时数成线性关系。
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import jsonify, request
+
+from app.auth import login_required
+from app.scheduler import get_plant_snapshot
+
+HOURS_PER_DAY = 24
+
+# 一次查询最多的天数
+MAX_DAYS = 31
+
+
+def batch_capacity(beats, quantities, n_hours, first_hour=0):
+    """各机台记录每小时可开工的整批数，返回 (小时, 机台) 的 int64 矩阵
+
+    beats 为节拍（秒/批，可带小数），quantities 为台数；first_hour 为第一列距节拍起算时刻的小时数。
+    节拍不大于 0 的机台没有产能（与 calculate_capacity_per_hour 相同）。
+    """
+    beats = np.asarray(beats, dtype=np.float64)
+    beat_ms = np.maximum(np.rint(beats * 1000).astype(np.int64), 1)
+    quantities = np.where(beats > 0, np.maximum(np.asarray(quantities, dtype=np.int64), 0), 0)
+    # 以毫秒计的小时边界：公元 1 年起约 1.8e7 小时，乘以台数仍远小于 int64 上限
+    boundaries = np.arange(first_hour, first_hour + n_hours + 1, dtype=np.int64)[:, None] * 3600 * 1000
+    started = boundaries * quantities[None, :] // beat_ms[None, :]
+    return np.diff(started, axis=0)
+
+
+def dispatch_batches(demand, capacity, batch_sizes):
+    """将每小时数量按整批拆分到各机台
+
+    demand: (H,) 每小时数量；capacity: (H, E) 每小时可开工批数；batch_sizes: (E,) 每批数量。
+    返回 (batches, pieces, unassigned)：各机台每小时开工批数和加工数量 (H, E)，
+    以及每小时未能派工的数量 (H,)。
+    """
+    requested = np.asarray(demand, dtype=np.int64)
+    capacity = np.asarray(capacity, dtype=np.int64)
+    batch_sizes = np.maximum(np.asarray(batch_sizes, dtype=np.int64), 1)
+
+    # 整批产能不足时只派满全部机台
+    piece_capacity = capacity * batch_sizes[None, :]
+    total_capacity = piece_capacity.sum(axis=1)
+    demand = np.minimum(requested, total_capacity)
+
+    # 按整批产能比例分配后向下取整
+    share = demand[:, None] * piece_capacity
+    denominator = np.maximum(total_capacity, 1)[:, None] * batch_sizes[None, :]
+    batches = np.minimum(share // denominator, capacity)
+
+    # 剩余数量按小数部分从大到小逐台追加一批（每台最多一批）
+    remaining = demand - (batches * batch_sizes[None, :]).sum(axis=1)
+    spare = batches < capacity
+    fraction = np.where(spare, (share % denominator) / denominator, -1.0)
+    order = np.argsort(-fraction, axis=1, kind='stable')
+    sizes = np.take_along_axis(np.where(spare, batch_sizes[None, :], 0), order, axis=1)
+    covered = np.cumsum(sizes, axis=1)
+    extra_sorted = (sizes > 0) & (covered - sizes < remaining[:, None])
+    extra = np.zeros_like(extra_sorted)
+    np.put_along_axis(extra, order, extra_sorted, axis=1)
+    batches = batches + extra
+
+    # 加工数量为整批数量，超出本小时数量的部分从最后追加的一批中扣除（不满的一批）
+    pieces = batches * batch_sizes[None, :]
+    overshoot = pieces.sum(axis=1) - demand
+    picked = extra_sorted.sum(axis=1)
+    rows = np.flatnonzero((overshoot > 0) & (picked > 0))
+    last = order[rows, picked[rows] - 1]
+    pieces[rows, last] -= overshoot[rows]
+
+    return batches, pieces, requested - demand
+
+
+def load_process_hours(db, workshop_id, start, n_hours):
+    """车间各工序从 start 起 n_hours 小时的排产数量，返回 {工序ID: (n_hours,) int64 数组}"""
+    from app.models import ProductionSchedule
+
+    rows = db.session.query(
+        ProductionSchedule.process_id, ProductionSchedule.schedule_date, ProductionSchedule.hour,
+        db.func.sum(ProductionSchedule.production_quantity)
+    ).filter(
+        ProductionSchedule.workshop_id == workshop_id,
+        ProductionSchedule.schedule_date >= start,
+        ProductionSchedule.schedule_date < start + timedelta(hours=n_hours),
+    ).group_by(
+        ProductionSchedule.process_id, ProductionSchedule.schedule_date, ProductionSchedule.hour
+    ).all()
+
+    result = {}
+    for process_id, schedule_date, hour, quantity in rows:
+        index = (schedule_date - start).days * HOURS_PER_DAY + hour
+        if 0 <= index < n_hours:
+            result.setdefault(process_id, np.zeros(n_hours, dtype=np.int64))[index] += int(quantity or 0)
+    return result
+
+
+def build_machine_load(db, workshop_name, start, days=1):
+    """生成车间从 start 起 days 天的机台小时负荷表
+
+    返回 {'start', 'hours', 'processes': [{'id', 'name', 'demand', 'unassigned', 'machines': [...]}]}，
+    每台机台包含 id、name、quantity、batch_size、capacity（可开工批数）、batches、pieces 和
+    busy（在用台数 = ceil(批数 / 单台可开工批数)），均为逐小时的整数列表。
+    """
+    workshop = get_plant_snapshot(db).get(workshop_name)
+    if workshop is None:
+        return None
+
+    n_hours = days * HOURS_PER_DAY
+    demand_by_process = load_process_hours(db, workshop['id'], start, n_hours)
+    # 节拍从固定的起点（公元 1 年）起算，同一小时的批数不随查询范围变化
+    first_hour = start.toordinal() * HOURS_PER_DAY
+
+    processes = []
+    for process in workshop['processes']:
+        equipments = process['equipments']
+        demand = demand_by_process.get(process['id'], np.zeros(n_hours, dtype=np.int64))
+        beats = [e['beat'] or 0 for e in equipments]
+        quantities = [e['quantity'] or 0 for e in equipments]
+        batch_sizes = [e['batch_size'] or 1 for e in equipments]
+
+        capacity = batch_capacity(beats, quantities, n_hours, first_hour)
+        batches, pieces, unassigned = dispatch_batches(demand, capacity, batch_sizes)
+        # 单台机台每小时可开工批数，用于换算在用台数
+        single = batch_capacity(beats, np.ones(len(equipments), dtype=np.int64), n_hours, first_hour)
+        busy = np.minimum(-(-batches // np.maximum(single, 1)), np.asarray(quantities, dtype=np.int64)[None, :])
+
+        processes.append({
+            'id': process['id'],
+            'name': process['name'],
+            'demand': demand.tolist(),
+            'unassigned': unassigned.tolist(),
+            'machines': [{
+                'id': equipment['id'],
+                'name': equipment['name'],
+                'quantity': equipment['quantity'],
+                'batch_size': equipment['batch_size'],
+                'capacity': capacity[:, i].tolist(),
+                'batches': batches[:, i].tolist(),
+                'pieces': pieces[:, i].tolist(),
+                'busy': busy[:, i].tolist(),
+            } for i, equipment in enumerate(equipments)],
+        })
+
+    return {
+        'start': start.strftime('%Y-%m-%d'),
+        'hours': [(start + timedelta(hours=h)).strftime('%Y-%m-%d %H:00') for h in range(n_hours)],
+        'processes': processes,
+    }
+
+
+def register_dispatch_routes(app, db):
+
+    @app.route('/api/dispatch')
+    @login_required
+    def machine_load(user):
+        """机台小时负荷：?workshop=车间名&date=YYYY-MM-DD&days=1"""
+        workshop_name = request.args.get('workshop', '')
+        try:
+            start = datetime.strptime(request.args.get('date') or datetime.now().strftime('%Y-%m-%d'), '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': '日期格式应为 YYYY-MM-DD'}), 400
+        days = request.args.get('days', 1, type=int)
+        if not 1 <= days <= MAX_DAYS:
+            return jsonify({'error': f'天数应在 1 到 {MAX_DAYS} 之间'}), 400
+
+        load = build_machine_load(db, workshop_name, start, days)
+        if load is None:
+            return jsonify({'error': '车间不存在'}), 404
+        return jsonify(load)
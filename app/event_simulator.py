@@ -0,0 +1,122 @@
+"""离散事件排产引擎
+
+按小时模拟的引擎（scheduler.simulate_order）每小时按 int(capacity_per_hour) 计算产量，
+后一工序固定比前一工序晚一小时开工。节拍只有几十秒、每批几十片时，短订单的开工延迟
+和完工时间都被放大到整小时。
+
+这里按机台逐批模拟：每条机台记录展开为“台数”台机台，每台一次加工一批（batch_size 片，
+耗时 beat 秒）。事件队列（heapq）中是各台机台的批次完工事件（以及各工序可以开工的时刻）：
+
+- 某工序有机台空闲、且缓冲区（前序已完工、本工序未加工）中的数量够一整批时开批，
+  前序工序全部完工后剩余的不满一批也开批；优先使用单片加工时间短的机台
+- 批次完工时，产量计入完工时刻所在的整点，并进入下一工序的缓冲区
+- 沙盒直接指定工序产能（与机台产能之和不一致）时，该工序按一台每分钟完成一批的虚拟机台模拟
+
+计算量与批次数成正比，与时间粒度无关；只在输出时按整点汇总为 production_schedules 行。
+"""
+import heapq
+import math
+from bisect import insort
+from datetime import timedelta
+from itertools import count
+
+
+def process_machines(process):
+    """工序的机台列表：[(每批小时数, 每批数量), ...]，每台机台一项"""
+    machines = []
+    equipments = process.get('equipments') or []
+    for equipment in equipments:
+        beat, quantity, batch_size = equipment.get('beat'), equipment.get('quantity'), equipment.get('batch_size')
+        if not beat or float(beat) <= 0 or not quantity or not batch_size:
+            continue
+        machines.extend([(float(beat) / 3600, int(batch_size))] * int(quantity))
+
+    capacity = process.get('capacity_per_hour') or 0
+    equipment_capacity = sum(e.get('capacity_per_hour') or 0 for e in equipments)
+    if capacity > 0 and (not machines or abs(capacity - equipment_capacity) > 1e-6):
+        # 工序产能被直接指定：按一台虚拟机台每分钟完成一批
+        batch_size = max(1, math.ceil(capacity / 60))
+        machines = [(batch_size / capacity, batch_size)]
+    elif capacity <= 0:
+        machines = []
+    return machines
+
+
+def simulate_order_events(quantity, processes, start_time, completed=None, available_from=None):
+    """逐批模拟单个订单，参数与 simulate_order 相同
+
+    返回 (排程条目, 各工序最后一批完工时刻, 完工时间)：排程条目为按整点汇总的
+    (工序ID, 整点 datetime, 该小时产量) 列表；完工时刻为距 start_time 的小时数，
+    没有产出的工序为 None；完工时间为最后一道工序最后一批完工的 datetime（未排完为 None）。
+    """
+    n = len(processes)
+    if completed is None:
+        completed = [0] * n
+    if available_from is None:
+        available_from = [0.0] * n
+
+    machines = [process_machines(process) for process in processes]
+    # 空闲机台按单片加工时间排序
+    idle = [sorted((hours / batch, index) for index, (hours, batch) in enumerate(items)) for items in machines]
+    to_start = [max(0, quantity - done) for done in completed]
+    buffer = [to_start[0] if n else 0] + [max(0, completed[k - 1] - completed[k]) for k in range(1, n)]
+    in_flight = [0] * n
+    finish = [None] * n
+    smallest_batch = [min((batch for _, batch in items), default=0) for items in machines]
+
+    events = []
+    sequence = count()
+
+    def upstream_done(k):
+        return k == 0 or (to_start[k - 1] == 0 and in_flight[k - 1] == 0)
+
+    def start_batches(k, now):
+        if not idle[k] or now < available_from[k]:
+            return
+        partial = buffer[k] >= to_start[k] or upstream_done(k)
+        if buffer[k] < smallest_batch[k] and not partial:
+            return
+        position = 0
+        while position < len(idle[k]) and to_start[k] > 0 and buffer[k] > 0:
+            _, index = idle[k][position]
+            hours, batch = machines[k][index]
+            size = min(batch, buffer[k], to_start[k])
+            if size < batch and not partial:
+                # 不够一整批，等待前序产出；批量更小的机台可能仍可开批
+                position += 1
+                continue
+            idle[k].pop(position)
+            buffer[k] -= size
+            to_start[k] -= size
+            in_flight[k] += size
+            heapq.heappush(events, (now + hours, next(sequence), k, index, size))
+
+    # 各工序在可开工时刻尝试开批
+    for k in range(n):
+        heapq.heappush(events, (max(0.0, available_from[k]), next(sequence), k, None, 0))
+
+    # 完工时刻（距 start_time 的小时数）加上 start_time 在整点内的偏移后取整，即为所在整点的序号
+    first_hour = start_time.replace(minute=0, second=0, microsecond=0)
+    offset = (start_time - first_hour).total_seconds() / 3600
+    produced = {}
+    while events:
+        now, _, k, index, size = heapq.heappop(events)
+        if index is not None:
+            in_flight[k] -= size
+            finish[k] = now
+            key = (int(now + offset), k)
+            produced[key] = produced.get(key, 0) + size
+            hours, batch = machines[k][index]
+            insort(idle[k], (hours / batch, index))
+            if k + 1 < n:
+                buffer[k + 1] += size
+        start_batches(k, now)
+        if index is not None and k + 1 < n:
+            start_batches(k + 1, now)
+
+    entries = [(processes[k]['id'], first_hour + timedelta(hours=hour), quantity_)
+               for (hour, k), quantity_ in sorted(produced.items())]
+    completion = None
+    if n and finish[-1] is not None and to_start[-1] == 0:
+        completion = start_time + timedelta(hours=finish[-1])
+    return entries, finish, completion
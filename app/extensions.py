@@ -0,0 +1,12 @@
+"""Flask 扩展实例
+
+扩展在这里创建、在应用工厂中初始化，模型和视图可以直接导入而不会触发应用构建。
+"""
+from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
+
+from app.db_routing import RoutingSession
+
+# 创建数据库实例（会话按请求在主库和只读副本之间路由，见 app/db_routing.py）
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+migrate = Migrate()
@@ -0,0 +1,311 @@
+"""排程实时更新（Server-Sent Events）
+
+生成或删除排程后，计算整体排产页面中发生变化的单元格（车间/日期/工序/小时），
+以紧凑的增量事件写入 schedule_events 表；打开排产页面的客户端通过 SSE 接收事件，
+由 main.js 就地更新表格，无需整页刷新。
+
+单元格内容与页面一致：[[产品型号, 数量, 机台数, 累积已投], ...]。
+变化的单元格过多时改为推送 reload 事件，由客户端整页刷新。重新生成或恢复全部排程时
+不对比单元格（需要在整张排程表上计算两次），直接向涉及的车间推送 reload 事件；删除订单时
+只对比这些订单占用的单元格。
+"""
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Response, current_app, request, stream_with_context
+from sqlalchemy import func
+
+from app.auth import login_required
+
+
+def _cell_key(schedule_date, process_id, hour):
+    return f"{schedule_date.strftime('%Y-%m-%d')}|{process_id}|{hour}"
+
+
+def schedule_cells(db, workshop_ids=None, since=None, until=None, cell_keys=None):
+    """计算排产页面的单元格内容，返回 {车间ID: {'日期|工序ID|小时': [[型号, 数量, 机台数, 累积已投], ...]}}
+
+    since 不为空时只返回该日期（含）之后的单元格，之前的产量只用于计算累积已投；
+    until 不为空时只返回该日期（不含）之前的单元格。
+    cell_keys 为 {车间ID: {单元格键}} 时只返回这些单元格，since 之前的产量也只汇总
+    [since, until) 内出现的产品。
+    """
+    from app.models import Equipment, Product, ProductionSchedule
+
+    equipment_counts = dict(db.session.query(
+        Equipment.process_id, func.sum(Equipment.quantity)
+    ).group_by(Equipment.process_id).all())
+
+    # 累积已投按 (产品, 工序) 统计，since 之前的产量一次性汇总
+    cumulative = {}
+    filters = []
+    if workshop_ids is not None:
+        filters.append(ProductionSchedule.workshop_id.in_(workshop_ids))
+    window = []
+    if since is not None:
+        window.append(ProductionSchedule.schedule_date >= since)
+    if until is not None:
+        window.append(ProductionSchedule.schedule_date < until)
+    if since is not None:
+        earlier = [ProductionSchedule.schedule_date < since, *filters]
+        if cell_keys is not None:
+            # 只需要窗口内出现的产品的累积已投，不汇总整个车间的历史排程
+            earlier.append(ProductionSchedule.product_id.in_(
+                db.session.query(ProductionSchedule.product_id).filter(*filters, *window).distinct()))
+        for product_id, process_id, total in db.session.query(
+            ProductionSchedule.product_id, ProductionSchedule.process_id,
+            func.sum(ProductionSchedule.production_quantity)
+        ).filter(*earlier).group_by(
+            ProductionSchedule.product_id, ProductionSchedule.process_id
+        ).all():
+            cumulative[(product_id, process_id)] = int(total or 0)
+    filters.extend(window)
+
+    rows = db.session.query(
+        ProductionSchedule.workshop_id, ProductionSchedule.schedule_date, ProductionSchedule.hour,
+        ProductionSchedule.process_id, ProductionSchedule.product_id, Product.product_model,
+        func.sum(ProductionSchedule.production_quantity).label('quantity')
+    ).join(Product, Product.id == ProductionSchedule.product_id).filter(*filters).group_by(
+        ProductionSchedule.workshop_id, ProductionSchedule.schedule_date, ProductionSchedule.hour,
+        ProductionSchedule.process_id, ProductionSchedule.product_id, Product.product_model
+    ).order_by(
+        ProductionSchedule.schedule_date, ProductionSchedule.hour, func.min(ProductionSchedule.id)
+    ).all()
+
+    cells = {workshop_id: {} for workshop_id in workshop_ids or []}
+    for row in rows:
+        quantity = int(row.quantity or 0)
+        key = (row.product_id, row.process_id)
+        cumulative[key] = cumulative.get(key, 0) + quantity
+
+        cell_key = _cell_key(row.schedule_date, row.process_id, row.hour)
+        if cell_keys is not None and cell_key not in cell_keys.get(row.workshop_id, ()):
+            continue
+        products = cells.setdefault(row.workshop_id, {}).setdefault(cell_key, [])
+        # 同一小时内相同型号的产品合并数量，机台数和累积已投取第一个产品的值（与页面一致）
+        existing = next((p for p in products if p[0] == row.product_model), None)
+        if existing:
+            existing[1] += quantity
+        else:
+            products.append([row.product_model, quantity,
+                             int(equipment_counts.get(row.process_id) or 0), cumulative[key]])
+    return cells
+
+
+def capture_cells(db, workshop_ids=None, since=None, until=None, cell_keys=None):
+    """在修改排程前记录受影响范围内的单元格，修改后传给 publish_cell_changes"""
+    if workshop_ids is not None:
+        workshop_ids = sorted(set(workshop_ids))
+    scope = {'workshop_ids': workshop_ids, 'since': since, 'until': until, 'cell_keys': cell_keys}
+    return dict(scope, cells=schedule_cells(db, **scope))
+
+
+def capture_cells_for_orders(db, order_ids):
+    """删除订单前记录这些订单的排程所在的单元格
+
+    只读取这些订单占用的 (车间, 日期, 工序, 小时) 单元格：先按产品查出单元格，再在其日期范围内
+    重新计算这些单元格，删除一个订单不需要扫描整个车间的排程。
+    """
+    from app.models import Order, ProductionSchedule
+
+    product_ids = db.session.query(Order.product_id).filter(Order.id.in_(list(order_ids)))
+    cell_keys = {}
+    first_day = last_day = None
+    for workshop_id, schedule_date, process_id, hour in db.session.query(
+        ProductionSchedule.workshop_id, ProductionSchedule.schedule_date,
+        ProductionSchedule.process_id, ProductionSchedule.hour
+    ).filter(ProductionSchedule.product_id.in_(product_ids)).distinct().all():
+        cell_keys.setdefault(workshop_id, set()).add(_cell_key(schedule_date, process_id, hour))
+        day = datetime(schedule_date.year, schedule_date.month, schedule_date.day)
+        first_day = day if first_day is None else min(first_day, day)
+        last_day = day if last_day is None else max(last_day, day)
+
+    if not cell_keys:
+        return capture_cells(db, [], cell_keys={})
+    return capture_cells(db, list(cell_keys), since=first_day, until=last_day + timedelta(days=1),
+                         cell_keys=cell_keys)
+
+
+def diff_cells(before, after):
+    """对比两组单元格，返回变化的单元格 [[日期, 工序ID, 小时, 产品列表], ...]，清空的单元格产品列表为空"""
+    changed = []
+    for key in sorted(set(before) | set(after)):
+        products = after.get(key, [])
+        if before.get(key, []) != products:
+            date_str, process_id, hour = key.split('|')
+            changed.append([date_str, int(process_id), int(hour), products])
+    return changed
+
+
+def publish_event(db, payload, workshop_id=None):
+    """写入一条排程变更事件，并清理超出保留数量的旧事件"""
+    from app.models import ScheduleEvent
+
+    event = ScheduleEvent(workshop_id=workshop_id, payload=json.dumps(payload, ensure_ascii=False,
+                                                                     separators=(',', ':')))
+    db.session.add(event)
+    db.session.flush()
+
+    retention = current_app.config.get('SSE_EVENT_RETENTION', 1000)
+    db.session.query(ScheduleEvent).filter(ScheduleEvent.id <= event.id - retention).delete(
+        synchronize_session=False)
+    db.session.commit()
+    return event.id
+
+
+def publish_cell_changes(db, captured):
+    """重新计算 capture_cells 记录的范围内的单元格，按车间推送变化，返回推送的事件数"""
+    after = schedule_cells(db, captured['workshop_ids'], captured['since'], captured['until'],
+                           captured['cell_keys'])
+    before = captured['cells']
+    max_cells = current_app.config.get('SSE_MAX_DELTA_CELLS', 2000)
+
+    published = 0
+    for workshop_id in sorted(set(before) | set(after)):
+        changed = diff_cells(before.get(workshop_id, {}), after.get(workshop_id, {}))
+        if not changed:
+            continue
+        if len(changed) > max_cells:
+            payload = {'type': 'reload', 'workshop_id': workshop_id}
+        else:
+            payload = {'type': 'cells', 'workshop_id': workshop_id, 'cells': changed}
+        publish_event(db, payload, workshop_id)
+        published += 1
+    return published
+
+
+def publish_clear(db, workshop_id=None):
+    """推送清空事件：清空指定车间（为空时为所有车间）的全部排程"""
+    return publish_event(db, {'type': 'clear', 'workshop_id': workshop_id}, workshop_id)
+
+
+def scheduled_workshop_ids(db):
+    """当前有排程的车间ID（替换全部排程前调用，连同新排程涉及的车间一起推送 reload）"""
+    from app.models import ProductionSchedule
+
+    return {workshop_id for (workshop_id,) in db.session.query(ProductionSchedule.workshop_id).distinct().all()}
+
+
+def publish_reload(db, workshop_ids):
+    """推送整页刷新事件：每个车间一条，打开其他车间排产页面的客户端不受影响"""
+    for workshop_id in sorted(workshop_ids):
+        publish_event(db, {'type': 'reload', 'workshop_id': workshop_id}, workshop_id)
+    return len(workshop_ids)
+
+
+def publish_quietly(db, publisher, *args):
+    """推送事件失败只记录日志，不影响已经提交的排程修改"""
+    try:
+        return publisher(db, *args)
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('推送排程变更事件失败')
+        return None
+
+
+def latest_event_id(db):
+    from app.models import ScheduleEvent
+
+    return db.session.query(func.max(ScheduleEvent.id)).scalar() or 0
+
+
+# 当前进程中保持中的事件流数量；超过 SSE_MAX_STREAMS 的连接只返回一次待推送的事件后立即关闭（退化为轮询）
+_stream_lock = threading.Lock()
+_active_streams = 0
+
+
+def _acquire_stream(limit):
+    global _active_streams
+    with _stream_lock:
+        if _active_streams >= limit:
+            return False
+        _active_streams += 1
+        return True
+
+
+def _release_stream():
+    global _active_streams
+    with _stream_lock:
+        _active_streams -= 1
+
+
+def _format_event(event_id, payload):
+    return f'id: {event_id}\nevent: schedule\ndata: {payload}\n\n'
+
+
+def register_live_update_routes(app, db):
+
+    @app.route('/api/schedule/events')
+    @login_required
+    def schedule_events(user):
+        """排程变更事件流（text/event-stream）
+
+        首次连接通过 ?since=<事件ID> 指定起点（页面渲染时的最新事件ID），
+        断线重连时浏览器自动携带 Last-Event-ID。连接保持 SSE_STREAM_SECONDS 秒后
+        由服务器关闭，客户端按 retry 间隔自动重连，避免长期占用工作线程。
+        每个工作进程最多同时保持 SSE_MAX_STREAMS 个连接（gthread 下每个连接占用一个线程），
+        超出的连接只推送已有的事件后立即关闭，并通知客户端 SSE_DEGRADED_RETRY_SECONDS 秒后再重连，
+        其余线程留给普通请求。
+        """
+        from app.models import ScheduleEvent
+
+        last_id = request.headers.get('Last-Event-ID') or request.args.get('since')
+        try:
+            last_id = int(last_id) if last_id is not None else latest_event_id(db)
+        except ValueError:
+            last_id = latest_event_id(db)
+
+        poll_interval = current_app.config.get('SSE_POLL_INTERVAL', 2)
+        stream_seconds = current_app.config.get('SSE_STREAM_SECONDS', 25)
+        max_streams = current_app.config.get('SSE_MAX_STREAMS', 4)
+        degraded_retry = current_app.config.get('SSE_DEGRADED_RETRY_SECONDS', 20)
+        heartbeat_seconds = 15
+
+        def stream():
+            held = _acquire_stream(max_streams)
+            try:
+                yield from poll(held)
+            finally:
+                if held:
+                    _release_stream()
+
+        def poll(held):
+            nonlocal last_id
+            # 未能保持连接的客户端拉长重连间隔，否则每 SSE_POLL_INTERVAL 秒重连一次，比保持连接的开销更大
+            retry = poll_interval if held else degraded_retry
+            yield f'retry: {int(retry * 1000)}\n\n'
+
+            # 客户端错过的事件已被清理时，通知其整页刷新
+            oldest_id = db.session.query(func.min(ScheduleEvent.id)).scalar()
+            if oldest_id is not None and last_id < oldest_id - 1:
+                last_id = latest_event_id(db)
+                yield _format_event(last_id, json.dumps({'type': 'reload', 'workshop_id': None}))
+
+            deadline = time.monotonic() + stream_seconds
+            last_sent = time.monotonic()
+            while True:
+                events = db.session.query(ScheduleEvent.id, ScheduleEvent.payload).filter(
+                    ScheduleEvent.id > last_id
+                ).order_by(ScheduleEvent.id).limit(100).all()
+                # 每次轮询后归还数据库连接，等待期间不占用连接池
+                db.session.close()
+
+                for event_id, payload in events:
+                    yield _format_event(event_id, payload)
+                    last_id = event_id
+                if events:
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent >= heartbeat_seconds:
+                    yield ': keep-alive\n\n'
+                    last_sent = time.monotonic()
+
+                if not held or time.monotonic() >= deadline:
+                    break
+                time.sleep(poll_interval)
+
+        return Response(stream_with_context(stream()), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # 关闭 nginx 缓冲，事件立即送达
+        })
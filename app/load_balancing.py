@@ -0,0 +1,384 @@
+"""订单车间负载均衡
+
+订单的生产车间在录入时确定，容易出现 UTG1 车间排满而 UTG3 车间、中试线空闲的情况。
+对标记为“允许调整车间”的订单，这里按各车间的产能和已承接的负荷重新选择车间，必要时把
+数量拆分到多个车间：
+
+- 每个车间看作一条产能为瓶颈工序产能（各工序机台产能之和的最小值）的流水线，
+  订单占用 数量 / 产能 小时；不可调整订单的负荷先占用车间，可调整订单排在其后
+- makespan：先求线性松弛的下界——把全部可调整数量“注水”到各车间，使各车间同时完工的时刻 C*；
+  再按数量从大到小（LPT）把订单分配到完工最早的车间，允许拆分时超过 C* 的订单按各车间
+  距 C* 的剩余产能拆分（类似 McNaughton 卷绕规则，最多少数几个订单被拆分）
+- tardiness：按交期从早到晚把订单分配到延期最少（其次完工最早）的车间，允许拆分时
+  会延期的订单在各车间注水拆分，拆分后能按期完工才采用
+- 方案没有改善优化目标时不做任何调整，重复执行不会来回改派
+
+每个订单只需比较各车间一次，数千个订单在毫秒级完成。结果在下次生成排程时生效。
+"""
+import math
+import time
+from datetime import datetime
+
+from flask import current_app, jsonify, request
+from sqlalchemy.exc import IntegrityError
+
+from app.auth import admin_required, login_required
+from app.scheduler import get_plant_snapshot, workshop_bottlenecks
+
+OBJECTIVES = ('makespan', 'tardiness')
+
+# 拆分后每个车间的最少数量（默认）
+DEFAULT_MIN_SPLIT = 500
+
+EPSILON = 1e-9
+
+
+def load_balancing_orders(db, start_time):
+    """读取订单的车间、投产数量、交期（距 start_time 的小时数）和是否允许调整车间"""
+    from app.models import Order, Product
+
+    rows = db.session.query(
+        Order.id, Order.order_number, Product.id.label('product_id'), Product.workshop,
+        Product.calculated_quantity, Product.shipping_date, Product.workshop_flexible
+    ).join(Product, Product.id == Order.product_id).order_by(Order.id).all()
+    return [{
+        'order_id': row.id,
+        'order_number': row.order_number,
+        'product_id': row.product_id,
+        'workshop': row.workshop,
+        'quantity': row.calculated_quantity,
+        'shipping_date': row.shipping_date,
+        'due': (row.shipping_date - start_time).total_seconds() / 3600 if row.shipping_date else math.inf,
+        'flexible': bool(row.workshop_flexible),
+    } for row in rows]
+
+
+def water_fill(loads, rates, quantity):
+    """把 quantity 注入各车间，使参与的车间同时完工，返回完工时刻（小时）
+
+    loads 为各车间已有负荷（小时），rates 为产能（片/小时），两者键相同。
+    """
+    total_rate = 0.0
+    weighted = 0.0
+    level = math.inf
+    ordered = sorted(loads, key=loads.get)
+    for index, workshop in enumerate(ordered):
+        total_rate += rates[workshop]
+        weighted += loads[workshop] * rates[workshop]
+        level = (quantity + weighted) / total_rate
+        if index + 1 == len(ordered) or level <= loads[ordered[index + 1]]:
+            break
+    return level
+
+
+def integer_parts(shares, quantity):
+    """把按比例的份额取整为和等于 quantity 的整数（向下取整后按小数部分从大到小补齐）"""
+    parts = {workshop: int(math.floor(share)) for workshop, share in shares.items()}
+    remainder = quantity - sum(parts.values())
+    for workshop in sorted(shares, key=lambda w: shares[w] - parts[w], reverse=True)[:max(0, remainder)]:
+        parts[workshop] += 1
+    return {workshop: part for workshop, part in parts.items() if part > 0}
+
+
+def _fill_to_level(loads, rates, quantity, min_split):
+    """在各车间注水拆分单个订单，小于 min_split 的部分去掉后重新注水，返回 {车间: 数量}"""
+    candidates = dict(loads)
+    while candidates:
+        level = water_fill(candidates, rates, quantity)
+        shares = {w: (level - load) * rates[w] for w, load in candidates.items() if level - load > EPSILON}
+        parts = integer_parts(shares, quantity)
+        small = [w for w, part in parts.items() if part < min_split]
+        if not small or len(parts) == 1:
+            return parts
+        smallest = min(small, key=parts.get)
+        candidates.pop(smallest)
+    return {}
+
+
+def _split_under_cap(loads, rates, quantity, cap, min_split):
+    """按各车间距 cap 的剩余产能拆分订单（剩余产能大的车间优先），余量放到完工最早的车间"""
+    parts = {}
+    remaining = quantity
+    rooms = {w: int(math.floor((cap - load) * rates[w] + EPSILON)) for w, load in loads.items() if cap > load}
+    for workshop in sorted(rooms, key=rooms.get, reverse=True):
+        take = min(remaining, rooms[workshop])
+        if take < max(1, min_split) or 0 < remaining - take < min_split:
+            continue
+        parts[workshop] = take
+        remaining -= take
+        if not remaining:
+            break
+    if remaining:
+        workshop = min(loads, key=lambda w: loads[w] + (parts.get(w, 0) + remaining) / rates[w])
+        parts[workshop] = parts.get(workshop, 0) + remaining
+    return parts
+
+
+def _finish(loads, rates, parts):
+    return max(loads[w] + part / rates[w] for w, part in parts.items())
+
+
+def balance_orders(orders, rates, objective='makespan', split=False, min_split=DEFAULT_MIN_SPLIT):
+    """为可调整车间的订单选择车间，返回 {订单ID: {车间: 数量}}
+
+    orders 为 load_balancing_orders 的结果，rates 为参与均衡的车间产能（片/小时，均大于 0）。
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"优化目标应为 {'、'.join(OBJECTIVES)}")
+    if not rates:
+        return {}
+
+    loads = {workshop: 0.0 for workshop in rates}
+    flexible = []
+    for order in orders:
+        if order['quantity'] <= 0:
+            continue
+        if order['flexible']:
+            flexible.append(order)
+        elif order['workshop'] in rates:
+            loads[order['workshop']] += order['quantity'] / rates[order['workshop']]
+
+    if objective == 'makespan':
+        flexible.sort(key=lambda o: (-o['quantity'], o['due'], o['order_id']))
+        cap = water_fill(loads, rates, sum(o['quantity'] for o in flexible))
+    else:
+        flexible.sort(key=lambda o: (o['due'], -o['quantity'], o['order_id']))
+
+    assignments = {}
+    for order in flexible:
+        quantity = order['quantity']
+        finishes = {w: loads[w] + quantity / rates[w] for w in rates}
+        if objective == 'makespan':
+            best = min(rates, key=lambda w: (finishes[w], w != order['workshop']))
+            parts = {best: quantity}
+            if split and finishes[best] > cap + EPSILON:
+                candidate = _split_under_cap(loads, rates, quantity, cap, min_split)
+                if _finish(loads, rates, candidate) < finishes[best] - EPSILON:
+                    parts = candidate
+        else:
+            best = min(rates, key=lambda w: (max(0.0, finishes[w] - order['due']), finishes[w],
+                                             w != order['workshop']))
+            parts = {best: quantity}
+            if split and finishes[best] > order['due'] + EPSILON:
+                # 只在拆分后能按期完工时拆分，避免普遍延期时大量订单被拆开
+                candidate = _fill_to_level(loads, rates, quantity, min_split)
+                if candidate and _finish(loads, rates, candidate) <= order['due'] + EPSILON:
+                    parts = candidate
+        for workshop, part in parts.items():
+            loads[workshop] += part / rates[workshop]
+        assignments[order['order_id']] = parts
+    return assignments
+
+
+def evaluate_assignment(orders, rates, assignments=None):
+    """按“不可调整订单在前、可调整订单在后，各自按交期排序”的车间队列计算各车间负荷、最大完工时刻和延期
+
+    assignments 为 None 时按订单当前的车间计算。
+    """
+    queued = []
+    for order in orders:
+        parts = (assignments or {}).get(order['order_id']) or {order['workshop']: order['quantity']}
+        for workshop, part in parts.items():
+            if workshop in rates and part > 0:
+                queued.append((order['flexible'], order['due'], order['order_id'], workshop, part))
+
+    loads = {workshop: 0.0 for workshop in rates}
+    finish_by_order = {}
+    for _, due, order_id, workshop, part in sorted(queued):
+        loads[workshop] += part / rates[workshop]
+        # 拆分的订单以最晚完工的部分为准
+        previous = finish_by_order.get(order_id, (0.0, due))[0]
+        finish_by_order[order_id] = (max(previous, loads[workshop]), due)
+
+    tardiness = [max(0.0, finish - due) for finish, due in finish_by_order.values() if due != math.inf]
+    return {
+        'loads': loads,
+        'makespan_hours': round(max(loads.values(), default=0.0), 2),
+        'tardiness_hours': round(sum(tardiness), 2),
+        'late_orders': sum(1 for t in tardiness if t > EPSILON),
+    }
+
+
+def plan_load_balance(db, objective='makespan', split=False, min_split=DEFAULT_MIN_SPLIT, workshops=None,
+                      start_time=None):
+    """读取订单和产能，计算负载均衡方案，返回 (结果字典, 订单列表, 分配方案)"""
+    started = time.perf_counter()
+    start_time = start_time or datetime.now()
+    bottlenecks = workshop_bottlenecks(get_plant_snapshot(db))
+    rates = {name: b['capacity_per_hour'] for name, b in bottlenecks.items()
+             if b['capacity_per_hour'] > 0 and (not workshops or name in workshops)}
+    orders = load_balancing_orders(db, start_time)
+    if workshops:
+        # 只在指定车间之间调整：当前车间不在其中的订单保持不变
+        orders = [dict(o, flexible=o['flexible'] and o['workshop'] in rates) for o in orders]
+
+    assignments = balance_orders(orders, rates, objective, split, min_split)
+    before = evaluate_assignment(orders, rates)
+    after = evaluate_assignment(orders, rates, assignments)
+    key = 'makespan_hours' if objective == 'makespan' else 'tardiness_hours'
+    if after[key] >= before[key]:
+        assignments = {}
+        after = before
+
+    orders_by_id = {o['order_id']: o for o in orders}
+    moves = []
+    for order_id, parts in assignments.items():
+        order = orders_by_id[order_id]
+        if parts == {order['workshop']: order['quantity']}:
+            continue
+        moves.append({
+            'order_id': order_id,
+            'order_number': order['order_number'],
+            'quantity': order['quantity'],
+            'shipping_date': order['shipping_date'].strftime('%Y-%m-%d') if order['shipping_date'] else None,
+            'from_workshop': order['workshop'],
+            'to': [{'workshop': w, 'quantity': q} for w, q in sorted(parts.items(), key=lambda item: -item[1])],
+        })
+
+    result = {
+        'objective': objective,
+        'split': split,
+        'min_split': min_split,
+        'start': start_time.strftime('%Y-%m-%d %H:%M'),
+        'flexible_orders': sum(1 for o in orders if o['flexible']),
+        'workshops': [{
+            'workshop': name,
+            'capacity_per_hour': rates[name],
+            'hours_before': round(before['loads'][name], 2),
+            'hours_after': round(after['loads'][name], 2),
+        } for name in rates],
+        'makespan_hours_before': before['makespan_hours'],
+        'makespan_hours_after': after['makespan_hours'],
+        'tardiness_hours_before': before['tardiness_hours'],
+        'tardiness_hours_after': after['tardiness_hours'],
+        'late_orders_before': before['late_orders'],
+        'late_orders_after': after['late_orders'],
+        'moves': moves,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+    return result, orders_by_id, assignments
+
+
+def _next_split_index(order_number):
+    """拆分订单号 {原订单号}_S{n} 的下一个可用序号（之前的拆分已占用的序号不再使用）"""
+    from app.models import Order
+
+    prefix = f'{order_number}_S'
+    used = [0]
+    for (number,) in Order.query.with_entities(Order.order_number).filter(
+            Order.order_number.startswith(prefix, autoescape=True)).all():
+        suffix = number[len(prefix):]
+        if suffix.isdigit():
+            used.append(int(suffix))
+    return max(used) + 1
+
+
+def apply_load_balance(db, orders_by_id, assignments):
+    """写入分配方案（不提交）：改派车间；拆分的订单保留在原订单上的部分，其余部分新建产品和订单
+
+    新订单复制原产品的规格，出货数量按投产数量的比例拆分，订单号为 {原订单号}_S{n}，
+    n 从该订单之前的拆分已使用的最大序号之后开始。返回新建的订单数。
+    """
+    from app.models import Order, Product
+
+    changed = {order_id: parts for order_id, parts in assignments.items()
+               if parts != {orders_by_id[order_id]['workshop']: orders_by_id[order_id]['quantity']}}
+    if not changed:
+        return 0
+    orders = {order.id: order for order in Order.query.filter(Order.id.in_(list(changed))).all()}
+
+    created = 0
+    for order_id, parts in changed.items():
+        order = orders[order_id]
+        product = order.product
+        if len(parts) == 1:
+            product.workshop = next(iter(parts))
+            continue
+
+        # 原订单保留原车间（如参与拆分）或数量最多的部分
+        ordered = sorted(parts.items(), key=lambda item: (item[0] != product.workshop, -item[1]))
+        total = product.calculated_quantity
+        shipping_total = product.shipping_quantity
+        shipping_left = shipping_total
+        split_index = _next_split_index(order.order_number)
+        for index, (workshop, quantity) in enumerate(ordered):
+            shipping = shipping_left if index == len(ordered) - 1 else round(shipping_total * quantity / total)
+            shipping_left -= shipping
+            if index == 0:
+                product.workshop = workshop
+                product.calculated_quantity = quantity
+                product.shipping_quantity = shipping
+                continue
+            part = Product(
+                product_model=product.product_model,
+                length=product.length,
+                width=product.width,
+                thickness=product.thickness,
+                shipping_quantity=shipping,
+                yield_rate=product.yield_rate,
+                shipping_date=product.shipping_date,
+                raw_glass_size=product.raw_glass_size,
+                workshop=workshop,
+                workshop_flexible=product.workshop_flexible,
+                calculated_quantity=quantity,
+                nesting_count=product.nesting_count,
+                cutting_count=product.cutting_count,
+                product_master_id=product.product_master_id,
+            )
+            db.session.add(part)
+            db.session.flush()
+            db.session.add(Order(
+                order_number=f'{order.order_number}_S{split_index}',
+                product_id=part.id,
+                product_master_id=order.product_master_id,
+                customer_name=order.customer_name,
+                order_status='pending',
+            ))
+            split_index += 1
+            created += 1
+    return created
+
+
+def _parse_options():
+    objective = request.values.get('objective', 'makespan')
+    split = request.values.get('split') in ('1', 'true')
+    try:
+        min_split = int(request.values.get('min_split', DEFAULT_MIN_SPLIT))
+    except ValueError:
+        min_split = 0
+    if min_split < 1:
+        raise ValueError('min_split 应为正整数')
+    workshops = [w for w in (request.values.get('workshops') or '').split(',') if w]
+    return objective, split, min_split, workshops
+
+
+def register_load_balancing_routes(app, db):
+
+    @app.route('/api/load_balance')
+    @login_required
+    def preview_load_balance(user):
+        """预览负载均衡方案：?objective=makespan|tardiness&split=1&min_split=500&workshops=UTG1车间,UTG3车间"""
+        try:
+            result, _, _ = plan_load_balance(db, *_parse_options())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(result)
+
+    @app.route('/api/load_balance', methods=['POST'])
+    @admin_required
+    def apply_load_balance_route(user):
+        """按相同参数计算并保存负载均衡方案，下次生成排程时生效 - 仅管理员"""
+        try:
+            result, orders_by_id, assignments = plan_load_balance(db, *_parse_options())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        try:
+            result['created_orders'] = apply_load_balance(db, orders_by_id, assignments)
+            db.session.commit()
+        except IntegrityError:
+            # 其他请求同时拆分了相同的订单，拆分订单号冲突
+            db.session.rollback()
+            current_app.logger.exception('负载均衡方案保存失败')
+            return jsonify({'error': '订单已被其他操作修改（拆分订单号冲突），请重新预览后再保存'}), 409
+        result['applied'] = True
+        return jsonify(result)
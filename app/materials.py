@@ -0,0 +1,203 @@
+"""原玻物料需求
+
+由排程推算每天需要的原玻片数：原玻在点胶工序投入（也可以按切割工序统计），
+每片原玻可切出 cutting_count 片产品，nesting_count 片原玻叠成一叠切割。
+
+一条分组查询取出 (产品, 车间, 日期) 的排产数量，之后全部用 NumPy 计算：
+同一产品的不足一片的余量不能跨产品共用，因此按产品累计数量向上取整后逐日差分，
+每天的片数之和恰好等于该产品总数量所需的片数，不会因为逐日取整而多算。
+最后按 (原玻尺寸, 车间, 日期) 汇总。
+"""
+import csv
+import io
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import Response, jsonify, request, stream_with_context
+
+from app.auth import login_required
+
+# 可用于统计原玻投入的工序
+MATERIAL_PROCESSES = ('点胶', '切割')
+
+
+def load_material_rows(db, process_name='点胶', end_date=None, workshop_name=None):
+    """分组查询 end_date（不含）之前各产品每天在指定工序上的排产数量
+
+    返回 [(产品ID, 原玻尺寸, 切数, 叠数, 车间ID, 车间名, 日期, 数量)]，按产品和日期排序。
+    """
+    from app.models import Process, Product, ProductionSchedule, Workshop
+
+    query = db.session.query(
+        ProductionSchedule.product_id, Product.raw_glass_size, Product.cutting_count, Product.nesting_count,
+        ProductionSchedule.workshop_id, Workshop.name, ProductionSchedule.schedule_date,
+        db.func.sum(ProductionSchedule.production_quantity)
+    ).join(
+        Product, Product.id == ProductionSchedule.product_id
+    ).join(
+        Process, Process.id == ProductionSchedule.process_id
+    ).join(
+        Workshop, Workshop.id == ProductionSchedule.workshop_id
+    ).filter(Process.name == process_name)
+    if end_date is not None:
+        query = query.filter(ProductionSchedule.schedule_date < end_date)
+    if workshop_name:
+        query = query.filter(Workshop.name == workshop_name)
+
+    return query.group_by(
+        ProductionSchedule.product_id, Product.raw_glass_size, Product.cutting_count, Product.nesting_count,
+        ProductionSchedule.workshop_id, Workshop.name, ProductionSchedule.schedule_date
+    ).order_by(ProductionSchedule.product_id, ProductionSchedule.schedule_date).all()
+
+
+def _daily_increments(group_codes, quantities, per_unit):
+    """按组累计数量除以每单位数量后向上取整，再在组内逐行差分，返回每行新增的单位数"""
+    n = len(quantities)
+    cumulative = np.cumsum(quantities)
+    group_start = np.ones(n, dtype=bool)
+    group_start[1:] = group_codes[1:] != group_codes[:-1]
+    # 减去每行所在组起点之前的累计值，得到组内累计
+    first_row = np.maximum.accumulate(np.where(group_start, np.arange(n), 0))
+    within = cumulative - (cumulative - quantities)[first_row]
+    units = -(-within // per_unit)  # 向上取整
+    previous = np.where(group_start, 0, np.roll(units, 1))
+    return units - previous
+
+
+def compute_material_requirements(rows, start_date=None):
+    """计算每天的原玻需求，返回按 (日期, 车间, 原玻尺寸) 排序的字典列表
+
+    每行包含产品片数（pieces）、原玻片数（sheets）和叠数（stacks，按每叠 nesting_count 片原玻计）。
+    start_date 之前的行只参与累计，不出现在结果中。
+    """
+    if not rows:
+        return []
+
+    columns = list(zip(*rows))
+    product_ids = np.asarray(columns[0], dtype=np.int64)
+    sizes = np.asarray([size or '' for size in columns[1]], dtype=object)
+    cutting = np.maximum(np.asarray(columns[2], dtype=np.int64), 1)
+    nesting = np.maximum(np.asarray(columns[3], dtype=np.int64), 1)
+    workshop_ids = np.asarray(columns[4], dtype=np.int64)
+    workshop_names = columns[5]
+    days = np.asarray(columns[6], dtype='datetime64[D]')
+    quantities = np.asarray(columns[7], dtype=np.int64)
+
+    # 同一产品在不同车间排产时分别累计
+    _, group_codes = np.unique(product_ids * 1000003 + workshop_ids, return_inverse=True)
+    order = np.lexsort((days, group_codes))
+    group_codes = group_codes[order]
+    sheets = _daily_increments(group_codes, quantities[order], cutting[order])
+    stacks = _daily_increments(group_codes, quantities[order], cutting[order] * nesting[order])
+
+    keep = np.ones(len(order), dtype=bool)
+    if start_date is not None:
+        keep = days[order] >= np.datetime64(start_date.date(), 'D')
+    index = order[keep]
+
+    # 按 (原玻尺寸, 车间, 日期) 汇总
+    size_values, size_codes = np.unique(sizes[index].astype(str), return_inverse=True)
+    day_values, day_codes = np.unique(days[index], return_inverse=True)
+    workshop_values, first, workshop_codes = np.unique(workshop_ids[index], return_index=True, return_inverse=True)
+    n_cells = len(size_values) * len(workshop_values) * len(day_values)
+    cell = (day_codes * len(workshop_values) + workshop_codes) * len(size_values) + size_codes
+
+    totals = {
+        name: np.bincount(cell, weights=values, minlength=n_cells).astype(np.int64)
+        for name, values in (('pieces', quantities[index]), ('sheets', sheets[keep]), ('stacks', stacks[keep]))
+    }
+    present = np.bincount(cell, minlength=n_cells) > 0
+
+    result = []
+    for flat in np.flatnonzero(present).tolist():
+        rest, size_code = divmod(flat, len(size_values))
+        day_code, workshop_code = divmod(rest, len(workshop_values))
+        result.append({
+            'date': str(day_values[day_code]),
+            'workshop_id': int(workshop_values[workshop_code]),
+            'workshop': workshop_names[index[first[workshop_code]]],
+            'raw_glass_size': size_values[size_code],
+            'pieces': int(totals['pieces'][flat]),
+            'sheets': int(totals['sheets'][flat]),
+            'stacks': int(totals['stacks'][flat]),
+        })
+    return result
+
+
+def _parse_request():
+    """解析日期范围、车间和工序参数"""
+    try:
+        start_date = datetime.strptime(request.args['start'], '%Y-%m-%d') if request.args.get('start') else None
+        end_date = datetime.strptime(request.args['end'], '%Y-%m-%d') if request.args.get('end') else None
+    except ValueError:
+        raise ValueError('日期格式应为 YYYY-MM-DD')
+    process_name = request.args.get('process', '点胶')
+    if process_name not in MATERIAL_PROCESSES:
+        raise ValueError(f"工序只能是：{'、'.join(MATERIAL_PROCESSES)}")
+    return start_date, end_date, request.args.get('workshop') or None, process_name
+
+
+def build_material_requirements(db, start_date=None, end_date=None, workshop_name=None, process_name='点胶'):
+    """日期范围 [start_date, end_date]（含）内每天的原玻需求"""
+    end_exclusive = end_date + timedelta(days=1) if end_date else None
+    rows = load_material_rows(db, process_name, end_exclusive, workshop_name)
+    return compute_material_requirements(rows, start_date)
+
+
+EXPORT_COLUMNS = [('date', '日期'), ('workshop', '车间'), ('raw_glass_size', '原玻尺寸'),
+                  ('pieces', '产品数量'), ('sheets', '原玻片数'), ('stacks', '叠数')]
+
+
+def iter_material_csv(requirements, chunk_rows=500):
+    """逐块生成 CSV 文本（带 BOM，便于 Excel 识别中文）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow([title for _, title in EXPORT_COLUMNS])
+    for position, row in enumerate(requirements, 1):
+        writer.writerow([row[key] for key, _ in EXPORT_COLUMNS])
+        if position % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def register_material_routes(app, db):
+
+    @app.route('/api/material_requirements')
+    @login_required
+    def material_requirements(user):
+        """原玻需求：?start=&end=&workshop=&process=点胶|切割，按 (日期, 车间, 原玻尺寸) 返回片数和叠数"""
+        try:
+            start_date, end_date, workshop_name, process_name = _parse_request()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        requirements = build_material_requirements(db, start_date, end_date, workshop_name, process_name)
+        totals = {}
+        for row in requirements:
+            total = totals.setdefault(row['raw_glass_size'], {'raw_glass_size': row['raw_glass_size'],
+                                                              'pieces': 0, 'sheets': 0, 'stacks': 0})
+            for key in ('pieces', 'sheets', 'stacks'):
+                total[key] += row[key]
+        return jsonify({
+            'process': process_name,
+            'requirements': requirements,
+            'totals': sorted(totals.values(), key=lambda t: t['raw_glass_size']),
+        })
+
+    @app.route('/api/material_requirements.csv')
+    @login_required
+    def export_material_requirements(user):
+        """原玻需求导出（CSV，流式输出），参数同 /api/material_requirements"""
+        try:
+            start_date, end_date, workshop_name, process_name = _parse_request()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        requirements = build_material_requirements(db, start_date, end_date, workshop_name, process_name)
+        filename = f"material_requirements_{datetime.now().strftime('%Y%m%d%H%M')}.csv"
+        return Response(stream_with_context(iter_material_csv(requirements)), mimetype='text/csv', headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+        })
@@ -1,158 +1,350 @@
 from datetime import datetime
 from enum import Enum
 
-# db实例将在应用初始化后被设置
-db = None
-
-
-def init_models(app_db):
-    """初始化模型，设置db实例"""
-    global db
-    db = app_db
-    
-    # 定义UserRole枚举
-    global UserRole
-    class UserRole(Enum):
-        ADMIN = 'admin'
-        USER = 'user'
-
-    # 定义User模型
-    global User
-    class User(db.Model):
-        """用户模型"""
-        __tablename__ = 'users'
-        
-        id = db.Column(db.Integer, primary_key=True)
-        username = db.Column(db.String(80), unique=True, nullable=False)
-        password = db.Column(db.String(200), nullable=False)  # 存储哈希后的密码
-        role = db.Column(db.Enum(UserRole), nullable=False, default=UserRole.USER)
-        created_at = db.Column(db.DateTime, default=datetime.utcnow)
-        
-        def __repr__(self):
-            return f'<User {self.username}>'
-
-    # 定义Product模型
-    global Product
-    class Product(db.Model):
-        """产品模型"""
-        __tablename__ = 'products'
-        
-        id = db.Column(db.Integer, primary_key=True)
-        product_model = db.Column(db.String(100), nullable=False)  # 产品型号
-        length = db.Column(db.Float, nullable=False)  # 长度(mm)
-        width = db.Column(db.Float, nullable=False)  # 宽度(mm)
-        thickness = db.Column(db.Float, nullable=False)  # 厚度(mm)
-        shipping_quantity = db.Column(db.Integer, nullable=False)  # 出货数量
-        yield_rate = db.Column(db.Float, nullable=False)  # 预估良率
-        shipping_date = db.Column(db.DateTime, nullable=False)  # 出货日期
-        raw_glass_size = db.Column(db.String(100), nullable=False)  # 原玻尺寸
-        workshop = db.Column(db.String(100), nullable=False)  # 生产车间
-        calculated_quantity = db.Column(db.Integer, nullable=False)  # 投产数量
-        nesting_count = db.Column(db.Integer, nullable=False)  # 叠数
-        cutting_count = db.Column(db.Integer, nullable=False)  # 切数
-        created_at = db.Column(db.DateTime, default=datetime.utcnow)
-        updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-        
-        def __repr__(self):
-            return f'<Product {self.product_model}>'
-
-    # 定义Workshop模型
-    global Workshop
-    class Workshop(db.Model):
-        """车间模型"""
-        __tablename__ = 'workshops'
-        
-        id = db.Column(db.Integer, primary_key=True)
-        name = db.Column(db.String(100), nullable=False)  # 车间名称
-        
-        def __repr__(self):
-            return f'<Workshop {self.name}>'
-
-    # 定义Process模型
-    global Process
-    class Process(db.Model):
-        """工序模型"""
-        __tablename__ = 'processes'
-        
-        id = db.Column(db.Integer, primary_key=True)
-        name = db.Column(db.String(100), nullable=False)  # 工序名称
-        workshop_id = db.Column(db.Integer, db.ForeignKey('workshops.id'), nullable=False)
-        created_at = db.Column(db.DateTime, default=datetime.utcnow)
-        
-        # 关联车间
-        workshop = db.relationship('Workshop', backref=db.backref('processes', lazy=True))
-        
-        def __repr__(self):
-            return f'<Process {self.name}>'
-
-    # 定义Equipment模型
-    global Equipment
-    class Equipment(db.Model):
-        """机台模型"""
-        __tablename__ = 'equipments'
-        
-        id = db.Column(db.Integer, primary_key=True)
-        name = db.Column(db.String(100), nullable=False)  # 机台名称
-        process_id = db.Column(db.Integer, db.ForeignKey('processes.id'), nullable=False)
-        quantity = db.Column(db.Integer, nullable=False, default=1)  # 机台数量
-        beat = db.Column(db.Float, nullable=False)  # 节拍（秒/批次）
-        batch_size = db.Column(db.Integer, nullable=False, default=1)  # 每批次数量
-        capacity_per_hour = db.Column(db.Float)  # 每小时产能，由节拍、数量和批次计算得出
-        
-        # 关联工序
-        process = db.relationship('Process', backref=db.backref('equipments', lazy=True))
-        
-        def __repr__(self):
-            return f'<Equipment {self.name}>'
-
-    # 定义Order模型
-    global Order
-    class Order(db.Model):
-        """订单模型"""
-        __tablename__ = 'orders'
-        
-        id = db.Column(db.Integer, primary_key=True)
-        order_number = db.Column(db.String(100), nullable=False, unique=True)  # 订单号
-        product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
-        customer_name = db.Column(db.String(200))  # 客户名称
-        order_status = db.Column(db.String(50), default='pending')  # 订单状态
-        created_at = db.Column(db.DateTime, default=datetime.utcnow)
-        updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-        
-        # 关联产品
-        product = db.relationship('Product', backref=db.backref('orders', lazy=True))
-        
-        def __repr__(self):
-            return f'<Order {self.order_number}>'
-
-    # 定义ProductionSchedule模型
-    global ProductionSchedule
-    class ProductionSchedule(db.Model):
-        """排产计划模型"""
-        __tablename__ = 'production_schedules'
-        
-        id = db.Column(db.Integer, primary_key=True)
-        product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
-        process_id = db.Column(db.Integer, db.ForeignKey('processes.id'), nullable=False)
-        workshop_id = db.Column(db.Integer, db.ForeignKey('workshops.id'), nullable=False)
-        schedule_date = db.Column(db.DateTime, nullable=False)  # 排产日期
-        hour = db.Column(db.Integer, nullable=False)  # 小时（0-23）
-        production_quantity = db.Column(db.Integer, nullable=False, default=0)  # 该小时生产数量
-        
-        # 关联关系
-        product = db.relationship('Product', backref=db.backref('schedules', lazy=True))
-        process = db.relationship('Process', backref=db.backref('schedules', lazy=True))
-        workshop = db.relationship('Workshop', backref=db.backref('schedules', lazy=True))
-        
-        def __repr__(self):
-            return f'<Schedule {self.product_id} on {self.schedule_date} at hour {self.hour}>'
-
-    # 将类设置为模块的属性
-    globals()['UserRole'] = UserRole
-    globals()['User'] = User
-    globals()['Product'] = Product
-    globals()['Workshop'] = Workshop
-    globals()['Process'] = Process
-    globals()['Equipment'] = Equipment
-    globals()['Order'] = Order
-    globals()['ProductionSchedule'] = ProductionSchedule
+from app.extensions import db
+
+
+# 定义UserRole枚举
+class UserRole(Enum):
+    ADMIN = 'admin'
+    USER = 'user'
+
+
+# 定义User模型
+class User(db.Model):
+    """用户模型"""
+    __tablename__ = 'users'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    password = db.Column(db.String(200), nullable=False)  # 存储哈希后的密码
+    role = db.Column(db.Enum(UserRole), nullable=False, default=UserRole.USER)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<User {self.username}>'
+
+
+# 定义ProductMaster模型
+class ProductMaster(db.Model):
+    """产品主数据：按 (型号, 长, 宽, 厚, 原玻尺寸) 去重的产品规格，缓存由规格计算的叠数和切数"""
+    __tablename__ = 'product_masters'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    spec_hash = db.Column(db.String(40), nullable=False, unique=True)  # 规格哈希（见 app.product_master.spec_hash）
+    product_model = db.Column(db.String(100), nullable=False)  # 产品型号
+    length = db.Column(db.Float, nullable=False)  # 长度(mm)
+    width = db.Column(db.Float, nullable=False)  # 宽度(mm)
+    thickness = db.Column(db.Float, nullable=False)  # 厚度(mm)
+    raw_glass_size = db.Column(db.String(100), nullable=False)  # 原玻尺寸
+    nesting_count = db.Column(db.Integer, nullable=False)  # 叠数
+    cutting_count = db.Column(db.Integer, nullable=False)  # 切数
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ProductMaster {self.product_model} {self.length}x{self.width}x{self.thickness}>'
+
+
+# 定义Product模型
+class Product(db.Model):
+    """产品模型"""
+    __tablename__ = 'products'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    product_model = db.Column(db.String(100), nullable=False)  # 产品型号
+    length = db.Column(db.Float, nullable=False)  # 长度(mm)
+    width = db.Column(db.Float, nullable=False)  # 宽度(mm)
+    thickness = db.Column(db.Float, nullable=False)  # 厚度(mm)
+    shipping_quantity = db.Column(db.Integer, nullable=False)  # 出货数量
+    yield_rate = db.Column(db.Float, nullable=False)  # 预估良率
+    shipping_date = db.Column(db.DateTime, nullable=False)  # 出货日期
+    raw_glass_size = db.Column(db.String(100), nullable=False)  # 原玻尺寸
+    workshop = db.Column(db.String(100), nullable=False)  # 生产车间
+    workshop_flexible = db.Column(db.Boolean, nullable=False, default=False)  # 可由负载均衡调整生产车间（或拆分到多个车间）
+    calculated_quantity = db.Column(db.Integer, nullable=False)  # 投产数量
+    nesting_count = db.Column(db.Integer, nullable=False)  # 叠数
+    cutting_count = db.Column(db.Integer, nullable=False)  # 切数
+    product_master_id = db.Column(db.Integer, db.ForeignKey('product_masters.id'), index=True)  # 产品主数据
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 关联产品主数据
+    product_master = db.relationship('ProductMaster', backref=db.backref('products', lazy=True))
+    
+    def __repr__(self):
+        return f'<Product {self.product_model}>'
+
+
+# 定义Workshop模型
+class Workshop(db.Model):
+    """车间模型"""
+    __tablename__ = 'workshops'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)  # 车间名称
+    
+    def __repr__(self):
+        return f'<Workshop {self.name}>'
+
+
+# 定义Process模型
+class Process(db.Model):
+    """工序模型"""
+    __tablename__ = 'processes'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)  # 工序名称
+    workshop_id = db.Column(db.Integer, db.ForeignKey('workshops.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # 关联车间
+    workshop = db.relationship('Workshop', backref=db.backref('processes', lazy=True))
+    
+    def __repr__(self):
+        return f'<Process {self.name}>'
+
+
+# 定义Equipment模型
+class Equipment(db.Model):
+    """机台模型"""
+    __tablename__ = 'equipments'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)  # 机台名称
+    process_id = db.Column(db.Integer, db.ForeignKey('processes.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=1)  # 机台数量
+    beat = db.Column(db.Float, nullable=False)  # 节拍（秒/批次）
+    batch_size = db.Column(db.Integer, nullable=False, default=1)  # 每批次数量
+    capacity_per_hour = db.Column(db.Float)  # 每小时产能，由节拍、数量和批次计算得出
+    
+    # 关联工序
+    process = db.relationship('Process', backref=db.backref('equipments', lazy=True))
+    
+    def __repr__(self):
+        return f'<Equipment {self.name}>'
+
+
+# 定义ChangeoverRule模型
+class ChangeoverRule(db.Model):
+    """换型时间：某工序从一种产品切换到另一种产品所需的准备时间
+
+    match_by 为 model 时按产品型号匹配，为 class 时按规格类别（"厚度/原玻尺寸"，如 0.1/500x400）匹配；
+    from_value、to_value 为 * 时匹配任意值。
+    """
+    __tablename__ = 'changeover_rules'
+    __table_args__ = (
+        db.UniqueConstraint('process_name', 'match_by', 'from_value', 'to_value', name='uq_changeover_rules_pair'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    process_name = db.Column(db.String(100), nullable=False)  # 工序名称（各车间同名工序共用）
+    match_by = db.Column(db.String(20), nullable=False, default='model')  # model 或 class
+    from_value = db.Column(db.String(100), nullable=False)  # 切换前的型号或规格类别
+    to_value = db.Column(db.String(100), nullable=False)  # 切换后的型号或规格类别
+    minutes = db.Column(db.Float, nullable=False)  # 换型时间（分钟）
+    
+    def __repr__(self):
+        return f'<ChangeoverRule {self.process_name} {self.from_value}->{self.to_value}>'
+
+
+# 定义Order模型
+class Order(db.Model):
+    """订单模型"""
+    __tablename__ = 'orders'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    order_number = db.Column(db.String(100), nullable=False, unique=True)  # 订单号
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    product_master_id = db.Column(db.Integer, db.ForeignKey('product_masters.id'), index=True)  # 产品主数据，与产品一致
+    customer_name = db.Column(db.String(200))  # 客户名称
+    order_status = db.Column(db.String(50), default='pending')  # 订单状态
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # 排产汇总：生成或修改排程时写入，订单列表按完工时间和交期余量排序、筛选时无需聚合排程记录
+    planned_start = db.Column(db.DateTime)  # 计划开始时间（第一个有产出的小时）
+    planned_completion = db.Column(db.DateTime, index=True)  # 预计完工时间（最后一个有产出的小时结束时刻）
+    slack_hours = db.Column(db.Float, index=True)  # 交期余量（小时）：出货日期 - 预计完工时间，负数表示延期
+    plan_complete = db.Column(db.Boolean)  # 排程能否排完订单数量；为 False 时预计完工和交期余量为空，视为延期
+    plan_updated_at = db.Column(db.DateTime)  # 排产汇总更新时间
+    
+    # 关联产品
+    product = db.relationship('Product', backref=db.backref('orders', lazy=True))
+    product_master = db.relationship('ProductMaster', backref=db.backref('orders', lazy=True))
+    
+    @property
+    def is_late(self):
+        return self.plan_complete is False or (self.slack_hours is not None and self.slack_hours < 0)
+    
+    def __repr__(self):
+        return f'<Order {self.order_number}>'
+
+
+# 定义OrderProcessSummary模型
+class OrderProcessSummary(db.Model):
+    """订单在各工序上的排产汇总：首个生产小时、最后完成时刻和排产数量"""
+    __tablename__ = 'order_process_summaries'
+    
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), primary_key=True)
+    process_id = db.Column(db.Integer, db.ForeignKey('processes.id', ondelete='CASCADE'), primary_key=True)
+    first_start = db.Column(db.DateTime, nullable=False)  # 首个生产小时
+    last_finish = db.Column(db.DateTime, nullable=False)  # 最后一个生产小时的结束时刻
+    quantity = db.Column(db.Integer, nullable=False, default=0)  # 该工序排产总数量
+    
+    process = db.relationship('Process')
+    
+    def __repr__(self):
+        return f'<OrderProcessSummary {self.order_id}:{self.process_id}>'
+
+
+# 定义ProductionSchedule模型
+class ProductionSchedule(db.Model):
+    """排产计划模型"""
+    __tablename__ = 'production_schedules'
+    __table_args__ = (
+        # 按车间和日期范围查询、删除排程时使用
+        db.Index('ix_production_schedules_workshop_date', 'workshop_id', 'schedule_date', 'hour'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    process_id = db.Column(db.Integer, db.ForeignKey('processes.id'), nullable=False)
+    workshop_id = db.Column(db.Integer, db.ForeignKey('workshops.id'), nullable=False)
+    schedule_date = db.Column(db.DateTime, nullable=False, index=True)  # 排产日期
+    hour = db.Column(db.Integer, nullable=False)  # 小时（0-23）
+    production_quantity = db.Column(db.Integer, nullable=False, default=0)  # 该小时生产数量
+    schedule_version_id = db.Column(db.Integer, db.ForeignKey('schedule_versions.id', ondelete='SET NULL'),
+                                    nullable=True, index=True)  # 生成该排程的版本
+    
+    # 关联关系
+    product = db.relationship('Product', backref=db.backref('schedules', lazy=True))
+    process = db.relationship('Process', backref=db.backref('schedules', lazy=True))
+    workshop = db.relationship('Workshop', backref=db.backref('schedules', lazy=True))
+    
+    def __repr__(self):
+        return f'<Schedule {self.product_id} on {self.schedule_date} at hour {self.hour}>'
+
+
+# 定义ScheduleVersion模型
+class ScheduleVersion(db.Model):
+    """排程版本模型：每次生成排程都会保存一个版本"""
+    __tablename__ = 'schedule_versions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    created_by = db.Column(db.String(80))  # 生成排程的用户
+    plan_start = db.Column(db.DateTime)  # 排程起点时间
+    note = db.Column(db.String(200))  # 版本备注
+    order_count = db.Column(db.Integer, nullable=False, default=0)  # 包含的订单数
+    row_count = db.Column(db.Integer, nullable=False, default=0)  # 排程记录数
+    total_quantity = db.Column(db.Integer, nullable=False, default=0)  # 排产总数量
+    
+    def __repr__(self):
+        return f'<ScheduleVersion {self.id}>'
+
+
+# 定义ScheduleBlock模型
+class ScheduleBlock(db.Model):
+    """排程数据块：单个订单的压缩排程，按内容摘要去重，多个版本可共享"""
+    __tablename__ = 'schedule_blocks'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    digest = db.Column(db.String(64), nullable=False, unique=True)  # 内容摘要（sha256）
+    row_count = db.Column(db.Integer, nullable=False)  # 排程记录数
+    payload = db.Column(db.LargeBinary(length=2 ** 24), nullable=False)  # 差分编码并压缩后的排程数据
+    
+    def __repr__(self):
+        return f'<ScheduleBlock {self.digest[:12]}>'
+
+
+# 定义ScheduleVersionBlock模型
+class ScheduleVersionBlock(db.Model):
+    """排程版本与数据块的关联，记录该订单在版本中的起始小时"""
+    __tablename__ = 'schedule_version_blocks'
+    
+    version_id = db.Column(db.Integer, db.ForeignKey('schedule_versions.id', ondelete='CASCADE'), primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True)  # 产品ID（订单删除后仍保留历史）
+    workshop_id = db.Column(db.Integer, nullable=False)
+    block_id = db.Column(db.Integer, db.ForeignKey('schedule_blocks.id'), nullable=False, index=True)
+    base_hour = db.Column(db.BigInteger, nullable=False)  # 起始小时（自1970-01-01起的小时数）
+    
+    block = db.relationship('ScheduleBlock')
+    
+    def __repr__(self):
+        return f'<ScheduleVersionBlock {self.version_id}:{self.product_id}>'
+
+
+# 定义ScheduleEvent模型
+class ScheduleEvent(db.Model):
+    """排程变更事件：生成或删除排程后写入，由 SSE 接口推送给打开排产页面的客户端
+
+    写入数据库而不是进程内队列，多个 gunicorn 工作进程都能读到同一组事件。
+    """
+    __tablename__ = 'schedule_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    workshop_id = db.Column(db.Integer)  # 为空表示影响所有车间
+    payload = db.Column(db.Text, nullable=False)  # JSON 格式的变更内容
+    
+    def __repr__(self):
+        return f'<ScheduleEvent {self.id}>'
+
+
+# 定义ProductionActual模型
+class ProductionActual(db.Model):
+    """实际产量：按 (车间, 工序, 机台, 日期, 小时) 汇总的产线报工数量"""
+    __tablename__ = 'production_actuals'
+    __table_args__ = (
+        db.UniqueConstraint('workshop_id', 'process_id', 'equipment_id', 'schedule_date', 'hour',
+                            name='uq_production_actuals_slot'),
+        db.Index('ix_production_actuals_workshop_date', 'workshop_id', 'schedule_date', 'hour'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    workshop_id = db.Column(db.Integer, db.ForeignKey('workshops.id'), nullable=False)
+    process_id = db.Column(db.Integer, db.ForeignKey('processes.id'), nullable=False)
+    equipment_id = db.Column(db.Integer, nullable=False, default=0)  # 机台ID，0 表示按工序报工
+    schedule_date = db.Column(db.DateTime, nullable=False)  # 日期（零点）
+    hour = db.Column(db.Integer, nullable=False)  # 小时 (0-23)
+    quantity = db.Column(db.Integer, nullable=False, default=0)  # 实际产量
+    report_count = db.Column(db.Integer, nullable=False, default=0)  # 汇总的报工条数
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ProductionActual {self.workshop_id}-{self.process_id}-{self.equipment_id} {self.schedule_date} {self.hour}>'
+
+
+# 定义ArchiveChunk模型
+class ArchiveChunk(db.Model):
+    """归档数据块：一次归档写入的 gzip 压缩文件，写入后不再修改"""
+    __tablename__ = 'archive_chunks'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(500), nullable=False, unique=True)  # 文件路径（相对 ARCHIVE_DIR）
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    cutoff = db.Column(db.DateTime, nullable=False)  # 归档截止时间
+    order_count = db.Column(db.Integer, nullable=False, default=0)  # 订单数
+    row_count = db.Column(db.Integer, nullable=False, default=0)  # 排程记录数
+    size_bytes = db.Column(db.BigInteger, nullable=False, default=0)  # 文件大小
+    sha256 = db.Column(db.String(64), nullable=False)  # 文件摘要，读取时校验
+    
+    def __repr__(self):
+        return f'<ArchiveChunk {self.path}>'
+
+
+# 定义ArchivedOrder模型
+class ArchivedOrder(db.Model):
+    """已归档订单的索引：订单从 orders 表删除后，按原订单ID或订单号找到所在的归档数据块"""
+    __tablename__ = 'archived_orders'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, nullable=False, index=True)  # 原订单ID（SQLite 可能复用已删除的ID，按归档时间取最新）
+    order_number = db.Column(db.String(100), nullable=False, index=True)
+    product_id = db.Column(db.Integer, nullable=False)  # 原产品ID
+    chunk_id = db.Column(db.Integer, db.ForeignKey('archive_chunks.id'), nullable=False, index=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    chunk = db.relationship('ArchiveChunk')
+    
+    def __repr__(self):
+        return f'<ArchivedOrder {self.order_number}>'
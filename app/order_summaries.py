@@ -0,0 +1,171 @@
+"""订单排产汇总
+
+生成、恢复或删除排程后，把每个订单的计划开始时间、预计完工时间、交期余量
+写入 orders 表的冗余字段，各工序的首个生产小时和最后完成时刻写入
+order_process_summaries 表。订单列表和详情页直接读取这些字段，按完工时间或
+延期情况排序、筛选时走索引，不再在读取时聚合 production_schedules。
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+
+def _hour_start(schedule_date, hour):
+    return datetime(schedule_date.year, schedule_date.month, schedule_date.day) + timedelta(hours=int(hour))
+
+
+def _merge(processes, process_id, first, last, quantity):
+    current = processes.get(process_id)
+    if current is None:
+        processes[process_id] = [first, last, quantity]
+    else:
+        current[0] = min(current[0], first)
+        current[1] = max(current[1], last)
+        current[2] += quantity
+
+
+def summarize_rows(rows):
+    """由排程行（字典）计算 {产品ID: {工序ID: [首个生产小时, 最后完成时刻, 数量]}}"""
+    summaries = {}
+    for row in rows:
+        start = _hour_start(row['schedule_date'], row['hour'])
+        _merge(summaries.setdefault(row['product_id'], {}), row['process_id'],
+               start, start + timedelta(hours=1), row['production_quantity'])
+    return summaries
+
+
+def _product_chunks(product_ids, size=1000):
+    product_ids = sorted(product_ids)
+    for start in range(0, len(product_ids), size):
+        yield product_ids[start:start + size]
+
+
+def scheduled_product_ids(db, *criteria):
+    """满足条件的排程涉及的产品ID（删除排程前调用，删除后只刷新这些产品的订单汇总）"""
+    from app.models import ProductionSchedule
+
+    return {product_id for (product_id,) in db.session.query(ProductionSchedule.product_id).filter(
+        *criteria).distinct().all()}
+
+
+def summarize_schedules(db, product_ids=None):
+    """从 production_schedules 按 (产品, 工序, 日期) 分组汇总，结构与 summarize_rows 相同
+
+    指定 product_ids 时只汇总这些产品的排程。
+    """
+    from app.models import ProductionSchedule
+
+    query = db.session.query(
+        ProductionSchedule.product_id, ProductionSchedule.process_id, ProductionSchedule.schedule_date,
+        func.min(ProductionSchedule.hour), func.max(ProductionSchedule.hour),
+        func.sum(ProductionSchedule.production_quantity)
+    ).group_by(
+        ProductionSchedule.product_id, ProductionSchedule.process_id, ProductionSchedule.schedule_date
+    )
+    if product_ids is None:
+        batches = [query.all()]
+    else:
+        batches = (query.filter(ProductionSchedule.product_id.in_(chunk)).all()
+                   for chunk in _product_chunks(product_ids))
+
+    summaries = {}
+    for rows in batches:
+        for product_id, process_id, schedule_date, first_hour, last_hour, quantity in rows:
+            _merge(summaries.setdefault(product_id, {}), process_id,
+                   _hour_start(schedule_date, first_hour),
+                   _hour_start(schedule_date, last_hour) + timedelta(hours=1),
+                   int(quantity or 0))
+    return summaries
+
+
+def final_process_ids(db):
+    """各车间按标准流程排在最后的工序ID，{车间名: 工序ID}；订单在该工序上排满数量才算排完"""
+    from app.models import Process, Workshop
+    from app.scheduler import PROCESS_SEQUENCE
+
+    rank = {name: index for index, name in enumerate(PROCESS_SEQUENCE)}
+    final = {}
+    for workshop_name, process_id, process_name in db.session.query(
+        Workshop.name, Process.id, Process.name
+    ).join(Process, Process.workshop_id == Workshop.id).order_by(Process.id).all():
+        if process_name not in rank:
+            continue
+        current = final.get(workshop_name)
+        if current is None or rank[process_name] > current[1]:
+            final[workshop_name] = (process_id, rank[process_name])
+    return {workshop_name: process_id for workshop_name, (process_id, _) in final.items()}
+
+
+def write_order_summaries(db, summaries, product_ids=None, plans=None):
+    """写入订单排产汇总（不提交），没有排程的订单清空汇总字段，返回排完的订单数
+
+    指定 product_ids 时只更新这些产品的订单，其他订单的汇总保持不变。
+    plans 为 run_schedule 返回的订单汇总（以订单ID为键），提供时使用其中的是否排完和完工时间
+    （离散事件引擎精确到分钟）；否则按最后一道工序的排产数量是否达到投产数量判断。
+    排不完的订单（如某道工序没有机台）预计完工和交期余量为空，plan_complete 为 False。
+    """
+    from app.models import Order, OrderProcessSummary, Product
+
+    plans = plans or {}
+    final_processes = final_process_ids(db)
+    query = db.session.query(
+        Order.id, Order.product_id, Product.shipping_date, Product.workshop, Product.calculated_quantity
+    ).join(Product, Product.id == Order.product_id)
+    if product_ids is None:
+        orders = query.all()
+    else:
+        orders = [row for chunk in _product_chunks(product_ids)
+                  for row in query.filter(Order.product_id.in_(chunk)).all()]
+
+    now = datetime.utcnow()
+    order_updates = []
+    process_rows = []
+    for order_id, product_id, shipping_date, workshop, quantity in orders:
+        processes = summaries.get(product_id)
+        if not processes:
+            order_updates.append({'id': order_id, 'planned_start': None, 'planned_completion': None,
+                                  'slack_hours': None, 'plan_complete': None, 'plan_updated_at': now})
+            continue
+
+        planned_start = min(p[0] for p in processes.values())
+        plan = plans.get(order_id)
+        if plan is not None:
+            complete = bool(plan['completed'])
+            planned_completion = plan['completion_time']
+        else:
+            final = processes.get(final_processes.get(workshop))
+            complete = final is not None and final[2] >= (quantity or 0)
+            planned_completion = max(p[1] for p in processes.values())
+        slack_hours = None
+        if not complete:
+            planned_completion = None
+        elif shipping_date:
+            slack_hours = round((shipping_date - planned_completion).total_seconds() / 3600, 1)
+        order_updates.append({'id': order_id, 'planned_start': planned_start,
+                              'planned_completion': planned_completion,
+                              'slack_hours': slack_hours, 'plan_complete': complete, 'plan_updated_at': now})
+        for process_id, (first_start, last_finish, quantity) in processes.items():
+            process_rows.append({'order_id': order_id, 'process_id': process_id,
+                                 'first_start': first_start, 'last_finish': last_finish,
+                                 'quantity': quantity})
+
+    # 按订单ID分批删除旧的工序汇总，每条语句锁定的行数有上限
+    order_ids = [update['id'] for update in order_updates]
+    for start in range(0, len(order_ids), 1000):
+        db.session.query(OrderProcessSummary).filter(
+            OrderProcessSummary.order_id.in_(order_ids[start:start + 1000])).delete(synchronize_session=False)
+    db.session.bulk_update_mappings(Order, order_updates)
+    db.session.bulk_insert_mappings(OrderProcessSummary, process_rows)
+    return sum(1 for update in order_updates if update['planned_completion'] is not None)
+
+
+def refresh_order_summaries(db, product_ids=None):
+    """按当前 production_schedules 重新计算并提交订单排产汇总（用于删除排程之后）
+
+    product_ids 为删除的排程涉及的产品，只重新汇总这些产品的订单；不指定时刷新全部订单。
+    """
+    if product_ids is not None and not product_ids:
+        return 0
+    count = write_order_summaries(db, summarize_schedules(db, product_ids), product_ids)
+    db.session.commit()
+    return count
@@ -0,0 +1,255 @@
+"""production_schedules 按日期分区（仅 MySQL）
+
+启用后表按 schedule_date 做 RANGE COLUMNS 分区，每天一个分区（命名 pYYYYMMDD），
+另有 p_history（早于第一个日分区的数据）和 p_future（MAXVALUE，兜底）两个分区。
+按日期范围查询时 MySQL 只扫描相关分区；删除某天的排程变为 TRUNCATE PARTITION，
+过期数据直接 DROP PARTITION，耗时与数据量无关。
+
+MySQL 分区表不支持外键，且主键必须包含分区列，因此启用分区时会删除该表的外键，
+并将主键改为 (id, schedule_date)。引用完整性由应用层保证（删除订单时会一并删除排程）。
+
+SQLite 等其他数据库上所有函数都是空操作，调用方按普通表处理。
+"""
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import inspect, text
+
+TABLE_NAME = 'production_schedules'
+HISTORY_PARTITION = 'p_history'
+FUTURE_PARTITION = 'p_future'
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    return value
+
+
+def partition_name(day):
+    return 'p' + _as_date(day).strftime('%Y%m%d')
+
+
+def _partition_day(name):
+    """从分区名解析日期，非日分区返回None"""
+    try:
+        return datetime.strptime(name[1:], '%Y%m%d').date()
+    except ValueError:
+        return None
+
+
+def _day_partition_sql(day):
+    upper = _as_date(day) + timedelta(days=1)
+    return f"PARTITION {partition_name(day)} VALUES LESS THAN ('{upper:%Y-%m-%d} 00:00:00')"
+
+
+def is_supported(connection):
+    return connection.dialect.name == 'mysql'
+
+
+def list_partitions(connection):
+    """返回表的分区名列表（按顺序），未分区或不支持时返回空列表"""
+    if not is_supported(connection):
+        return []
+    rows = connection.execute(text(
+        'SELECT PARTITION_NAME FROM information_schema.PARTITIONS '
+        'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL '
+        'ORDER BY PARTITION_ORDINAL_POSITION'
+    ), {'table': TABLE_NAME}).fetchall()
+    return [row[0] for row in rows]
+
+
+def is_partitioned(connection):
+    return bool(list_partitions(connection))
+
+
+def day_partitions(connection):
+    """返回 {日期: 分区名}"""
+    result = {}
+    for name in list_partitions(connection):
+        day = _partition_day(name)
+        if day is not None:
+            result[day] = name
+    return result
+
+
+def enable_partitioning(connection, start_day=None, days_ahead=60):
+    """将 production_schedules 转换为按天分区的表
+
+    删除该表的外键，主键改为 (id, schedule_date)，并创建从 start_day 起
+    days_ahead 天的日分区。已分区或非 MySQL 时不做任何操作，返回是否执行了转换。
+    """
+    if not is_supported(connection) or is_partitioned(connection):
+        return False
+
+    start_day = _as_date(start_day) if start_day else date.today()
+
+    inspector = inspect(connection)
+    for foreign_key in inspector.get_foreign_keys(TABLE_NAME):
+        connection.execute(text(f"ALTER TABLE {TABLE_NAME} DROP FOREIGN KEY `{foreign_key['name']}`"))
+
+    connection.execute(text(
+        f'ALTER TABLE {TABLE_NAME} DROP PRIMARY KEY, ADD PRIMARY KEY (id, schedule_date)'
+    ))
+
+    partitions = [f"PARTITION {HISTORY_PARTITION} VALUES LESS THAN ('{start_day:%Y-%m-%d} 00:00:00')"]
+    partitions += [_day_partition_sql(start_day + timedelta(days=i)) for i in range(days_ahead + 1)]
+    partitions.append(f'PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)')
+    connection.execute(text(
+        f'ALTER TABLE {TABLE_NAME} PARTITION BY RANGE COLUMNS(schedule_date) ({", ".join(partitions)})'
+    ))
+    return True
+
+
+def disable_partitioning(connection):
+    """取消分区并恢复单列主键和外键，非 MySQL 或未分区时不做任何操作"""
+    if not is_supported(connection) or not is_partitioned(connection):
+        return False
+
+    connection.execute(text(f'ALTER TABLE {TABLE_NAME} REMOVE PARTITIONING'))
+    connection.execute(text(f'ALTER TABLE {TABLE_NAME} DROP PRIMARY KEY, ADD PRIMARY KEY (id)'))
+    for column, target in (('product_id', 'products'), ('process_id', 'processes'), ('workshop_id', 'workshops')):
+        connection.execute(text(
+            f'ALTER TABLE {TABLE_NAME} ADD CONSTRAINT fk_{TABLE_NAME}_{column} '
+            f'FOREIGN KEY ({column}) REFERENCES {target} (id)'
+        ))
+    connection.execute(text(
+        f'ALTER TABLE {TABLE_NAME} ADD CONSTRAINT fk_production_schedules_schedule_version_id '
+        f'FOREIGN KEY (schedule_version_id) REFERENCES schedule_versions (id) ON DELETE SET NULL'
+    ))
+    return True
+
+
+def ensure_future_partitions(connection, days_ahead=60, today=None):
+    """预先创建到 today + days_ahead 为止的日分区（从 p_future 拆分），返回新建的分区名"""
+    existing = day_partitions(connection)
+    if not existing:
+        return []
+
+    today = _as_date(today) if today else date.today()
+    last_day = max(existing)
+    target_day = today + timedelta(days=days_ahead)
+    if last_day >= target_day:
+        return []
+
+    # 分区范围必须连续，新分区从最后一个日分区的下一天开始
+    new_days = []
+    day = last_day + timedelta(days=1)
+    while day <= target_day:
+        new_days.append(day)
+        day += timedelta(days=1)
+
+    partitions = [_day_partition_sql(d) for d in new_days]
+    partitions.append(f'PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)')
+    connection.execute(text(
+        f'ALTER TABLE {TABLE_NAME} REORGANIZE PARTITION {FUTURE_PARTITION} INTO ({", ".join(partitions)})'
+    ))
+    return [partition_name(d) for d in new_days]
+
+
+def drop_expired_partitions(connection, retain_days=180, today=None):
+    """删除早于 today - retain_days 的日分区，并清空 p_history，返回删除的分区名"""
+    existing = day_partitions(connection)
+    if not existing:
+        return []
+
+    today = _as_date(today) if today else date.today()
+    cutoff = today - timedelta(days=retain_days)
+    expired = [existing[day] for day in sorted(existing) if day < cutoff]
+    # 至少保留一个日分区，作为后续拆分 p_future 的起点
+    if len(expired) == len(existing):
+        expired = expired[:-1]
+
+    if HISTORY_PARTITION in list_partitions(connection) and min(existing) <= cutoff:
+        connection.execute(text(f'ALTER TABLE {TABLE_NAME} TRUNCATE PARTITION {HISTORY_PARTITION}'))
+    if expired:
+        connection.execute(text(f'ALTER TABLE {TABLE_NAME} DROP PARTITION {", ".join(expired)}'))
+    return expired
+
+
+def truncate_day_partition(connection, day):
+    """清空某一天的分区，该天没有独立分区时返回False，由调用方改用普通删除"""
+    name = day_partitions(connection).get(_as_date(day))
+    if name is None:
+        return False
+    connection.execute(text(f'ALTER TABLE {TABLE_NAME} TRUNCATE PARTITION {name}'))
+    return True
+
+
+def skip_partition_foreign_keys(object, name, type_, reflected, compare_to):
+    """autogenerate 的 include_object 过滤：不比较 production_schedules 的外键
+
+    分区表没有外键（由应用层维护），模型仍声明外键以便 ORM 关联和非分区数据库建表；
+    启用分区后 migrations/env.py 使用该过滤，flask db migrate 不会生成重新添加外键的迁移。
+    主键 (id, schedule_date) 的差异 autogenerate 本身不比较。
+    """
+    if type_ == 'foreign_key_constraint':
+        table = getattr(object, 'table', None)
+        if table is not None and table.name == TABLE_NAME:
+            return False
+    return True
+
+
+def partitioning_enabled():
+    return current_app.config.get('SCHEDULE_PARTITIONING', False)
+
+
+# 命令行：flask schedule-partitions ...
+partition_cli = AppGroup('schedule-partitions', help='production_schedules 日期分区维护（仅 MySQL）')
+
+
+@partition_cli.command('status')
+def status_command():
+    """显示分区情况"""
+    from app.extensions import db
+
+    with db.engine.connect() as connection:
+        if not is_supported(connection):
+            click.echo(f'当前数据库（{connection.dialect.name}）不支持分区，使用普通表。')
+            return
+        days = sorted(day_partitions(connection))
+        if not days:
+            click.echo('production_schedules 未分区。')
+            return
+        click.echo(f'共 {len(days)} 个日分区：{days[0]} ~ {days[-1]}')
+
+
+@partition_cli.command('enable')
+@click.option('--start', 'start_day', default=None, help='第一个日分区的日期（YYYY-MM-DD），默认今天')
+@click.option('--ahead', 'days_ahead', type=int, default=None, help='预先创建的天数')
+def enable_command(start_day, days_ahead):
+    """将 production_schedules 转换为按天分区的表"""
+    from app.extensions import db
+
+    if days_ahead is None:
+        days_ahead = current_app.config.get('SCHEDULE_PARTITION_DAYS_AHEAD', 60)
+    with db.engine.begin() as connection:
+        if enable_partitioning(connection, start_day, days_ahead):
+            click.echo('已启用分区。')
+        else:
+            click.echo('无需转换：数据库不支持分区或表已分区。')
+
+
+@partition_cli.command('maintain')
+@click.option('--ahead', 'days_ahead', type=int, default=None, help='预先创建的天数')
+@click.option('--retain', 'retain_days', type=int, default=None, help='保留的历史天数')
+def maintain_command(days_ahead, retain_days):
+    """预先创建未来分区并删除过期分区，建议每天定时执行"""
+    from app.extensions import db
+
+    if days_ahead is None:
+        days_ahead = current_app.config.get('SCHEDULE_PARTITION_DAYS_AHEAD', 60)
+    if retain_days is None:
+        retain_days = current_app.config.get('SCHEDULE_PARTITION_RETAIN_DAYS', 180)
+
+    with db.engine.begin() as connection:
+        if not is_partitioned(connection):
+            click.echo('production_schedules 未分区，无需维护。')
+            return
+        created = ensure_future_partitions(connection, days_ahead)
+        dropped = drop_expired_partitions(connection, retain_days)
+    click.echo(f'新建 {len(created)} 个分区，删除 {len(dropped)} 个过期分区。')
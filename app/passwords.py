@@ -0,0 +1,53 @@
+"""密码哈希策略
+
+哈希算法和参数由 PASSWORD_HASH_METHOD 配置（Werkzeug 格式，如 pbkdf2:sha256:260000、
+scrypt:16384:8:1）。哈希值的前缀记录了生成时使用的算法和参数，登录成功时如果与当前配置
+不一致，用刚验证过的明文按当前配置重新哈希，调整参数后无需用户修改密码即可逐步迁移。
+"""
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# Werkzeug 的默认值（pbkdf2:sha256:600000）单次验证约 200ms，交接班集中登录时会占满 CPU
+DEFAULT_METHOD = 'pbkdf2:sha256:260000'
+
+# scrypt 的默认参数 n:r:p，与 Werkzeug 一致
+_SCRYPT_DEFAULTS = ('32768', '8', '1')
+
+
+def canonical_method(method):
+    """补全省略的参数，使其与哈希值中记录的前缀一致（如 pbkdf2 -> pbkdf2:sha256:600000）"""
+    parts = method.split(':')
+    if parts[0] == 'pbkdf2':
+        hash_name = parts[1] if len(parts) > 1 else 'sha256'
+        iterations = parts[2] if len(parts) > 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{int(iterations)}'
+    if parts[0] == 'scrypt':
+        params = parts[1:] + list(_SCRYPT_DEFAULTS[len(parts) - 1:])
+        return 'scrypt:' + ':'.join(str(int(p)) for p in params)
+    return method
+
+
+def password_method():
+    """当前配置的哈希算法和参数"""
+    return canonical_method(current_app.config.get('PASSWORD_HASH_METHOD') or DEFAULT_METHOD)
+
+
+def hash_password(password):
+    """按当前配置哈希密码"""
+    return generate_password_hash(password, method=password_method())
+
+
+def needs_rehash(password_hash):
+    """哈希值使用的算法或参数与当前配置不一致时返回 True"""
+    return password_hash.split('$', 1)[0] != password_method()
+
+
+def verify_password(user, password, rehash=False):
+    """验证用户密码；rehash 为 True 且验证成功时按当前配置更新 user.password（由调用方提交）"""
+    if not password or not user.password:
+        return False
+    if not check_password_hash(user.password, password):
+        return False
+    if rehash and needs_rehash(user.password):
+        user.password = hash_password(password)
+    return True
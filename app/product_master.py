@@ -0,0 +1,91 @@
+"""产品主数据
+
+订单的产品规格（型号、长、宽、厚、原玻尺寸）大量重复，而叠数、切数只由规格决定，
+其中切数的排布计算还比较耗时。产品主数据按规格去重并缓存这两个值：创建、修改订单时
+按规格查找主数据，只有新规格才需要计算；订单和产品都关联到主数据，按真实产品分组统计时
+只需对这张小表分组。
+
+长、宽、厚是浮点数，按数值直接比较会因 MySQL FLOAT 的单精度存储而匹配不上（0.1 存入后
+读出为 0.100000001…）。规格统一按 0.001mm 取整后计算哈希（spec_hash），唯一索引和查找都使用
+这一列，不依赖浮点数相等。
+"""
+import hashlib
+import json
+
+from sqlalchemy.exc import IntegrityError
+
+from app.calculations import calculate_cutting_count, calculate_nesting_count
+
+# 批量查找时每条 IN 查询的规格数
+LOOKUP_CHUNK_SIZE = 500
+
+
+# 长、宽、厚取整的小数位数（mm）
+SPEC_DECIMALS = 3
+
+
+def spec_key(product_model, length, width, thickness, raw_glass_size):
+    """规格的统一表示（尺寸按 SPEC_DECIMALS 位小数取整），用作查找键"""
+    return (product_model, round(float(length), SPEC_DECIMALS), round(float(width), SPEC_DECIMALS),
+            round(float(thickness), SPEC_DECIMALS), raw_glass_size)
+
+
+def spec_hash(key):
+    """规格键的哈希（product_masters.spec_hash），迁移脚本中有相同的实现"""
+    return hashlib.sha1(json.dumps(list(key), ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def resolve_product_masters(db, specs):
+    """按规格批量查找产品主数据，不存在的规格计算叠数、切数后创建（只 flush，由调用方提交）
+
+    specs 为 (型号, 长, 宽, 厚, 原玻尺寸) 的列表，返回 {spec_key: ProductMaster}。
+    """
+    from app.models import ProductMaster
+
+    hashes = {spec_hash(key): key for key in {spec_key(*spec) for spec in specs}}
+    keys = list(hashes.values())
+    masters = {}
+    chunks = list(hashes)
+    for start in range(0, len(chunks), LOOKUP_CHUNK_SIZE):
+        chunk = chunks[start:start + LOOKUP_CHUNK_SIZE]
+        for master in ProductMaster.query.filter(ProductMaster.spec_hash.in_(chunk)).all():
+            masters[hashes[master.spec_hash]] = master
+
+    for key in keys:
+        if key in masters:
+            continue
+        product_model, length, width, thickness, raw_glass_size = key
+        master = ProductMaster(
+            spec_hash=spec_hash(key),
+            product_model=product_model,
+            length=length,
+            width=width,
+            thickness=thickness,
+            raw_glass_size=raw_glass_size,
+            nesting_count=calculate_nesting_count(thickness),
+            cutting_count=calculate_cutting_count(length, width, raw_glass_size),
+        )
+        try:
+            with db.session.begin_nested():
+                db.session.add(master)
+        except IntegrityError:
+            # 其他请求同时创建了相同规格，使用已存在的记录；本事务已读过该表，MySQL 可重复读下
+            # 普通查询读的是事务开始时的快照，看不到刚提交的记录，需用加锁读取最新版本
+            master = ProductMaster.query.filter_by(spec_hash=spec_hash(key)).with_for_update().one()
+        masters[key] = master
+    return masters
+
+
+def get_product_master(db, product_model, length, width, thickness, raw_glass_size):
+    """查找或创建单个规格的产品主数据"""
+    spec = (product_model, length, width, thickness, raw_glass_size)
+    return resolve_product_masters(db, [spec])[spec_key(*spec)]
+
+
+def apply_product_master(product, master, orders=()):
+    """将产品（及其订单）关联到主数据，并使用主数据缓存的叠数、切数"""
+    product.product_master_id = master.id
+    product.nesting_count = master.nesting_count
+    product.cutting_count = master.cutting_count
+    for order in orders:
+        order.product_master_id = master.id
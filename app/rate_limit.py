@@ -0,0 +1,146 @@
+"""令牌桶限流
+
+每个限流维度（如 ip、user）一组令牌桶：容量为允许的突发次数，按固定速率补充。
+一次请求可以同时检查多个维度，只有全部有令牌时才放行并各扣除一个，被拒绝的请求
+不消耗令牌，也不会进入后面昂贵的密码验证。
+
+默认状态保存在进程内存中（gunicorn 每个工作进程各自计数）；配置了文件路径时，
+状态保存在本地 JSON 文件中并用文件锁串行化，同一台机器上的所有工作进程共享计数，
+重启后也不会清零。
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+from flask import current_app
+
+try:
+    import fcntl
+except ImportError:  # Windows 上没有 fcntl，只能使用进程内计数
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """多维度令牌桶限流器
+
+    limits: {维度名: (容量, 每秒补充的令牌数)}，容量为 0 的维度不限流。
+    """
+
+    def __init__(self, limits, path=None, max_keys=10000):
+        self.limits = {name: (float(capacity), float(rate))
+                       for name, (capacity, rate) in limits.items() if capacity > 0}
+        self.path = path if path and fcntl is not None else None
+        self.max_keys = max_keys
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def _level(self, state, name, key, now):
+        """补充令牌后桶内的令牌数"""
+        capacity, rate = self.limits[name]
+        tokens, updated = state.get(f'{name}:{key}', (capacity, now))
+        return min(capacity, tokens + max(now - updated, 0.0) * rate)
+
+    def _take(self, state, keys, now):
+        """检查并扣除令牌，返回需要等待的秒数（0 表示放行）"""
+        levels = {}
+        retry_after = 0.0
+        for name, key in keys.items():
+            if key is None or name not in self.limits:
+                continue
+            level = self._level(state, name, key, now)
+            levels[f'{name}:{key}'] = level
+            if level < 1:
+                rate = self.limits[name][1]
+                retry_after = max(retry_after, (1 - level) / rate if rate > 0 else math.inf)
+        if retry_after:
+            return retry_after
+        for state_key, level in levels.items():
+            state[state_key] = (level - 1, now)
+        return 0.0
+
+    def _prune(self, state, now):
+        """删除已经补满的桶（与不存在等价）"""
+        for state_key in list(state):
+            name, key = state_key.split(':', 1)
+            if name not in self.limits or self._level(state, name, key, now) >= self.limits[name][0]:
+                del state[state_key]
+
+    def _with_state(self, update):
+        """在锁内读取状态、调用 update(state, now) 并写回，返回 update 的结果"""
+        now = time.time()
+        with self._lock:
+            if self.path:
+                try:
+                    return self._with_file(update, now)
+                except OSError:
+                    log.warning('限流状态文件 %s 不可用，改用进程内计数', self.path, exc_info=True)
+                    self.path = None
+            result = update(self._state, now)
+            if len(self._state) > self.max_keys:
+                self._prune(self._state, now)
+            return result
+
+    def _with_file(self, update, now):
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read()
+                try:
+                    state = {k: tuple(v) for k, v in json.loads(content).items()} if content else {}
+                except (ValueError, AttributeError):
+                    state = {}
+                result = update(state, now)
+                self._prune(state, now)
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return result
+
+    def hit(self, **keys):
+        """记录一次请求，如 hit(ip='10.0.0.1', user='admin')；返回 0 表示放行，否则为建议等待的秒数"""
+        if not self.limits:
+            return 0.0
+        return self._with_state(lambda state, now: self._take(state, keys, now))
+
+    def reset(self, name, key):
+        """清空某个维度某个键的计数（如登录成功后清空该用户的失败计数）"""
+        if name not in self.limits:
+            return
+
+        def update(state, now):
+            state.pop(f'{name}:{key}', None)
+        self._with_state(update)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_login_limiter():
+    """当前应用（每个工作进程）共用的登录限流器，按来源 IP 和用户名两个维度限流"""
+    app = current_app._get_current_object()
+    limiter = _limiters.get(id(app))
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(id(app))
+            if limiter is None:
+                config = app.config
+                path = config.get('LOGIN_RATE_LIMIT_FILE') or None
+                if path and not os.path.isabs(path):
+                    path = os.path.join(app.instance_path, path)
+                    os.makedirs(app.instance_path, exist_ok=True)
+                limiter = RateLimiter({
+                    'ip': (config.get('LOGIN_IP_BURST', 60), config.get('LOGIN_IP_RATE', 1.0)),
+                    'user': (config.get('LOGIN_USER_BURST', 5), config.get('LOGIN_USER_RATE', 0.05)),
+                }, path=path)
+                _limiters[id(app)] = limiter
+    return limiter
@@ -0,0 +1,257 @@
+"""滚动排产
+
+排程以生成时刻为起点，一小时后就与实际进度脱节。滚动排产每小时推进一次：
+当前整点之前的排程冻结不动，按冻结部分统计各订单在每道工序上已完成的数量，
+只对剩余数量从当前整点开始重新排产（与生成排程相同，启用 SCHEDULE_CHANGEOVERS 时
+各车间订单按换型时间排序并依次生产），替换当前整点之后的排程。
+
+各工序已完成数量、冻结部分的各工序起止时间（订单排产汇总使用）和订单快照都保存在内存中，
+每次只累加上一次推进以来新冻结的小时，产能快照使用缓存（get_plant_snapshot），因此每次推进
+只需读取一小时的排程。订单排产汇总由内存中的冻结部分和新排程直接计算，不再重新聚合排程表；
+排产页面只向排程有变化的车间推送整页刷新。
+启用 REPLAN_NET_ACTUALS 时，早于当前整点 REPLAN_ACTUALS_LAG_HOURS 小时的部分按实际产量
+（production_actuals）而不是计划数量计入已完成数量：实际产量按 (车间, 工序, 小时) 上报，
+按该小时各产品的计划数量比例分配；当天没有任何报工的车间仍按计划数量计算，
+该小时没有计划的工序上报的数量无法归属到订单，不计入。最近几个小时报工可能尚未写入，
+先按计划数量计入，超过延迟后再用实际产量修正，欠产的数量在之后的推进中重新排产。
+
+两次推进之间如果有人生成、恢复或删除了排程（schedule_events 中出现新事件），
+内存中的进度作废，下次推进时重新读取全部历史排程；订单或产品被新增、修改、删除时
+（按订单数、最大ID和最后修改时间判断）重新读取订单快照。
+"""
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, func, or_
+
+from app.changeover import get_changeover_model
+from app.live_updates import latest_event_id, publish_quietly, publish_reload
+from app.order_summaries import _hour_start, _merge, summarize_rows, write_order_summaries
+from app.schedule_maintenance import ScheduleCleanupError, replace_schedules
+from app.scheduler import get_plant_snapshot, get_schedule_engine, load_order_snapshot, run_schedule
+
+
+def hour_floor(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _hour_filter(model, start=None, end=None):
+    """(schedule_date, hour) 落在 [start, end) 内的过滤条件，start、end 为整点时间"""
+    criteria = []
+    if start is not None:
+        start_date = datetime(start.year, start.month, start.day)
+        criteria.append(model.schedule_date >= start_date)  # 日期范围条件用于命中索引
+        criteria.append(or_(model.schedule_date > start_date,
+                            and_(model.schedule_date == start_date, model.hour >= start.hour)))
+    if end is not None:
+        end_date = datetime(end.year, end.month, end.day)
+        criteria.append(model.schedule_date <= end_date)
+        criteria.append(or_(model.schedule_date < end_date,
+                            and_(model.schedule_date == end_date, model.hour < end.hour)))
+    return criteria
+
+
+def _allocate(total, weights):
+    """按权重把整数 total 分配给各项（最大余数法），返回与 weights 对应的整数列表"""
+    weight_sum = sum(weights)
+    shares = [total * w / weight_sum for w in weights]
+    result = [int(share) for share in shares]
+    order = sorted(range(len(weights)), key=lambda i: shares[i] - result[i], reverse=True)
+    for i in order[:total - sum(result)]:
+        result[i] += 1
+    return result
+
+
+class RollingPlanner:
+    """滚动排产状态：各 (产品, 工序) 已冻结的数量和起止时间、订单快照以及上一次推进到的整点"""
+
+    def __init__(self, db):
+        self.db = db
+        self.progress = {}
+        self.history = {}
+        self.frozen_until = None
+        self.settled_until = None
+        self.last_event_id = None
+        self.orders = None
+        self.orders_fingerprint = None
+
+    def _reset(self):
+        self.progress = {}
+        self.history = {}
+        self.frozen_until = None
+        self.settled_until = None
+
+    def _order_fingerprint(self):
+        """订单和产品的变化标识：新增、删除或修改任一订单或产品后都会改变"""
+        from app.models import Order, Product
+
+        orders = self.db.session.query(func.count(Order.id), func.max(Order.id), func.max(Order.updated_at)).one()
+        products = self.db.session.query(func.max(Product.updated_at)).scalar()
+        return tuple(orders) + (products,)
+
+    def _accumulate(self, start, end):
+        """把 [start, end) 内的排程计入已完成数量和各工序起止时间，返回读取的排程记录数"""
+        from app.models import ProductionSchedule
+
+        rows = self.db.session.query(
+            ProductionSchedule.product_id, ProductionSchedule.process_id, ProductionSchedule.schedule_date,
+            func.min(ProductionSchedule.hour), func.max(ProductionSchedule.hour),
+            func.sum(ProductionSchedule.production_quantity), func.count(ProductionSchedule.id)
+        ).filter(*_hour_filter(ProductionSchedule, start, end)).group_by(
+            ProductionSchedule.product_id, ProductionSchedule.process_id, ProductionSchedule.schedule_date
+        ).all()
+
+        count = 0
+        for product_id, process_id, schedule_date, first_hour, last_hour, quantity, row_count in rows:
+            quantity = int(quantity or 0)
+            key = (product_id, process_id)
+            self.progress[key] = self.progress.get(key, 0) + quantity
+            _merge(self.history.setdefault(product_id, {}), process_id, _hour_start(schedule_date, first_hour),
+                   _hour_start(schedule_date, last_hour) + timedelta(hours=1), quantity)
+            count += row_count
+        return count
+
+    def _settle(self, start, end):
+        """把 [start, end) 内已计入的计划数量替换为实际产量（只处理当天有报工的车间），返回调整量之和"""
+        from app.models import ProductionActual, ProductionSchedule
+
+        actuals = {
+            (workshop_id, process_id, schedule_date, hour): int(quantity or 0)
+            for workshop_id, process_id, schedule_date, hour, quantity in self.db.session.query(
+                ProductionActual.workshop_id, ProductionActual.process_id,
+                ProductionActual.schedule_date, ProductionActual.hour, func.sum(ProductionActual.quantity)
+            ).filter(*_hour_filter(ProductionActual, start, end)).group_by(
+                ProductionActual.workshop_id, ProductionActual.process_id,
+                ProductionActual.schedule_date, ProductionActual.hour
+            )
+        }
+        reporting_days = {(workshop_id, schedule_date) for workshop_id, _, schedule_date, _ in actuals}
+        if not reporting_days:
+            return 0
+
+        cells = {}
+        for workshop_id, product_id, process_id, schedule_date, hour, quantity in self.db.session.query(
+                ProductionSchedule.workshop_id, ProductionSchedule.product_id, ProductionSchedule.process_id,
+                ProductionSchedule.schedule_date, ProductionSchedule.hour,
+                func.sum(ProductionSchedule.production_quantity)
+        ).filter(*_hour_filter(ProductionSchedule, start, end)).group_by(
+            ProductionSchedule.workshop_id, ProductionSchedule.product_id, ProductionSchedule.process_id,
+            ProductionSchedule.schedule_date, ProductionSchedule.hour
+        ):
+            if (workshop_id, schedule_date) in reporting_days and quantity:
+                cells.setdefault((workshop_id, process_id, schedule_date, hour), []).append(
+                    (product_id, int(quantity)))
+
+        adjustment = 0
+        for cell, planned in cells.items():
+            produced = _allocate(actuals.get(cell, 0), [quantity for _, quantity in planned])
+            for (product_id, quantity), actual in zip(planned, produced):
+                key = (product_id, cell[1])
+                self.progress[key] = self.progress.get(key, 0) + actual - quantity
+                adjustment += actual - quantity
+        return adjustment
+
+    def _summaries(self, rows):
+        """冻结部分与新排程合并后的订单排产汇总，结构与 summarize_rows 相同"""
+        summaries = {product_id: {process_id: list(values) for process_id, values in processes.items()}
+                     for product_id, processes in self.history.items()}
+        for product_id, processes in summarize_rows(rows).items():
+            for process_id, (first, last, quantity) in processes.items():
+                _merge(summaries.setdefault(product_id, {}), process_id, first, last, quantity)
+        return summaries
+
+    def _changed_workshops(self, horizon, rows):
+        """当前整点之后的排程在替换前后有变化的车间"""
+        from app.models import ProductionSchedule
+
+        def cells(items):
+            return Counter((r[0], r[1], r[2], r[3], r[4], r[5]) for r in items)
+
+        before = cells(self.db.session.query(
+            ProductionSchedule.workshop_id, ProductionSchedule.product_id, ProductionSchedule.process_id,
+            ProductionSchedule.schedule_date, ProductionSchedule.hour, ProductionSchedule.production_quantity
+        ).filter(*_hour_filter(ProductionSchedule, start=horizon)).all())
+        after = cells((row['workshop_id'], row['product_id'], row['process_id'], row['schedule_date'],
+                       row['hour'], row['production_quantity']) for row in rows)
+        return {key[0] for key in (before - after) + (after - before)}
+
+    def tick(self, now=None):
+        """推进到当前整点：冻结之前的排程，重新模拟剩余数量，返回本次推进的统计信息"""
+        from app.models import ProductionSchedule
+
+        started = time.perf_counter()
+        horizon = hour_floor(now or datetime.now())
+        if self.frozen_until is not None and horizon <= self.frozen_until:
+            return None
+
+        # 排程被其他操作修改过时，丢弃内存中的进度
+        if self.last_event_id is not None and latest_event_id(self.db) != self.last_event_id:
+            self._reset()
+        fingerprint = self._order_fingerprint()
+        if self.orders is None or fingerprint != self.orders_fingerprint:
+            self.orders = load_order_snapshot(self.db)
+
+        # 累加新冻结的小时（首次推进时读取全部历史排程）
+        frozen_rows = self._accumulate(self.frozen_until, horizon)
+        self.frozen_until = horizon
+
+        # 超过报工延迟的小时改按实际产量计入
+        actuals_adjustment = 0
+        if current_app.config.get('REPLAN_NET_ACTUALS', True):
+            settle_end = horizon - timedelta(hours=current_app.config.get('REPLAN_ACTUALS_LAG_HOURS', 2))
+            if self.settled_until is None or settle_end > self.settled_until:
+                actuals_adjustment = self._settle(self.settled_until, settle_end)
+                self.settled_until = settle_end
+
+        plant = get_plant_snapshot(self.db)
+        engine = get_schedule_engine()
+
+        # 剩余数量与生成排程一样经 run_schedule 排产（启用换型时按换型时间排序并依次生产）
+        remaining = []
+        for order in self.orders:
+            workshop = plant.get(order['workshop'])
+            if not workshop or not workshop['processes']:
+                continue
+            completed = [min(order['quantity'], self.progress.get((order['product_id'], p['id']), 0))
+                         for p in workshop['processes']]
+            if completed[-1] < order['quantity']:
+                remaining.append(dict(order, completed=completed))
+        rows, plans = run_schedule(remaining, plant, horizon, get_changeover_model(self.db), engine)
+
+        # 替换当前整点之后的排程，由内存数据写入订单排产汇总，并通知排程有变化的车间刷新；
+        # 与生成排程相同，先写入并提交新排程和汇总，再删除旧排程（见 replace_schedules），写入失败时原有排程不变
+        changed_workshops = self._changed_workshops(horizon, rows)
+        write_order_summaries(self.db, self._summaries(rows), plans=plans)
+        try:
+            deleted = replace_schedules(self.db, rows, *_hour_filter(ProductionSchedule, start=horizon))
+        except ScheduleCleanupError:
+            # 新排程已生效但旧排程有残留，丢弃内存中的进度，下次推进时重新读取并再次清理
+            self._reset()
+            self.last_event_id = None
+            if changed_workshops:
+                publish_quietly(self.db, publish_reload, changed_workshops)
+            raise
+        if changed_workshops:
+            publish_quietly(self.db, publish_reload, changed_workshops)
+        self.last_event_id = latest_event_id(self.db)
+        # 写入汇总会更新订单的修改时间，记录写入后的标识，避免下次推进时无谓地重新读取订单
+        self.orders_fingerprint = self._order_fingerprint()
+
+        return {
+            'horizon': horizon.strftime('%Y-%m-%d %H:%M'),
+            'frozen_rows': frozen_rows,
+            'actuals_adjustment': actuals_adjustment,
+            'replanned_orders': len(remaining),
+            'deleted_rows': deleted,
+            'inserted_rows': len(rows),
+            'changed_workshops': len(changed_workshops),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+
+
+def seconds_until_next_hour(now=None, delay=0):
+    """距离下一个整点（再加 delay 秒）的秒数"""
+    now = now or datetime.now()
+    return (hour_floor(now) + timedelta(hours=1) - now).total_seconds() + delay
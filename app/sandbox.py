@@ -0,0 +1,107 @@
+"""产能模拟沙盒
+
+在请求中传入产能调整（增加机台、修改节拍等），基于订单和产能快照在内存中
+重新排产，返回完工时间和瓶颈变化，不修改机台数据，也不写入 production_schedules。
+"""
+import time
+from datetime import datetime
+
+from flask import request, jsonify
+
+from app.auth import login_required
+from app.changeover import get_changeover_model
+from app.scheduler import (
+    load_order_snapshot, get_plant_snapshot, apply_capacity_overrides, run_schedule, workshop_bottlenecks,
+    get_schedule_engine, SCHEDULE_ENGINES
+)
+
+
+def _format_time(value):
+    return value.strftime('%Y-%m-%d %H:%M') if value else None
+
+
+def compare_scenarios(baseline, scenario):
+    """对比基准排产与模拟排产的订单汇总，计算完工时间变化（小时）"""
+    results = []
+    for order_id, summary in scenario.items():
+        base = baseline.get(order_id, {})
+        base_completion = base.get('completion_time')
+        completion = summary['completion_time']
+        delta_hours = None
+        if base_completion and completion:
+            delta_hours = round((completion - base_completion).total_seconds() / 3600, 2)
+
+        shipping_date = summary['shipping_date']
+        late = bool(completion and shipping_date and completion > shipping_date)
+        results.append({
+            'order_id': order_id,
+            'order_number': summary['order_number'],
+            'product_model': summary['product_model'],
+            'workshop': summary['workshop'],
+            'quantity': summary['quantity'],
+            'shipping_date': shipping_date.strftime('%Y-%m-%d') if shipping_date else None,
+            'baseline_completion': _format_time(base_completion),
+            'completion': _format_time(completion),
+            'delta_hours': delta_hours,
+            'completed': summary['completed'],
+            'late': late,
+            'bottleneck_process': summary['bottleneck_process'],
+        })
+    return results
+
+
+def register_sandbox_routes(app, db):
+
+    @app.route('/api/sandbox/simulate', methods=['POST'])
+    @login_required
+    def simulate_capacity(user):
+        """产能模拟：应用请求中的产能调整后在内存中排产，不修改任何数据"""
+        started = time.perf_counter()
+        payload = request.get_json(silent=True) or {}
+        if not isinstance(payload, dict):
+            return jsonify({'error': '请求体应为 JSON 对象'}), 400
+
+        try:
+            start_time = datetime.fromisoformat(payload['start']) if payload.get('start') else datetime.now()
+        except (TypeError, ValueError):
+            return jsonify({'error': '开始时间格式错误'}), 400
+        order_ids = payload.get('order_ids')
+        if order_ids is not None and (not isinstance(order_ids, list) or not all(
+                isinstance(order_id, int) and not isinstance(order_id, bool) for order_id in order_ids)):
+            return jsonify({'error': 'order_ids 应为订单ID（整数）列表'}), 400
+        overrides = payload.get('overrides') or []
+        if not isinstance(overrides, list) or not all(isinstance(item, dict) for item in overrides):
+            return jsonify({'error': 'overrides 应为产能调整（JSON 对象）列表'}), 400
+        # 排产引擎，默认按配置（SCHEDULE_ENGINE）
+        engine = payload.get('engine') or get_schedule_engine()
+        if engine not in SCHEDULE_ENGINES:
+            return jsonify({'error': f'排产引擎应为 {"、".join(SCHEDULE_ENGINES)}'}), 400
+
+        order_snapshot = load_order_snapshot(db, order_ids)
+        if payload.get('workshop'):
+            order_snapshot = [o for o in order_snapshot if o['workshop'] == payload['workshop']]
+        plant = get_plant_snapshot(db)
+        changeovers = get_changeover_model(db)
+        # 快照读取完毕后立即结束只读事务，模拟计算期间不占用数据库连接
+        db.session.rollback()
+
+        try:
+            scenario_plant = apply_capacity_overrides(plant, overrides)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            return jsonify({'error': f'产能调整参数错误：{e}'}), 400
+
+        _, baseline = run_schedule(order_snapshot, plant, start_time, changeovers, engine)
+        _, scenario = run_schedule(order_snapshot, scenario_plant, start_time, changeovers, engine)
+        orders = compare_scenarios(baseline, scenario)
+
+        completions = [s['completion_time'] for s in scenario.values() if s['completion_time']]
+        return jsonify({
+            'start': _format_time(start_time),
+            'orders': orders,
+            'makespan_completion': _format_time(max(completions)) if completions else None,
+            'late_orders': sum(1 for o in orders if o['late']),
+            'baseline_bottlenecks': workshop_bottlenecks(plant),
+            'bottlenecks': workshop_bottlenecks(scenario_plant),
+            'engine': engine,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        })
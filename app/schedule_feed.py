@@ -0,0 +1,197 @@
+"""排程二进制数据
+
+排产页面按 HTML 表格渲染，一个月的逐小时排程（4 个车间 × 10 道工序 × 多个产品）即使改用 JSON
+也要传输和解析大量重复的键名、日期字符串。这里把一个时间窗口内的排程编码为定长数组，
+前端（main.js 中的甘特图）用 DataView 直接读取后在 canvas 上绘制：
+
+- 同一 (型号, 工序, 小时) 的排产数量合并为一条记录，记录按列存放：
+  uint16 型号序号、uint8 工序序号、uint32 小时偏移（距窗口起点）、uint32 数量
+- 型号、车间名和工序名只在字符串表中保存一份
+- 客户端支持时用 gzip 压缩（Content-Encoding: gzip，浏览器自动解压）
+
+格式（小端）：
+  头部 28 字节：b'TPSF'、uint16 版本、uint16 保留、uint32 窗口起点（1970-01-01 起的小时数，本地时间）、
+  uint32 窗口小时数、uint32 字符串数、uint32 工序数、uint32 记录数
+  字符串表：每项 uint16 字节数 + UTF-8
+  工序表：每项 uint32 工序ID、uint16 车间名序号、uint16 工序名序号
+  记录：型号序号数组、工序序号数组、小时偏移数组、数量数组
+"""
+import gzip
+import struct
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import Response, jsonify, request
+from sqlalchemy import func
+
+from app.auth import login_required
+from app.scheduler import PROCESS_SEQUENCE
+
+MAGIC = b'TPSF'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHIIIII')
+PROCESS_ENTRY = struct.Struct('<IHH')
+
+HOURS_PER_DAY = 24
+
+# 一次请求最多的天数
+MAX_DAYS = 92
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def load_feed_rows(db, start, end, workshop_id=None):
+    """窗口内按 (型号, 工序, 日期, 小时) 汇总的排产数量，以及涉及的工序 [(工序ID, 车间名, 工序名)]"""
+    from app.models import Process, Product, ProductionSchedule, Workshop
+
+    filters = [ProductionSchedule.schedule_date >= start, ProductionSchedule.schedule_date < end]
+    if workshop_id is not None:
+        filters.append(ProductionSchedule.workshop_id == workshop_id)
+    rows = db.session.query(
+        Product.product_model, ProductionSchedule.process_id, ProductionSchedule.schedule_date,
+        ProductionSchedule.hour, func.sum(ProductionSchedule.production_quantity)
+    ).join(Product, Product.id == ProductionSchedule.product_id).filter(*filters).group_by(
+        Product.product_model, ProductionSchedule.process_id, ProductionSchedule.schedule_date,
+        ProductionSchedule.hour
+    ).all()
+
+    process_query = db.session.query(Process.id, Workshop.name, Process.name).join(
+        Workshop, Workshop.id == Process.workshop_id)
+    if workshop_id is not None:
+        process_query = process_query.filter(Process.workshop_id == workshop_id)
+    else:
+        process_query = process_query.filter(Process.id.in_({row[1] for row in rows} or {-1}))
+    rank = {name: i for i, name in enumerate(PROCESS_SEQUENCE)}
+    processes = sorted(process_query.all(), key=lambda p: (p[1], rank.get(p[2], len(rank)), p[0]))
+    return rows, processes
+
+
+def encode_feed(rows, processes, start, hours):
+    """将排产数量编码为二进制（未压缩）
+
+    rows 为 (型号, 工序ID, 日期, 小时, 数量)，processes 为 [(工序ID, 车间名, 工序名)]，
+    工序表按给定顺序排列；不在 processes 中的工序的记录被忽略。
+    """
+    if len(processes) > 256:
+        raise ValueError('工序数超过 256，请指定车间')
+
+    strings = []
+    string_index = {}
+
+    def intern(value):
+        value = value or ''
+        if value not in string_index:
+            string_index[value] = len(strings)
+            strings.append(value)
+        return string_index[value]
+
+    process_index = {}
+    process_table = bytearray()
+    for index, (process_id, workshop_name, process_name) in enumerate(processes):
+        process_index[process_id] = index
+        process_table += PROCESS_ENTRY.pack(process_id, intern(workshop_name), intern(process_name))
+
+    n = len(rows)
+    models = np.empty(n, dtype='<u2')
+    process_ids = np.empty(n, dtype=np.uint8)
+    offsets = np.empty(n, dtype='<u4')
+    quantities = np.empty(n, dtype='<u4')
+    count = 0
+    for model, process_id, schedule_date, hour, quantity in rows:
+        index = process_index.get(process_id)
+        if index is None or not quantity:
+            continue
+        model_index = intern(model)
+        if model_index > 0xFFFF:
+            raise ValueError('型号数超过 65535，请缩小时间范围')
+        models[count] = model_index
+        process_ids[count] = index
+        offsets[count] = (schedule_date - start).days * HOURS_PER_DAY + hour
+        quantities[count] = quantity
+        count += 1
+    models, process_ids, offsets, quantities = models[:count], process_ids[:count], offsets[:count], quantities[:count]
+
+    # 按 (工序, 型号, 小时) 排序，前端可以顺序合并连续的小时为一段
+    order = np.lexsort((offsets, models, process_ids))
+
+    encoded = [value.encode('utf-8')[:0xFFFF] for value in strings]
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, 0, int((start - EPOCH).total_seconds() // 3600), hours,
+                         len(strings), len(processes), count)]
+    for value in encoded:
+        parts.append(struct.pack('<H', len(value)))
+        parts.append(value)
+    parts.append(bytes(process_table))
+    for column in (models, process_ids, offsets, quantities):
+        parts.append(column[order].tobytes())
+    return b''.join(parts)
+
+
+def decode_feed(payload):
+    """解码二进制数据（用于测试和命令行检查），返回字典"""
+    magic, version, _, start_hour, hours, n_strings, n_processes, n_records = HEADER.unpack_from(payload)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError('无法识别的数据格式')
+    position = HEADER.size
+    strings = []
+    for _ in range(n_strings):
+        (length,) = struct.unpack_from('<H', payload, position)
+        position += 2
+        strings.append(payload[position:position + length].decode('utf-8'))
+        position += length
+    processes = []
+    for _ in range(n_processes):
+        process_id, workshop, name = PROCESS_ENTRY.unpack_from(payload, position)
+        processes.append((process_id, strings[workshop], strings[name]))
+        position += PROCESS_ENTRY.size
+    columns = []
+    for dtype in ('<u2', np.uint8, '<u4', '<u4'):
+        column = np.frombuffer(payload, dtype=dtype, count=n_records, offset=position)
+        columns.append(column)
+        position += column.nbytes
+    return {
+        'start': EPOCH + timedelta(hours=start_hour),
+        'hours': hours,
+        'strings': strings,
+        'processes': processes,
+        'models': columns[0],
+        'process_index': columns[1],
+        'hour_offsets': columns[2],
+        'quantities': columns[3],
+    }
+
+
+def register_schedule_feed_routes(app, db):
+    from app.models import Workshop
+
+    @app.route('/api/schedule/feed')
+    @login_required
+    def schedule_feed(user):
+        """排程二进制数据：?workshop=车间名（不指定为全部车间）&start=YYYY-MM-DD&days=31"""
+        try:
+            start = datetime.strptime(request.args.get('start') or datetime.now().strftime('%Y-%m-%d'), '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': '日期格式应为 YYYY-MM-DD'}), 400
+        days = request.args.get('days', 31, type=int)
+        if not 1 <= days <= MAX_DAYS:
+            return jsonify({'error': f'天数应在 1 到 {MAX_DAYS} 之间'}), 400
+
+        workshop_id = None
+        if request.args.get('workshop'):
+            workshop = Workshop.query.filter_by(name=request.args['workshop']).first()
+            if workshop is None:
+                return jsonify({'error': '车间不存在'}), 404
+            workshop_id = workshop.id
+
+        rows, processes = load_feed_rows(db, start, start + timedelta(days=days), workshop_id)
+        try:
+            payload = encode_feed(rows, processes, start, days * HOURS_PER_DAY)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        response = Response(payload, mimetype='application/octet-stream')
+        if 'gzip' in request.accept_encodings:
+            response.set_data(gzip.compress(payload, 6))
+            response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
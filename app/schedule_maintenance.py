@@ -0,0 +1,175 @@
+"""排程数据维护：分批删除、清空和批量删除订单
+
+production_schedules 表可能有数百万行，一条不带限制的 DELETE 会长时间持有锁并
+产生大量 InnoDB undo 日志。这里的删除都按主键分批进行：每批先沿主键索引取出
+一段ID，再按主键范围删除并提交，单个事务处理的行数与表大小无关。
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, text
+
+
+class ScheduleCleanupError(Exception):
+    """新排程已写入并提交，但删除旧排程时出错（旧记录可能还有一部分留在表中）"""
+
+
+def _chunk_size(chunk_size):
+    if chunk_size is None:
+        chunk_size = current_app.config.get('SCHEDULE_DELETE_CHUNK_SIZE', 5000)
+    return max(1, int(chunk_size))
+
+
+def _chunks(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def day_range(day):
+    """返回覆盖某一天的 [开始, 结束) 时间范围，用于可走索引的日期过滤"""
+    if isinstance(day, str):
+        day = datetime.strptime(day, '%Y-%m-%d')
+    start = datetime(day.year, day.month, day.day)
+    return start, start + timedelta(days=1)
+
+
+def chunked_delete_schedules(db, *criteria, chunk_size=None):
+    """按主键范围分批删除满足条件的排程记录，每批单独提交，返回删除的行数
+
+    criteria 为作用于 ProductionSchedule 的过滤条件；不传条件时删除全部记录。
+    """
+    from app.models import ProductionSchedule
+
+    chunk_size = _chunk_size(chunk_size)
+    deleted = 0
+    last_id = 0
+    while True:
+        # 沿主键索引取出下一批ID，只锁定这一段范围
+        ids = [row_id for (row_id,) in db.session.query(ProductionSchedule.id).filter(
+            ProductionSchedule.id > last_id, *criteria
+        ).order_by(ProductionSchedule.id).limit(chunk_size).all()]
+        if not ids:
+            break
+
+        deleted += db.session.query(ProductionSchedule).filter(
+            ProductionSchedule.id >= ids[0],
+            ProductionSchedule.id <= ids[-1],
+            *criteria
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        last_id = ids[-1]
+    return deleted
+
+
+def truncate_schedules(db):
+    """清空排程表
+
+    MySQL 使用 TRUNCATE TABLE（重建表，不逐行写 undo 日志，耗时与表大小无关），
+    此时返回 None，因为无法得知删除的行数；其他数据库按主键分批删除并返回行数。
+    """
+    from app.models import ProductionSchedule
+
+    if db.engine.dialect.name == 'mysql':
+        # TRUNCATE 会隐式提交，先结束当前事务
+        db.session.commit()
+        db.session.execute(text(f'TRUNCATE TABLE {ProductionSchedule.__tablename__}'))
+        db.session.commit()
+        return None
+    return chunked_delete_schedules(db)
+
+
+def replace_schedules(db, rows, *criteria, chunk_size=None):
+    """用 rows 替换满足 criteria 的排程（不传条件时替换全部排程），返回删除的旧记录数
+
+    先记下当前最大主键，写入新排程并与会话中已有的修改（版本、订单汇总等）一起提交，
+    再按主键分批删除满足条件且不大于该主键的旧记录。提交前出错时原有排程保持不变；删除旧记录
+    出错时抛出 ScheduleCleanupError，此时新排程已生效，再次替换会一并删除残留的旧记录。
+    删除期间新旧排程短暂并存。
+    """
+    from app.models import ProductionSchedule
+
+    boundary = db.session.query(func.max(ProductionSchedule.id)).scalar()
+    db.session.bulk_insert_mappings(ProductionSchedule, rows)
+    db.session.commit()
+    return delete_schedules_up_to(db, boundary, *criteria, chunk_size=chunk_size)
+
+
+def delete_schedules_up_to(db, boundary, *criteria, chunk_size=None):
+    """分批删除主键不大于 boundary 且满足 criteria 的排程，返回删除的行数
+
+    用于先写入新排程、再删除写入前已有的旧记录；boundary 为写入前的最大主键（表为空时为 None）。
+    出错时回滚并抛出 ScheduleCleanupError。
+    """
+    from app.models import ProductionSchedule
+
+    if boundary is None:
+        return 0
+    try:
+        return chunked_delete_schedules(db, ProductionSchedule.id <= boundary, *criteria, chunk_size=chunk_size)
+    except Exception as e:
+        db.session.rollback()
+        raise ScheduleCleanupError(str(e)) from e
+
+
+def delete_schedules_for_day(db, day, workshop_id=None, process_id=None, chunk_size=None):
+    """删除某一天的排程（可限定车间和工序），使用日期范围条件以命中索引
+
+    表已按日期分区（SCHEDULE_PARTITIONING）且删除整天数据时，直接清空当天分区，
+    此时返回 None；否则按主键分批删除并返回行数。
+    """
+    from app.models import ProductionSchedule
+    from app.partitioning import partitioning_enabled, truncate_day_partition
+
+    if workshop_id is None and process_id is None and partitioning_enabled():
+        # TRUNCATE PARTITION 会隐式提交，先结束当前事务
+        db.session.commit()
+        if truncate_day_partition(db.session.connection(), day):
+            db.session.commit()
+            return None
+
+    start, end = day_range(day)
+    criteria = [ProductionSchedule.schedule_date >= start, ProductionSchedule.schedule_date < end]
+    if workshop_id is not None:
+        criteria.append(ProductionSchedule.workshop_id == workshop_id)
+    if process_id is not None:
+        criteria.append(ProductionSchedule.process_id == process_id)
+    return chunked_delete_schedules(db, *criteria, chunk_size=chunk_size)
+
+
+def delete_orders(db, order_ids, chunk_size=None):
+    """批量删除订单及其产品和排程，返回 (删除的订单数, 删除的排程记录数)
+
+    排程按产品分批删除；订单和产品使用集合删除，不逐个加载 ORM 对象。
+    """
+    from app.models import Order, OrderProcessSummary, Product, ProductionSchedule
+
+    chunk_size = _chunk_size(chunk_size)
+    order_ids = sorted({int(order_id) for order_id in order_ids})
+    if not order_ids:
+        return 0, 0
+
+    product_ids = set()
+    for chunk in _chunks(order_ids, 1000):
+        product_ids.update(p for (p,) in db.session.query(Order.product_id).filter(Order.id.in_(chunk)).all())
+    product_ids = sorted(product_ids)
+
+    # 先删除排程（可能很多行），每批提交以限制锁持有时间
+    deleted_schedules = 0
+    for chunk in _chunks(product_ids, 200):
+        deleted_schedules += chunked_delete_schedules(
+            db, ProductionSchedule.product_id.in_(chunk), chunk_size=chunk_size)
+
+    # 再删除订单和不再被其他订单引用的产品
+    deleted_orders = 0
+    for chunk in _chunks(order_ids, 1000):
+        db.session.query(OrderProcessSummary).filter(
+            OrderProcessSummary.order_id.in_(chunk)).delete(synchronize_session=False)
+        deleted_orders += db.session.query(Order).filter(Order.id.in_(chunk)).delete(synchronize_session=False)
+    for chunk in _chunks(product_ids, 1000):
+        still_referenced = db.session.query(Order.product_id).filter(Order.product_id.in_(chunk))
+        db.session.query(Product).filter(
+            Product.id.in_(chunk), ~Product.id.in_(still_referenced)
+        ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted_orders, deleted_schedules
@@ -0,0 +1,231 @@
+"""整体排产页面的视图模型
+
+排产页面原先把全部排程组织成 日期 -> 工序 -> 24 小时 -> 产品列表 的嵌套字典，
+由 Jinja 逐层遍历，计划越长渲染越慢。这里由控制器预先生成紧凑的视图模型：
+
+- 按缩放级别分页：按天（每张卡片一天、24 个小时列，每页 7 天）、按周（每张卡片一周、
+  每天一列，每页 4 周）、按月（每张卡片一个月、每 7 天一列，每页 3 个月），
+  每页的单元格数量固定，渲染耗时与计划长度无关
+- 每行是定长的单元格列表，单元格为元组 (型号序号, 数量, ...)，产品型号字符串只在
+  models 中保存一份，模板按序号取值
+- 按天的单元格复用 live_updates.schedule_cells，与实时更新推送的内容完全一致；
+  按周、按月用一条分组查询按天汇总后再归入对应的列
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from app.live_updates import schedule_cells
+from app.scheduler import PROCESS_SEQUENCE
+
+HOURS_PER_DAY = 24
+
+# 每个缩放级别每页显示的卡片数
+ZOOM_PAGE_SIZE = {'day': 7, 'week': 4, 'month': 3}
+
+WEEKDAY_NAMES = '一二三四五六日'
+
+
+def _midnight(value):
+    return datetime(value.year, value.month, value.day)
+
+
+def _month_start(value, offset=0):
+    month = value.month - 1 + offset
+    return datetime(value.year + month // 12, month % 12 + 1, 1)
+
+
+def align_start(zoom, value):
+    """将日期对齐到卡片的起点：按周为周一，按月为 1 日"""
+    day = _midnight(value)
+    if zoom == 'week':
+        return day - timedelta(days=day.weekday())
+    if zoom == 'month':
+        return _month_start(day)
+    return day
+
+
+def _shift(zoom, start, cards):
+    """start 之后（cards 为负时为之前）第 cards 张卡片的起点"""
+    if zoom == 'month':
+        return _month_start(start, cards)
+    return start + timedelta(days=cards * (7 if zoom == 'week' else 1))
+
+
+def _columns(zoom, card_start):
+    """卡片的列标题"""
+    if zoom == 'day':
+        return [f'{hour:02d}:00' for hour in range(HOURS_PER_DAY)]
+    if zoom == 'week':
+        return [f"{(card_start + timedelta(days=i)).strftime('%m-%d')} 周{WEEKDAY_NAMES[i]}" for i in range(7)]
+    days_in_month = (_month_start(card_start, 1) - card_start).days
+    return [f'{first}-{min(first + 6, days_in_month)}日' for first in range(1, days_in_month + 1, 7)]
+
+
+def _bucket(zoom, card_start, schedule_date):
+    """按周、按月时某一天所在的列"""
+    if zoom == 'week':
+        return (schedule_date - card_start).days
+    return (schedule_date.day - 1) // 7
+
+
+def _card_index(zoom, page_start, schedule_date):
+    if zoom == 'month':
+        return (schedule_date.year - page_start.year) * 12 + schedule_date.month - page_start.month
+    return (schedule_date - page_start).days // (7 if zoom == 'week' else 1)
+
+
+def _ordered_processes(db, workshop_id):
+    """车间的工序 [(工序ID, 工序名, 机台数)]，按标准流程排序"""
+    from app.models import Equipment, Process
+
+    equipment_counts = dict(db.session.query(
+        Equipment.process_id, func.sum(Equipment.quantity)
+    ).join(Process, Process.id == Equipment.process_id).filter(
+        Process.workshop_id == workshop_id
+    ).group_by(Equipment.process_id).all())
+    rank = {name: i for i, name in enumerate(PROCESS_SEQUENCE)}
+    processes = db.session.query(Process.id, Process.name).filter(Process.workshop_id == workshop_id).all()
+    processes.sort(key=lambda p: (rank.get(p.name, len(rank)), p.id))
+    return [(p.id, p.name, int(equipment_counts.get(p.id) or 0)) for p in processes]
+
+
+def _day_rows(db, workshop_id, page_start, page_end, intern):
+    """按天：{日期: {工序ID: [24 个单元格]}}，单元格为 ((型号序号, 数量, 机台数, 累积已投), ...)"""
+    cells = schedule_cells(db, [workshop_id], since=page_start, until=page_end).get(workshop_id, {})
+    grid = {}
+    for key, products in cells.items():
+        date_str, process_id, hour = key.split('|')
+        row = grid.setdefault(date_str, {}).setdefault(int(process_id), [()] * HOURS_PER_DAY)
+        row[int(hour)] = tuple((intern(model), quantity, equipment, cumulative)
+                               for model, quantity, equipment, cumulative in products)
+    return grid
+
+
+def _bucket_rows(db, zoom, workshop_id, page_start, page_end, card_starts, intern):
+    """按周、按月：{卡片序号: {工序ID: [各列单元格]}}，单元格为 ((型号序号, 数量, 累积已投), ...)
+
+    累积已投为该型号的产品在该工序上截至这一列最后一天的累计排产数量。
+    """
+    from app.models import Product, ProductionSchedule
+
+    workshop_filter = ProductionSchedule.workshop_id == workshop_id
+    cumulative = {}
+    for product_id, process_id, total in db.session.query(
+        ProductionSchedule.product_id, ProductionSchedule.process_id,
+        func.sum(ProductionSchedule.production_quantity)
+    ).filter(workshop_filter, ProductionSchedule.schedule_date < page_start).group_by(
+        ProductionSchedule.product_id, ProductionSchedule.process_id
+    ).all():
+        cumulative[(product_id, process_id)] = int(total or 0)
+
+    rows = db.session.query(
+        ProductionSchedule.schedule_date, ProductionSchedule.process_id,
+        ProductionSchedule.product_id, Product.product_model,
+        func.sum(ProductionSchedule.production_quantity)
+    ).join(Product, Product.id == ProductionSchedule.product_id).filter(
+        workshop_filter,
+        ProductionSchedule.schedule_date >= page_start,
+        ProductionSchedule.schedule_date < page_end,
+    ).group_by(
+        ProductionSchedule.schedule_date, ProductionSchedule.process_id,
+        ProductionSchedule.product_id, Product.product_model
+    ).order_by(ProductionSchedule.schedule_date, func.min(ProductionSchedule.id)).all()
+
+    # {(卡片, 工序ID, 列): {型号序号: [数量, {产品ID: 累积已投}]}}，同型号的产品合并
+    buckets = {}
+    for schedule_date, process_id, product_id, model, quantity in rows:
+        quantity = int(quantity or 0)
+        key = (product_id, process_id)
+        cumulative[key] = cumulative.get(key, 0) + quantity
+        card = _card_index(zoom, page_start, schedule_date)
+        entries = buckets.setdefault((card, process_id, _bucket(zoom, card_starts[card], schedule_date)), {})
+        entry = entries.setdefault(intern(model), [0, {}])
+        entry[0] += quantity
+        entry[1][product_id] = cumulative[key]
+
+    grid = {}
+    for (card, process_id, column), entries in buckets.items():
+        row = grid.setdefault(card, {}).setdefault(
+            process_id, [()] * len(_columns(zoom, card_starts[card])))
+        row[column] = tuple((model, quantity, sum(totals.values()))
+                            for model, (quantity, totals) in entries.items())
+    return grid
+
+
+def _has_output(cells, quantity_index=1):
+    return any(product[quantity_index] for cell in cells for product in cell)
+
+
+def build_schedule_view(db, workshop_id, zoom='day', start=None):
+    """生成排产页面一页的视图模型
+
+    返回 {'zoom', 'start', 'end', 'prev', 'next', 'models', 'cards'}，
+    cards 为 [{'date', 'title', 'columns', 'rows': [(工序ID, 工序名, 机台数, 单元格列表)]}]，
+    与原页面一致，没有产量的工序行和没有工序行的卡片不显示。
+    """
+    from app.models import ProductionSchedule
+
+    if zoom not in ZOOM_PAGE_SIZE:
+        zoom = 'day'
+    first_date, last_date = db.session.query(
+        func.min(ProductionSchedule.schedule_date), func.max(ProductionSchedule.schedule_date)
+    ).filter(ProductionSchedule.workshop_id == workshop_id).one() if workshop_id else (None, None)
+
+    # 默认从最早的排程开始
+    page_start = align_start(zoom, start or first_date or datetime.now())
+    page_size = ZOOM_PAGE_SIZE[zoom]
+    card_starts = [_shift(zoom, page_start, i) for i in range(page_size)]
+    page_end = _shift(zoom, page_start, page_size)
+
+    models = []
+    model_index = {}
+
+    def intern(model):
+        code = model_index.get(model)
+        if code is None:
+            code = model_index[model] = len(models)
+            models.append(model)
+        return code
+
+    cards = []
+    if first_date is not None:
+        processes = _ordered_processes(db, workshop_id)
+        if zoom == 'day':
+            grid = _day_rows(db, workshop_id, page_start, page_end, intern)
+            for card_start in card_starts:
+                date_str = card_start.strftime('%Y-%m-%d')
+                day = grid.get(date_str, {})
+                rows = [(process_id, name, equipment, day[process_id])
+                        for process_id, name, equipment in processes
+                        if process_id in day and _has_output(day[process_id])]
+                if rows:
+                    cards.append({'date': date_str, 'title': f'{date_str} 排产计划',
+                                  'columns': _columns(zoom, card_start), 'rows': rows})
+        else:
+            grid = _bucket_rows(db, zoom, workshop_id, page_start, page_end, card_starts, intern)
+            for index, card_start in enumerate(card_starts):
+                card = grid.get(index, {})
+                rows = [(process_id, name, equipment, card[process_id])
+                        for process_id, name, equipment in processes
+                        if process_id in card and _has_output(card[process_id])]
+                if not rows:
+                    continue
+                if zoom == 'week':
+                    card_end = card_start + timedelta(days=6)
+                    title = f"{card_start.strftime('%Y-%m-%d')} 至 {card_end.strftime('%m-%d')} 排产计划"
+                else:
+                    title = f"{card_start.strftime('%Y年%m月')} 排产计划"
+                cards.append({'date': None, 'title': title, 'columns': _columns(zoom, card_start), 'rows': rows})
+
+    return {
+        'zoom': zoom,
+        'start': page_start.strftime('%Y-%m-%d'),
+        'end': page_end.strftime('%Y-%m-%d'),
+        'prev': (_shift(zoom, page_start, -page_size).strftime('%Y-%m-%d')
+                 if first_date is not None and first_date < page_start else None),
+        'next': (page_end.strftime('%Y-%m-%d')
+                 if last_date is not None and last_date >= page_end else None),
+        'models': models,
+        'cards': cards,
+    }
@@ -0,0 +1,418 @@
+"""排产引擎
+
+将流水线式排产算法与数据库解耦：先从数据库读取订单和产能快照（普通字典），
+再在内存中按小时模拟，最后由调用方决定是否写入 production_schedules。
+这样正式排产和产能模拟沙盒可以共用同一套算法。
+"""
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app.event_simulator import simulate_order_events
+
+
+# 定义标准工序流程顺序
+PROCESS_SEQUENCE = [
+    '点胶', '切割', '边抛', '边强', '分片', '酸洗', '钢化', '面强', 'AOI', '包装'
+]
+
+# 排产引擎：hourly 按小时模拟（simulate_order），event 按机台逐批离散事件模拟（simulate_order_events）
+SCHEDULE_ENGINES = ('hourly', 'event')
+
+
+def calculate_capacity_per_hour(beat, quantity, batch_size):
+    """计算每小时产能：3600秒/节拍*机台数量*每批次数量"""
+    if not beat or not quantity or not batch_size or float(beat) <= 0:
+        return 0
+    return (3600 / float(beat)) * int(quantity) * int(batch_size)
+
+
+def load_plant_snapshot(db):
+    """读取车间、工序和机台数据，返回按车间名称索引的产能快照
+
+    结构：{车间名: {'id': 车间ID, 'processes': [工序字典, ...]}}，
+    工序按标准流程顺序排列，每个工序包含 id、name、capacity_per_hour 和 equipments。
+    """
+    from app.models import Workshop, Process, Equipment
+
+    equipments_by_process = {}
+    for equipment in db.session.query(
+        Equipment.id, Equipment.name, Equipment.process_id, Equipment.quantity,
+        Equipment.beat, Equipment.batch_size, Equipment.capacity_per_hour
+    ).all():
+        equipments_by_process.setdefault(equipment.process_id, []).append({
+            'id': equipment.id,
+            'name': equipment.name,
+            'quantity': equipment.quantity,
+            'beat': equipment.beat,
+            'batch_size': equipment.batch_size,
+            'capacity_per_hour': equipment.capacity_per_hour or 0,
+        })
+
+    processes_by_workshop = {}
+    for process in db.session.query(Process.id, Process.name, Process.workshop_id).all():
+        processes_by_workshop.setdefault(process.workshop_id, []).append(process)
+
+    plant = {}
+    for workshop in db.session.query(Workshop.id, Workshop.name).all():
+        all_processes = processes_by_workshop.get(workshop.id, [])
+        # 按预定义的流程顺序对工序进行排序（同名工序只取第一个）
+        sorted_processes = []
+        for proc_name in PROCESS_SEQUENCE:
+            for process in all_processes:
+                if process.name == proc_name:
+                    equipments = equipments_by_process.get(process.id, [])
+                    sorted_processes.append({
+                        'id': process.id,
+                        'name': process.name,
+                        'equipments': equipments,
+                        'capacity_per_hour': sum(e['capacity_per_hour'] for e in equipments),
+                    })
+                    break
+        # 同名车间只保留第一个，与按名称查询车间的行为一致
+        plant.setdefault(workshop.name, {'id': workshop.id, 'processes': sorted_processes})
+    return plant
+
+
+# 产能快照缓存：(加载时间, 快照)
+_plant_cache = None
+_plant_cache_lock = threading.Lock()
+
+
+def get_plant_snapshot(db, max_age=None):
+    """返回缓存的产能快照，超过 PLANT_CACHE_TTL 秒后重新加载
+
+    快照只读，调用方需要修改时应先复制（如 apply_capacity_overrides）。
+    """
+    global _plant_cache
+    if max_age is None:
+        max_age = current_app.config.get('PLANT_CACHE_TTL', 60)
+
+    cached = _plant_cache
+    if cached is not None and time.monotonic() - cached[0] < max_age:
+        return cached[1]
+
+    with _plant_cache_lock:
+        cached = _plant_cache
+        if cached is not None and time.monotonic() - cached[0] < max_age:
+            return cached[1]
+        plant = load_plant_snapshot(db)
+        _plant_cache = (time.monotonic(), plant)
+        return plant
+
+
+def invalidate_plant_snapshot():
+    """产能数据（工序、机台）变更后清除缓存"""
+    global _plant_cache
+    _plant_cache = None
+
+
+def load_order_snapshot(db, order_ids=None):
+    """读取订单及其产品的排产所需字段，返回字典列表
+
+    order_ids 为 None 时读取全部订单，为空列表时返回空列表。
+    """
+    from app.models import Order, Product
+
+    query = db.session.query(
+        Order.id, Order.order_number, Product.id.label('product_id'), Product.product_model,
+        Product.workshop, Product.calculated_quantity, Product.shipping_date,
+        Product.thickness, Product.raw_glass_size
+    ).join(Product, Product.id == Order.product_id)
+    if order_ids is not None:
+        if not order_ids:
+            return []
+        query = query.filter(Order.id.in_(order_ids))
+
+    return [{
+        'order_id': row.id,
+        'order_number': row.order_number,
+        'product_id': row.product_id,
+        'product_model': row.product_model,
+        'workshop': row.workshop,
+        'quantity': row.calculated_quantity,
+        'shipping_date': row.shipping_date,
+        'thickness': row.thickness,
+        'raw_glass_size': row.raw_glass_size,
+    } for row in query.order_by(Order.id).all()]
+
+
+EQUIPMENT_OVERRIDE_FIELDS = (('quantity', '机台数量', int), ('beat', '节拍', float), ('batch_size', '每批次数量', int))
+
+
+def _positive(value, label, cast=float):
+    """把产能调整中的数值转换为 cast 类型，不是有限正数时抛出 ValueError"""
+    try:
+        number = cast(value)
+    except OverflowError:
+        raise ValueError(f'{label}应为正数：{value}')
+    if not math.isfinite(number) or number <= 0:
+        raise ValueError(f'{label}应为正数：{value}')
+    return number
+
+
+def apply_capacity_overrides(plant, overrides):
+    """在产能快照的副本上应用产能调整，不修改原快照
+
+    每条调整可以是：
+    - {'equipment_id': 1, 'quantity': 3, 'beat': 20, 'batch_size': 10}：修改已有机台参数
+    - {'workshop': 'UTG1车间', 'process': '边抛', 'add_equipment': {'quantity': 2, 'beat': 30, 'batch_size': 1}}：新增机台
+    - {'workshop': 'UTG1车间', 'process': '边抛', 'capacity_per_hour': 500}：直接指定工序产能
+
+    数量、节拍、每批数量和产能必须是有限正数，否则抛出 ValueError。
+    """
+    scenario = {}
+    for workshop_name, workshop in plant.items():
+        scenario[workshop_name] = {
+            'id': workshop['id'],
+            'processes': [dict(process, equipments=[dict(e) for e in process['equipments']])
+                          for process in workshop['processes']],
+        }
+
+    for override in overrides or []:
+        if 'equipment_id' in override:
+            equipment_id = int(override['equipment_id'])
+            matched = False
+            for workshop in scenario.values():
+                for process in workshop['processes']:
+                    for equipment in process['equipments']:
+                        if equipment['id'] == equipment_id:
+                            for field, label, cast in EQUIPMENT_OVERRIDE_FIELDS:
+                                if field in override:
+                                    equipment[field] = _positive(override[field], label, cast)
+                            equipment['capacity_per_hour'] = calculate_capacity_per_hour(
+                                equipment['beat'], equipment['quantity'], equipment['batch_size'])
+                            matched = True
+            if not matched:
+                raise ValueError(f'机台不存在：{equipment_id}')
+            continue
+
+        workshop = scenario.get(override.get('workshop'))
+        if workshop is None:
+            raise ValueError(f"车间不存在：{override.get('workshop')}")
+        process = next((p for p in workshop['processes'] if p['name'] == override.get('process')), None)
+        if process is None:
+            raise ValueError(f"工序不存在：{override.get('workshop')} - {override.get('process')}")
+
+        if 'add_equipment' in override:
+            extra = override['add_equipment']
+            equipment = {
+                'id': None,
+                'name': extra.get('name', f"{process['name']}(模拟)"),
+                'quantity': _positive(extra.get('quantity', 1), '机台数量', int),
+                'beat': _positive(extra['beat'], '节拍'),
+                'batch_size': _positive(extra.get('batch_size', 1), '每批次数量', int),
+            }
+            equipment['capacity_per_hour'] = calculate_capacity_per_hour(
+                equipment['beat'], equipment['quantity'], equipment['batch_size'])
+            process['equipments'].append(equipment)
+        elif 'capacity_per_hour' in override:
+            process['capacity_override'] = _positive(override['capacity_per_hour'], '工序产能')
+        else:
+            raise ValueError('无法识别的产能调整项')
+
+    # 重新汇总工序产能
+    for workshop in scenario.values():
+        for process in workshop['processes']:
+            if 'capacity_override' in process:
+                process['capacity_per_hour'] = process.pop('capacity_override')
+            else:
+                process['capacity_per_hour'] = sum(e['capacity_per_hour'] for e in process['equipments'])
+    return scenario
+
+
+def simulate_order(quantity, processes, start_time, completed=None, available_from=None):
+    """按小时模拟单个订单在流水线上的生产过程
+
+    每个后续工序比前一个工序晚1小时开始，且只能处理前序工序已经产出的数量。
+    completed 为各工序已完成的数量（滚动重排时从当前进度继续模拟），默认均为0。
+    available_from 为各工序可以开始生产的时刻（距 start_time 的小时数，可为小数，如前一订单
+    完工并换型后），默认均为0；开始时刻所在的小时按剩余时间折算产能。
+    返回 (工序ID, 时间, 该小时产量) 的列表，时间为整点所在的 datetime。
+    """
+    if completed is None:
+        completed = [0] * len(processes)
+    process_remaining = [max(0, quantity - done) for done in completed]
+    process_cumulative_output = list(completed)
+    # 已开工的工序数：流水线已推进到该位置，后续工序的起始延迟相应减少
+    started = sum(1 for done in completed if done > 0)
+
+    positive_capacities = [p['capacity_per_hour'] for p in processes if p['capacity_per_hour'] > 0]
+    # 确保有足够的时间来完成所有工序
+    max_simulation_hours = int(max(process_remaining, default=0) / min(positive_capacities, default=1)) + len(processes)
+    if available_from is None:
+        available_from = [0] * len(processes)
+    else:
+        # 等待开工的时间，以及每个工序开工的小时不满一小时
+        max_simulation_hours += int(max(available_from, default=0)) + len(processes)
+    # 从最早可以开工的小时开始模拟
+    hour_counter = int(min(available_from, default=0))
+
+    entries = []
+
+    current_time = start_time + timedelta(hours=hour_counter)
+    while any(remaining > 0 for remaining in process_remaining) and hour_counter < max_simulation_hours:
+        # 按工序顺序处理（点胶 -> 切割 -> ... -> 包装），第 idx 个工序从第 idx 小时开始
+        for idx, process in enumerate(processes):
+            capacity_per_hour = process['capacity_per_hour']
+            if capacity_per_hour <= 0 or hour_counter + started < idx:
+                continue
+            available_share = hour_counter + 1 - available_from[idx]
+            if available_share <= 0:
+                continue
+            if available_share < 1:
+                capacity_per_hour *= available_share
+
+            if idx == 0:
+                # 第一个工序直接处理剩余的数量
+                production_this_hour = min(int(capacity_per_hour), process_remaining[idx])
+            else:
+                # 前序工序已经产出但当前工序还未处理的数量
+                available_to_process = max(
+                    0, process_cumulative_output[idx - 1] - process_cumulative_output[idx])
+                production_this_hour = min(
+                    int(capacity_per_hour), process_remaining[idx], available_to_process)
+
+            if production_this_hour > 0:
+                entries.append((process['id'], current_time, production_this_hour))
+                process_remaining[idx] -= production_this_hour
+                process_cumulative_output[idx] += production_this_hour
+
+        # 移动到下一个小时
+        current_time += timedelta(hours=1)
+        hour_counter += 1
+
+    return entries
+
+
+def get_schedule_engine():
+    """按配置返回排产引擎名称（SCHEDULE_ENGINE），无法识别时使用 hourly"""
+    engine = current_app.config.get('SCHEDULE_ENGINE', 'hourly')
+    return engine if engine in SCHEDULE_ENGINES else 'hourly'
+
+
+def _record_order(order, workshop, entries, rows, summaries, setup_minutes=0.0, completion_time=None):
+    """将单个订单的模拟结果追加为排程行和订单汇总
+
+    completion_time 为精确的完工时间（离散事件引擎），默认为最后一个有产出的小时结束时刻。
+    订单带有 completed（各工序已完成数量）时，是否排完计入最后一道工序已完成的数量。
+    """
+    processes = workshop['processes']
+    done = (order.get('completed') or [0])[-1]
+    for process_id, time_point, quantity in entries:
+        rows.append({
+            'product_id': order['product_id'],
+            'process_id': process_id,
+            'workshop_id': workshop['id'],
+            'schedule_date': datetime.combine(time_point.date(), datetime.min.time()),
+            'hour': time_point.hour,
+            'production_quantity': quantity,
+        })
+
+    produced_last = sum(q for process_id, _, q in entries if process_id == processes[-1]['id'])
+    positive = [p for p in processes if p['capacity_per_hour'] > 0]
+    bottleneck = min(positive, key=lambda p: p['capacity_per_hour']) if positive else None
+    summaries[order['order_id']] = {
+        'order_id': order['order_id'],
+        'order_number': order['order_number'],
+        'product_id': order['product_id'],
+        'product_model': order['product_model'],
+        'workshop': order['workshop'],
+        'quantity': order['quantity'],
+        'shipping_date': order['shipping_date'],
+        'start_time': entries[0][1] if entries else None,
+        'completion_time': completion_time or (entries[-1][1] + timedelta(hours=1) if entries else None),
+        'completed': done + produced_last >= order['quantity'],
+        'bottleneck_process': bottleneck['name'] if bottleneck else None,
+        'bottleneck_capacity': bottleneck['capacity_per_hour'] if bottleneck else 0,
+        'setup_minutes': round(setup_minutes, 1),
+    }
+
+
+def _finish_offsets(entries, processes, start_time, available_from, free_at):
+    """订单生产后各工序空闲的时刻（距 start_time 的小时数）：最后一个生产小时内按产量折算"""
+    last = {}
+    for process_id, time_point, quantity in entries:
+        last[process_id] = (time_point, quantity)
+    result = list(free_at)
+    for idx, process in enumerate(processes):
+        if process['id'] not in last or process['capacity_per_hour'] <= 0:
+            continue
+        time_point, quantity = last[process['id']]
+        hour = (time_point - start_time).total_seconds() / 3600
+        result[idx] = max(hour, available_from[idx]) + quantity / process['capacity_per_hour']
+    return result
+
+
+def run_schedule(orders, plant, start_time=None, changeovers=None, engine='hourly'):
+    """对订单快照执行排产，全部在内存中完成
+
+    返回 (排程行列表, 订单汇总字典)。排程行可直接批量写入 production_schedules；
+    订单汇总以订单ID为键，包含开始时间、完工时间、瓶颈工序、是否排完和换型时间。
+
+    changeovers 为 app.changeover.ChangeoverModel 时，每个车间的订单先按换型时间排序，
+    再在各工序上依次生产：订单在某工序上的开工时刻为前一订单在该工序完工并换型之后。
+    engine 为 event 时使用离散事件引擎（按机台逐批模拟，完工时间精确到分钟）。
+    订单可带有 completed（各工序已完成的数量，滚动排产使用），只模拟剩余数量。
+    """
+    if start_time is None:
+        start_time = datetime.now()
+
+    rows = []
+    summaries = {}
+    if changeovers is None:
+        for order in orders:
+            workshop = plant.get(order['workshop'])
+            # 如果找不到指定的车间或没有按标准流程定义的工序，则跳过该订单
+            if not workshop or not workshop['processes']:
+                continue
+            if engine == 'event':
+                entries, _, completion = simulate_order_events(
+                    order['quantity'], workshop['processes'], start_time, order.get('completed'))
+                _record_order(order, workshop, entries, rows, summaries, completion_time=completion)
+                continue
+            entries = simulate_order(order['quantity'], workshop['processes'], start_time, order.get('completed'))
+            _record_order(order, workshop, entries, rows, summaries)
+        return rows, summaries
+
+    orders_by_workshop = {}
+    for order in orders:
+        workshop = plant.get(order['workshop'])
+        if workshop and workshop['processes']:
+            orders_by_workshop.setdefault(order['workshop'], []).append(order)
+
+    for workshop_name, workshop_orders in orders_by_workshop.items():
+        workshop = plant[workshop_name]
+        processes = workshop['processes']
+        sequence, setups = changeovers.sequence(workshop_orders, processes)
+        free_at = [0.0] * len(processes)
+        for order, setup in zip(sequence, setups):
+            available_from = [free + minutes / 60 for free, minutes in zip(free_at, setup)]
+            if engine == 'event':
+                entries, finish, completion = simulate_order_events(
+                    order['quantity'], processes, start_time, order.get('completed'), available_from)
+                free_at = [free if done is None else done for free, done in zip(free_at, finish)]
+                _record_order(order, workshop, entries, rows, summaries, sum(setup), completion)
+                continue
+            entries = simulate_order(order['quantity'], processes, start_time, order.get('completed'), available_from)
+            free_at = _finish_offsets(entries, processes, start_time, available_from, free_at)
+            _record_order(order, workshop, entries, rows, summaries, sum(setup))
+    return rows, summaries
+
+
+def workshop_bottlenecks(plant):
+    """返回每个车间产能最低的工序（流水线的产能瓶颈）"""
+    result = {}
+    for workshop_name, workshop in plant.items():
+        positive = [p for p in workshop['processes'] if p['capacity_per_hour'] > 0]
+        if not positive:
+            continue
+        bottleneck = min(positive, key=lambda p: p['capacity_per_hour'])
+        result[workshop_name] = {
+            'process': bottleneck['name'],
+            'capacity_per_hour': round(bottleneck['capacity_per_hour'], 2),
+        }
+    return result
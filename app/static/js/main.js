@@ -194,4 +194,350 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         });
     });
-});
\ No newline at end of file
+});
+
+// 排产页面实时更新：通过 SSE 接收排程变更，就地更新表格单元格
+function renderScheduleCell(cell, products) {
+    cell.textContent = '';
+    if (!products.length) {
+        const idle = document.createElement('span');
+        idle.className = 'text-muted';
+        idle.textContent = '空闲';
+        cell.appendChild(idle);
+        return;
+    }
+
+    products.forEach(product => {
+        // product: [产品型号, 数量, 机台数, 累积已投]
+        const item = document.createElement('div');
+        item.className = 'mb-2';
+
+        const model = document.createElement('div');
+        const strong = document.createElement('strong');
+        strong.textContent = product[0];
+        model.appendChild(strong);
+        item.appendChild(model);
+
+        [['数量', product[1]], ['机台数', product[2]], ['累积已投', product[3]]].forEach((field, index) => {
+            const small = document.createElement('small');
+            small.className = 'text-muted';
+            small.textContent = field[0] + ': ' + field[1];
+            item.appendChild(small);
+            if (index < 2) {
+                item.appendChild(document.createElement('br'));
+            }
+        });
+        cell.appendChild(item);
+    });
+}
+
+function applyScheduleCells(grid, cells) {
+    const touchedRows = new Set();
+    for (const [date, processId, hour, products] of cells) {
+        const cell = grid.querySelector('td[data-cell="' + date + '|' + processId + '|' + hour + '"]');
+        if (!cell) {
+            if (products.length) {
+                // 新出现的日期或工序行无法就地插入，整页刷新
+                return false;
+            }
+            continue;
+        }
+        renderScheduleCell(cell, products);
+        touchedRows.add(cell.parentElement);
+    }
+
+    // 与页面渲染一致：移除全部空闲的工序行，以及没有工序行的日期
+    touchedRows.forEach(row => {
+        if (!row.querySelector('td[data-cell] div.mb-2')) {
+            const card = row.closest('.card[data-date]');
+            row.remove();
+            if (card && !card.querySelector('tr[data-process-id]')) {
+                card.remove();
+            }
+        }
+    });
+    return true;
+}
+
+function handleScheduleEvent(grid, change) {
+    const workshopId = grid.dataset.workshopId;
+    if (change.workshop_id !== null && String(change.workshop_id) !== workshopId) {
+        return;
+    }
+
+    if (change.type === 'cells') {
+        // 只处理当前页日期范围内的单元格（日期字符串可直接比较）
+        const cells = change.cells.filter(cell =>
+            cell[0] >= grid.dataset.rangeStart && cell[0] < grid.dataset.rangeEnd);
+        if (!cells.length) {
+            return;
+        }
+        // 按周、按月显示的是汇总数据，无法就地更新单元格
+        if (grid.dataset.zoom !== 'day' || !applyScheduleCells(grid, cells)) {
+            window.location.reload();
+        }
+    } else if (change.type === 'clear') {
+        if (grid.querySelector('.card')) {
+            window.location.reload();
+        }
+    } else {
+        window.location.reload();
+    }
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    const grid = document.getElementById('schedule-grid');
+    if (!grid || !grid.dataset.eventsUrl || !window.EventSource) {
+        return;
+    }
+
+    const url = grid.dataset.eventsUrl + '?since=' + encodeURIComponent(grid.dataset.lastEventId || '0');
+    const source = new EventSource(url);
+    source.addEventListener('schedule', function(e) {
+        try {
+            handleScheduleEvent(grid, JSON.parse(e.data));
+        } catch (err) {
+            console.error('排程更新处理失败', err);
+        }
+    });
+    window.addEventListener('beforeunload', function() {
+        source.close();
+    });
+});
+
+// 排产甘特图：读取二进制排程数据（/api/schedule/feed，格式见 app/schedule_feed.py），在 canvas 上绘制
+function decodeScheduleFeed(buffer) {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+    if (magic !== 'TPSF' || view.getUint16(4, true) !== 1) {
+        throw new Error('无法识别的排程数据格式');
+    }
+    const startHour = view.getUint32(8, true);
+    const hours = view.getUint32(12, true);
+    const stringCount = view.getUint32(16, true);
+    const processCount = view.getUint32(20, true);
+    const count = view.getUint32(24, true);
+    let offset = 28;
+
+    const decoder = new TextDecoder('utf-8');
+    const strings = [];
+    for (let i = 0; i < stringCount; i++) {
+        const length = view.getUint16(offset, true);
+        strings.push(decoder.decode(new Uint8Array(buffer, offset + 2, length)));
+        offset += 2 + length;
+    }
+
+    const processes = [];
+    for (let i = 0; i < processCount; i++) {
+        processes.push({
+            id: view.getUint32(offset, true),
+            workshop: strings[view.getUint16(offset + 4, true)],
+            name: strings[view.getUint16(offset + 6, true)]
+        });
+        offset += 8;
+    }
+
+    // 记录按列存放：型号序号(uint16)、工序序号(uint8)、小时偏移(uint32)、数量(uint32)
+    const models = new Uint16Array(count);
+    const processIndex = new Uint8Array(count);
+    const hourOffsets = new Uint32Array(count);
+    const quantities = new Uint32Array(count);
+    for (let i = 0; i < count; i++) {
+        models[i] = view.getUint16(offset + i * 2, true);
+    }
+    offset += count * 2;
+    processIndex.set(new Uint8Array(buffer, offset, count));
+    offset += count;
+    for (let i = 0; i < count; i++) {
+        hourOffsets[i] = view.getUint32(offset + i * 4, true);
+        quantities[i] = view.getUint32(offset + count * 4 + i * 4, true);
+    }
+
+    return {
+        start: new Date(startHour * 3600000),  // 本地时间按 UTC 保存，显示时使用 UTC 方法
+        hours: hours,
+        strings: strings,
+        processes: processes,
+        count: count,
+        models: models,
+        processIndex: processIndex,
+        hourOffsets: hourOffsets,
+        quantities: quantities
+    };
+}
+
+function buildGanttSegments(feed) {
+    // 记录已按 (工序, 型号, 小时) 排序：连续小时合并为一段，同一工序内重叠的段分配到不同的泳道
+    const rows = feed.processes.map(() => ({ segments: [], laneEnds: [] }));
+    let current = null;
+    for (let i = 0; i < feed.count; i++) {
+        const process = feed.processIndex[i];
+        const model = feed.models[i];
+        const hour = feed.hourOffsets[i];
+        if (current && current.process === process && current.model === model && current.end === hour) {
+            current.end = hour + 1;
+            current.quantity += feed.quantities[i];
+            continue;
+        }
+        current = { process: process, model: model, start: hour, end: hour + 1, quantity: feed.quantities[i] };
+        rows[process].segments.push(current);
+    }
+
+    rows.forEach(row => {
+        row.segments.sort((a, b) => a.start - b.start);
+        row.segments.forEach(segment => {
+            let lane = row.laneEnds.findIndex(end => end <= segment.start);
+            if (lane === -1) {
+                lane = row.laneEnds.length;
+                row.laneEnds.push(0);
+            }
+            row.laneEnds[lane] = segment.end;
+            segment.lane = lane;
+        });
+    });
+    return rows;
+}
+
+function drawScheduleGantt(canvas, feed, rows) {
+    const labelWidth = 160;
+    const headerHeight = 24;
+    const laneHeight = 18;
+    const container = canvas.parentElement;
+    const hourWidth = Math.max(2, (container.clientWidth - labelWidth) / Math.max(feed.hours, 1));
+    const width = Math.ceil(labelWidth + hourWidth * feed.hours);
+    let height = headerHeight;
+    rows.forEach(row => {
+        row.top = height;
+        row.height = Math.max(1, row.laneEnds.length) * laneHeight + 6;
+        height += row.height;
+    });
+
+    const ratio = window.devicePixelRatio || 1;
+    canvas.width = width * ratio;
+    canvas.height = height * ratio;
+    canvas.style.width = width + 'px';
+    canvas.style.height = height + 'px';
+    const ctx = canvas.getContext('2d');
+    ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+    ctx.clearRect(0, 0, width, height);
+    ctx.font = '12px sans-serif';
+    ctx.textBaseline = 'middle';
+
+    // 日期网格
+    const dayWidth = hourWidth * 24;
+    for (let day = 0; day * 24 < feed.hours; day++) {
+        const x = labelWidth + day * dayWidth;
+        ctx.fillStyle = day % 2 ? '#f8f9fa' : '#ffffff';
+        ctx.fillRect(x, 0, dayWidth, height);
+        ctx.strokeStyle = '#dee2e6';
+        ctx.beginPath();
+        ctx.moveTo(x + 0.5, 0);
+        ctx.lineTo(x + 0.5, height);
+        ctx.stroke();
+        if (dayWidth >= 40) {
+            const date = new Date(feed.start.getTime() + day * 86400000);
+            ctx.fillStyle = '#495057';
+            ctx.fillText((date.getUTCMonth() + 1) + '-' + date.getUTCDate(), x + 4, headerHeight / 2);
+        }
+    }
+
+    rows.forEach((row, index) => {
+        const process = feed.processes[index];
+        ctx.fillStyle = '#212529';
+        ctx.fillText(process.workshop + ' - ' + process.name, 4, row.top + row.height / 2, labelWidth - 8);
+        ctx.strokeStyle = '#dee2e6';
+        ctx.beginPath();
+        ctx.moveTo(0, row.top + row.height + 0.5);
+        ctx.lineTo(width, row.top + row.height + 0.5);
+        ctx.stroke();
+
+        row.segments.forEach(segment => {
+            const x = labelWidth + segment.start * hourWidth;
+            const w = Math.max(1, (segment.end - segment.start) * hourWidth - 1);
+            const y = row.top + 3 + segment.lane * laneHeight;
+            ctx.fillStyle = 'hsl(' + ((segment.model * 47) % 360) + ', 60%, 55%)';
+            ctx.fillRect(x, y, w, laneHeight - 2);
+            const label = feed.strings[segment.model];
+            if (w > ctx.measureText(label).width + 6) {
+                ctx.fillStyle = '#ffffff';
+                ctx.fillText(label, x + 3, y + (laneHeight - 2) / 2);
+            }
+        });
+    });
+
+    canvas.ganttLayout = { labelWidth: labelWidth, hourWidth: hourWidth, laneHeight: laneHeight };
+}
+
+function ganttSegmentAt(canvas, feed, rows, x, y) {
+    const layout = canvas.ganttLayout;
+    const hour = (x - layout.labelWidth) / layout.hourWidth;
+    const row = rows.find(r => y >= r.top && y < r.top + r.height);
+    if (!row || hour < 0) {
+        return null;
+    }
+    const lane = Math.floor((y - row.top - 3) / layout.laneHeight);
+    return row.segments.find(s => s.lane === lane && hour >= s.start && hour < s.end) || null;
+}
+
+function formatFeedHour(feed, offset) {
+    const date = new Date(feed.start.getTime() + offset * 3600000);
+    const pad = value => String(value).padStart(2, '0');
+    return (date.getUTCMonth() + 1) + '-' + pad(date.getUTCDate()) + ' ' + pad(date.getUTCHours()) + ':00';
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    const gantt = document.getElementById('schedule-gantt');
+    if (!gantt || !window.DataView || !window.TextDecoder) {
+        return;
+    }
+    const body = gantt.querySelector('[data-gantt-body]');
+    const status = gantt.querySelector('[data-gantt-status]');
+    const canvas = gantt.querySelector('[data-gantt-canvas]');
+    let feed = null;
+    let rows = null;
+
+    function load() {
+        const params = new URLSearchParams({
+            workshop: gantt.dataset.workshop,
+            start: gantt.dataset.start,
+            days: gantt.querySelector('[data-gantt-days]').value
+        });
+        body.classList.remove('d-none');
+        status.textContent = '加载中…';
+        const started = performance.now();
+        fetch(gantt.dataset.feedUrl + '?' + params.toString(), { credentials: 'same-origin' })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('HTTP ' + response.status);
+                }
+                return response.arrayBuffer();
+            })
+            .then(buffer => {
+                const loaded = performance.now();
+                feed = decodeScheduleFeed(buffer);
+                rows = buildGanttSegments(feed);
+                drawScheduleGantt(canvas, feed, rows);
+                status.textContent = feed.count + ' 条记录，' + (buffer.byteLength / 1024).toFixed(1) + ' KB，加载 '
+                    + Math.round(loaded - started) + ' ms，解码和绘制 ' + Math.round(performance.now() - loaded) + ' ms';
+            })
+            .catch(err => {
+                status.textContent = '甘特图加载失败：' + err.message;
+            });
+    }
+
+    gantt.querySelector('[data-gantt-load]').addEventListener('click', load);
+    gantt.querySelector('[data-gantt-days]').addEventListener('change', function() {
+        if (feed) {
+            load();
+        }
+    });
+    canvas.addEventListener('mousemove', function(e) {
+        if (!feed) {
+            return;
+        }
+        const rect = canvas.getBoundingClientRect();
+        const segment = ganttSegmentAt(canvas, feed, rows, e.clientX - rect.left, e.clientY - rect.top);
+        canvas.title = segment ? feed.strings[segment.model] + '\n' + formatFeedHour(feed, segment.start) + ' - '
+            + formatFeedHour(feed, segment.end) + '\n数量: ' + segment.quantity : '';
+    });
+});
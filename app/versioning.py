@@ -0,0 +1,365 @@
+"""排程版本管理
+
+每次生成排程时保存一个版本。版本按订单（产品）拆分成数据块：块内记录按
+(工序, 小时) 排序，小时相对订单起始小时做差分编码后用 zlib 压缩，并以内容摘要去重。
+订单计划只是整体平移时数据块内容不变，多个版本可以共享同一个数据块。
+"""
+import hashlib
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import current_app, jsonify, redirect, url_for, flash
+
+from app.auth import login_required, admin_required
+from app.live_updates import publish_quietly, publish_reload, scheduled_workshop_ids
+from app.order_summaries import summarize_rows, write_order_summaries
+from app.schedule_maintenance import ScheduleCleanupError, replace_schedules
+
+
+EPOCH = datetime(1970, 1, 1)
+
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+def to_hour_index(schedule_date, hour):
+    """将 (排产日期, 小时) 转换为自1970-01-01起的小时数"""
+    return (schedule_date - EPOCH).days * 24 + hour
+
+
+def from_hour_index(hour_index):
+    """将小时数还原为 (排产日期, 小时)"""
+    days, hour = divmod(int(hour_index), 24)
+    return EPOCH + timedelta(days=days), hour
+
+
+def encode_block(process_ids, hour_indexes, quantities):
+    """将单个订单的排程编码为 (起始小时, 摘要, 压缩数据)
+
+    数据格式：记录数(uint32) + 工序ID数组 + 小时差分数组 + 数量数组，均为小端 int32。
+    每个工序内的第一条记录存储相对起始小时的偏移，其余记录存储与上一条的差值。
+    超出 int32 范围的值无法存储，抛出 ValueError。
+    """
+    process_ids = np.asarray(process_ids, dtype=np.int64)
+    hour_indexes = np.asarray(hour_indexes, dtype=np.int64)
+    quantities = np.asarray(quantities, dtype=np.int64)
+
+    order = np.lexsort((hour_indexes, process_ids))
+    process_ids = process_ids[order]
+    hour_indexes = hour_indexes[order]
+    quantities = quantities[order]
+
+    base_hour = int(hour_indexes.min()) if len(hour_indexes) else 0
+    offsets = hour_indexes - base_hour
+    deltas = np.diff(offsets, prepend=0)
+    # 工序切换处重新以相对起始小时的偏移开始
+    process_start = np.ones(len(process_ids), dtype=bool)
+    process_start[1:] = process_ids[1:] != process_ids[:-1]
+    deltas[process_start] = offsets[process_start]
+    for values in (process_ids, deltas, quantities):
+        if len(values) and (values.min() < INT32_MIN or values.max() > INT32_MAX):
+            raise ValueError('排程数据超出 int32 范围')
+
+    raw = (np.asarray([len(process_ids)], dtype='<u4').tobytes()
+           + process_ids.astype('<i4').tobytes()
+           + deltas.astype('<i4').tobytes()
+           + quantities.astype('<i4').tobytes())
+    return base_hour, hashlib.sha256(raw).hexdigest(), zlib.compress(raw, 6)
+
+
+def decode_block(payload, base_hour):
+    """解码数据块，返回 (工序ID数组, 绝对小时数组, 数量数组)"""
+    raw = zlib.decompress(payload)
+    count = int(np.frombuffer(raw, dtype='<u4', count=1)[0])
+    columns = np.frombuffer(raw, dtype='<i4', offset=4, count=count * 3).astype(np.int64).reshape(3, count)
+    process_ids, deltas, quantities = columns
+
+    # 按工序分段做前缀和，还原每条记录的小时偏移
+    process_start = np.ones(count, dtype=bool)
+    process_start[1:] = process_ids[1:] != process_ids[:-1]
+    segment = np.cumsum(process_start) - 1
+    cumulative = np.cumsum(deltas)
+    segment_base = (cumulative - deltas)[process_start]
+    offsets = cumulative - segment_base[segment]
+    return process_ids, offsets + base_hour, quantities
+
+
+def record_schedule_version(db, rows, created_by=None, plan_start=None, note=None):
+    """保存一个排程版本，并为排程行设置 schedule_version_id
+
+    rows 为排产引擎生成的排程行（字典），会被原地加上版本ID。
+    """
+    from app.models import ScheduleVersion, ScheduleBlock, ScheduleVersionBlock
+
+    version = ScheduleVersion(
+        created_by=created_by,
+        plan_start=plan_start,
+        note=note,
+        order_count=0,
+        row_count=len(rows),
+        total_quantity=sum(row['production_quantity'] for row in rows)
+    )
+    db.session.add(version)
+    db.session.flush()
+
+    # 按产品拆分排程行
+    rows_by_product = {}
+    for row in rows:
+        row['schedule_version_id'] = version.id
+        rows_by_product.setdefault(row['product_id'], []).append(row)
+
+    encoded = {}
+    for product_id, product_rows in rows_by_product.items():
+        base_hour, digest, payload = encode_block(
+            [r['process_id'] for r in product_rows],
+            [to_hour_index(r['schedule_date'], r['hour']) for r in product_rows],
+            [r['production_quantity'] for r in product_rows]
+        )
+        encoded[product_id] = (product_rows[0]['workshop_id'], base_hour, digest, payload, len(product_rows))
+
+    # 一次查询找出已存在的数据块，只写入新内容
+    digests = list({item[2] for item in encoded.values()})
+    block_ids = {}
+    for start in range(0, len(digests), 500):
+        chunk = digests[start:start + 500]
+        for block_id, digest in db.session.query(ScheduleBlock.id, ScheduleBlock.digest).filter(
+                ScheduleBlock.digest.in_(chunk)).all():
+            block_ids[digest] = block_id
+
+    for workshop_id, base_hour, digest, payload, row_count in encoded.values():
+        if digest not in block_ids:
+            block = ScheduleBlock(digest=digest, row_count=row_count, payload=payload)
+            db.session.add(block)
+            db.session.flush()
+            block_ids[digest] = block.id
+
+    db.session.bulk_insert_mappings(ScheduleVersionBlock, [{
+        'version_id': version.id,
+        'product_id': product_id,
+        'workshop_id': workshop_id,
+        'block_id': block_ids[digest],
+        'base_hour': base_hour,
+    } for product_id, (workshop_id, base_hour, digest, payload, row_count) in encoded.items()])
+
+    version.order_count = len(encoded)
+    return version
+
+
+def prune_schedule_versions(db, keep=None, max_age_days=None):
+    """按保留策略删除旧版本及不再被引用的数据块，返回删除的版本数"""
+    from app.models import ScheduleVersion, ScheduleBlock, ScheduleVersionBlock, ProductionSchedule
+
+    if keep is None:
+        keep = current_app.config.get('SCHEDULE_VERSION_RETENTION', 30)
+    if max_age_days is None:
+        max_age_days = current_app.config.get('SCHEDULE_VERSION_MAX_AGE_DAYS', 0)
+
+    version_ids = [v for (v,) in db.session.query(ScheduleVersion.id).order_by(ScheduleVersion.id.desc()).all()]
+    expired = set(version_ids[keep:]) if keep and keep > 0 else set()
+    if max_age_days and max_age_days > 0:
+        cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+        # 最新版本始终保留
+        expired.update(v for (v,) in db.session.query(ScheduleVersion.id).filter(
+            ScheduleVersion.created_at < cutoff, ScheduleVersion.id != (version_ids[0] if version_ids else None)
+        ).all())
+    if not expired:
+        return 0
+
+    expired = list(expired)
+    db.session.query(ProductionSchedule).filter(
+        ProductionSchedule.schedule_version_id.in_(expired)
+    ).update({ProductionSchedule.schedule_version_id: None}, synchronize_session=False)
+    db.session.query(ScheduleVersionBlock).filter(
+        ScheduleVersionBlock.version_id.in_(expired)
+    ).delete(synchronize_session=False)
+    db.session.query(ScheduleVersion).filter(
+        ScheduleVersion.id.in_(expired)
+    ).delete(synchronize_session=False)
+
+    # 删除不再被任何版本引用的数据块
+    referenced = db.session.query(ScheduleVersionBlock.block_id)
+    db.session.query(ScheduleBlock).filter(
+        ~ScheduleBlock.id.in_(referenced)
+    ).delete(synchronize_session=False)
+    return len(expired)
+
+
+def _version_entries(db, version_id):
+    """读取版本的 {产品ID: (车间ID, 数据块ID, 起始小时)} 映射"""
+    from app.models import ScheduleVersionBlock
+
+    return {
+        product_id: (workshop_id, block_id, base_hour)
+        for product_id, workshop_id, block_id, base_hour in db.session.query(
+            ScheduleVersionBlock.product_id, ScheduleVersionBlock.workshop_id,
+            ScheduleVersionBlock.block_id, ScheduleVersionBlock.base_hour
+        ).filter(ScheduleVersionBlock.version_id == version_id).all()
+    }
+
+
+def _load_payloads(db, block_ids):
+    from app.models import ScheduleBlock
+
+    payloads = {}
+    block_ids = list(block_ids)
+    for start in range(0, len(block_ids), 500):
+        chunk = block_ids[start:start + 500]
+        for block_id, payload in db.session.query(ScheduleBlock.id, ScheduleBlock.payload).filter(
+                ScheduleBlock.id.in_(chunk)).all():
+            payloads[block_id] = payload
+    return payloads
+
+
+def _process_day_totals(payload, base_hour):
+    """汇总数据块中每个 (工序, 日期) 的排产数量"""
+    process_ids, hour_indexes, quantities = decode_block(payload, base_hour)
+    days = hour_indexes // 24
+    totals = {}
+    for process_id, day, quantity in zip(process_ids.tolist(), days.tolist(), quantities.tolist()):
+        key = (process_id, day)
+        totals[key] = totals.get(key, 0) + quantity
+    return totals
+
+
+def diff_schedule_versions(db, from_version_id, to_version_id):
+    """对比两个版本，返回新增、删除和发生变化的订单，以及变化的工序-日期
+
+    数据块和起始小时都相同的订单直接判定为未变化，无需解码。
+    """
+    from app.models import Order, Process
+
+    old = _version_entries(db, from_version_id)
+    new = _version_entries(db, to_version_id)
+
+    changed_products = [
+        product_id for product_id in old.keys() & new.keys()
+        if old[product_id][1:] != new[product_id][1:]
+    ]
+    payloads = _load_payloads(db, {old[p][1] for p in changed_products} | {new[p][1] for p in changed_products})
+
+    product_ids = set(old) | set(new)
+    order_numbers = dict(db.session.query(Order.product_id, Order.order_number).filter(
+        Order.product_id.in_(product_ids)).all()) if product_ids else {}
+    process_names = dict(db.session.query(Process.id, Process.name).all())
+
+    changed = []
+    for product_id in sorted(changed_products):
+        old_totals = _process_day_totals(payloads[old[product_id][1]], old[product_id][2])
+        new_totals = _process_day_totals(payloads[new[product_id][1]], new[product_id][2])
+        moves = []
+        for process_id, day in sorted(old_totals.keys() | new_totals.keys()):
+            before = old_totals.get((process_id, day), 0)
+            after = new_totals.get((process_id, day), 0)
+            if before != after:
+                moves.append({
+                    'process_id': process_id,
+                    'process': process_names.get(process_id),
+                    'date': (EPOCH + timedelta(days=day)).strftime('%Y-%m-%d'),
+                    'before': before,
+                    'after': after,
+                })
+        changed.append({
+            'product_id': product_id,
+            'order_number': order_numbers.get(product_id),
+            'start_shift_hours': new[product_id][2] - old[product_id][2],
+            'shifted_only': old[product_id][1] == new[product_id][1],
+            'process_days': moves,
+        })
+
+    return {
+        'from_version': from_version_id,
+        'to_version': to_version_id,
+        'added': [{'product_id': p, 'order_number': order_numbers.get(p)} for p in sorted(set(new) - set(old))],
+        'removed': [{'product_id': p, 'order_number': order_numbers.get(p)} for p in sorted(set(old) - set(new))],
+        'unchanged_count': len(old.keys() & new.keys()) - len(changed_products),
+        'changed': changed,
+    }
+
+
+def restore_schedule_version(db, version_id):
+    """将指定版本恢复为当前排程（替换 production_schedules 中的现有数据）并提交
+
+    已删除产品的排程会被跳过。返回 (写入的排程记录数, 恢复前后涉及的车间ID集合)。
+    与生成排程相同，先写入恢复的排程再删除旧排程（见 replace_schedules），
+    写入失败时原有排程保持不变，删除旧排程失败时抛出 ScheduleCleanupError。
+    """
+    from app.models import Product
+
+    entries = _version_entries(db, version_id)
+    existing_products = {p for (p,) in db.session.query(Product.id).filter(
+        Product.id.in_(list(entries.keys()))).all()} if entries else set()
+    payloads = _load_payloads(db, {entry[1] for entry in entries.values()})
+
+    rows = []
+    for product_id, (workshop_id, block_id, base_hour) in entries.items():
+        if product_id not in existing_products:
+            continue
+        process_ids, hour_indexes, quantities = decode_block(payloads[block_id], base_hour)
+        for process_id, hour_index, quantity in zip(process_ids.tolist(), hour_indexes.tolist(), quantities.tolist()):
+            schedule_date, hour = from_hour_index(hour_index)
+            rows.append({
+                'product_id': product_id,
+                'process_id': process_id,
+                'workshop_id': workshop_id,
+                'schedule_date': schedule_date,
+                'hour': hour,
+                'production_quantity': quantity,
+                'schedule_version_id': version_id,
+            })
+
+    workshop_ids = scheduled_workshop_ids(db) | {row['workshop_id'] for row in rows}
+    write_order_summaries(db, summarize_rows(rows))
+    replace_schedules(db, rows)
+    return len(rows), workshop_ids
+
+
+def _version_to_dict(version):
+    return {
+        'id': version.id,
+        'created_at': version.created_at.strftime('%Y-%m-%d %H:%M:%S') if version.created_at else None,
+        'created_by': version.created_by,
+        'plan_start': version.plan_start.strftime('%Y-%m-%d %H:%M') if version.plan_start else None,
+        'note': version.note,
+        'order_count': version.order_count,
+        'row_count': version.row_count,
+        'total_quantity': version.total_quantity,
+    }
+
+
+def register_versioning_routes(app, db):
+    from app.models import ScheduleVersion
+
+    @app.route('/api/schedule_versions')
+    @login_required
+    def list_schedule_versions(user):
+        """排程版本列表"""
+        versions = ScheduleVersion.query.order_by(ScheduleVersion.id.desc()).all()
+        return jsonify({'versions': [_version_to_dict(v) for v in versions]})
+
+    @app.route('/api/schedule_versions/<int:from_id>/diff/<int:to_id>')
+    @login_required
+    def diff_schedule_version(from_id, to_id, user):
+        """对比两个排程版本"""
+        ScheduleVersion.query.get_or_404(from_id)
+        ScheduleVersion.query.get_or_404(to_id)
+        return jsonify(diff_schedule_versions(db, from_id, to_id))
+
+    @app.route('/schedule_versions/<int:version_id>/restore', methods=['POST'])
+    @admin_required
+    def restore_schedule(version_id, user):
+        """恢复指定排程版本 - 仅管理员"""
+        ScheduleVersion.query.get_or_404(version_id)
+        workshop_ids = scheduled_workshop_ids(db)
+        try:
+            restored, workshop_ids = restore_schedule_version(db, version_id)
+            publish_quietly(db, publish_reload, workshop_ids)
+            flash(f'已恢复排程版本 {version_id}，共 {restored} 条排程记录！', 'success')
+        except ScheduleCleanupError:
+            current_app.logger.exception('恢复排程版本 %s 后删除旧排程失败', version_id)
+            publish_quietly(db, publish_reload, workshop_ids | scheduled_workshop_ids(db))
+            flash(f'已写入排程版本 {version_id}，但旧排程没有删除完，排程中可能有重复数据，请重新恢复！', 'error')
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception('恢复排程版本 %s 失败', version_id)
+            flash('恢复排程版本失败，原有排程未改变！', 'error')
+        return redirect(url_for('schedule.overall_production_schedule'))
@@ -0,0 +1,41 @@
+"""启动预热
+
+部署后第一批请求需要建立数据库连接、加载产能数据，响应会明显变慢。
+预热在工作进程启动时预先建立连接池中的连接，并加载产能快照缓存。
+"""
+import time
+
+from sqlalchemy import text
+
+
+def warm_up(app, db, connections=None):
+    """预先打开数据库连接并加载产能快照，返回各步骤耗时（毫秒）"""
+    from app.scheduler import get_plant_snapshot
+
+    if connections is None:
+        connections = app.config.get('WARMUP_CONNECTIONS', 1)
+
+    timings = {}
+    with app.app_context():
+        started = time.perf_counter()
+        # 同时持有多个连接，迫使连接池真正建立这些连接；关闭后连接归还到池中
+        opened = []
+        try:
+            # 包括只读副本（配置了 DATABASE_REPLICA_URL 时）
+            for engine in db.engines.values():
+                for _ in range(max(1, connections)):
+                    connection = engine.connect()
+                    connection.execute(text('SELECT 1'))
+                    opened.append(connection)
+        finally:
+            for connection in opened:
+                connection.close()
+        timings['connections'] = round((time.perf_counter() - started) * 1000, 1)
+
+        started = time.perf_counter()
+        get_plant_snapshot(db, max_age=0)
+        db.session.remove()
+        timings['plant_snapshot'] = round((time.perf_counter() - started) * 1000, 1)
+
+    timings['opened'] = len(opened)
+    return timings
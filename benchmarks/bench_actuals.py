@@ -0,0 +1,86 @@
+"""实际产量采集基准测试
+
+在临时 SQLite 数据库上测量单个进程内的报工吞吐：
+
+1. HTTP：通过 POST /api/actuals 按批发送 NDJSON 报工（校验并写入内存缓冲区）
+2. 写入：缓冲区汇总后使用 upsert 批量写入 production_actuals
+
+用法：python benchmarks/bench_actuals.py [--reports 100000] [--batch 500]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='实际产量采集基准测试')
+    parser.add_argument('--reports', type=int, default=100000, help='报工条数')
+    parser.add_argument('--batch', type=int, default=500, help='每个请求的报工条数')
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    db_file.close()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_file.name
+    os.environ['ACTUALS_API_TOKEN'] = 'bench'
+    # 基准测试中手动写入，避免后台线程干扰计时
+    os.environ['ACTUALS_FLUSH_INTERVAL'] = '3600'
+    os.environ['ACTUALS_FLUSH_MAX_ROWS'] = str(10 ** 9)
+
+    from app import create_app, db
+    from app.actuals import get_actuals_buffer
+    from app.models import Workshop, Process, Equipment
+    from app.scheduler import PROCESS_SEQUENCE, invalidate_plant_snapshot
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        process_ids = []
+        for workshop_index in range(4):
+            workshop = Workshop(name=f'车间{workshop_index + 1}')
+            db.session.add(workshop)
+            db.session.flush()
+            for process_name in PROCESS_SEQUENCE:
+                process = Process(name=process_name, workshop_id=workshop.id)
+                db.session.add(process)
+                db.session.flush()
+                db.session.add(Equipment(name=f'{process_name}-A', process_id=process.id, quantity=1, beat=30, batch_size=1))
+                process_ids.append(process.id)
+        db.session.commit()
+    invalidate_plant_snapshot()
+
+    lines = [json.dumps({
+        'process_id': process_ids[i % len(process_ids)],
+        'date': '2026-10-19',
+        'hour': (i // len(process_ids)) % 24,
+        'quantity': 1,
+    }) for i in range(args.reports)]
+    bodies = ['\n'.join(lines[i:i + args.batch]) for i in range(0, len(lines), args.batch)]
+
+    client = app.test_client()
+    headers = {'Content-Type': 'application/x-ndjson', 'X-Api-Token': 'bench'}
+    started = time.perf_counter()
+    for body in bodies:
+        response = client.post('/api/actuals', data=body, headers=headers)
+        assert response.status_code == 202 and not response.get_json()['rejected'], response.get_data(as_text=True)
+    http_seconds = time.perf_counter() - started
+
+    buffer = get_actuals_buffer(app, db)
+    pending = buffer.pending()
+    started = time.perf_counter()
+    written = buffer.flush()
+    flush_seconds = time.perf_counter() - started
+
+    print(f'HTTP 接收：{args.reports} 条报工，{len(bodies)} 个请求，'
+          f'{http_seconds:.2f}s，{args.reports / http_seconds:,.0f} 条/秒')
+    print(f'批量写入：{pending} 个小时汇总行，{written} 行，{flush_seconds * 1000:.1f}ms')
+    os.unlink(db_file.name)
+
+
+if __name__ == '__main__':
+    main()
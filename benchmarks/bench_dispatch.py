@@ -0,0 +1,63 @@
+"""机台级派工基准测试
+
+不依赖数据库，直接测量 app.dispatch 的整数数组计算：每个工序若干条机台记录（节拍、台数、
+每批数量随机），将逐小时的工序数量按整批拆分到各机台，并校验结果：
+
+- 每台机台每小时的开工批数不超过可开工批数
+- 各机台加工数量之和加上未派工数量等于工序数量
+
+用法：python benchmarks/bench_dispatch.py [--processes 10] [--machines 50] [--days 31]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='机台级派工基准测试')
+    parser.add_argument('--processes', type=int, default=10, help='工序数')
+    parser.add_argument('--machines', type=int, default=50, help='每个工序的机台记录数')
+    parser.add_argument('--days', type=int, default=31, help='天数')
+    args = parser.parse_args()
+
+    from app.dispatch import HOURS_PER_DAY, batch_capacity, dispatch_batches
+
+    rng = np.random.default_rng(0)
+    n_hours = args.days * HOURS_PER_DAY
+    first_hour = 739000 * HOURS_PER_DAY
+    processes = []
+    for _ in range(args.processes):
+        beats = rng.integers(20, 7200, args.machines)
+        quantities = rng.integers(1, 5, args.machines)
+        batch_sizes = rng.integers(1, 60, args.machines)
+        processes.append((beats, quantities, batch_sizes))
+
+    started = time.perf_counter()
+    results = []
+    for beats, quantities, batch_sizes in processes:
+        capacity = batch_capacity(beats, quantities, n_hours, first_hour)
+        # 工序数量约为整批产能的 0 ~ 1.2 倍，部分小时产能不足
+        demand = (rng.random(n_hours) * 1.2 * (capacity * batch_sizes).sum(axis=1)).astype(np.int64)
+        results.append((demand, capacity, dispatch_batches(demand, capacity, batch_sizes)))
+    seconds = time.perf_counter() - started
+
+    unassigned_total = 0
+    for demand, capacity, (batches, pieces, unassigned) in results:
+        assert (batches <= capacity).all()
+        assert (pieces.sum(axis=1) + unassigned == demand).all()
+        unassigned_total += int(unassigned.sum())
+
+    machines = args.processes * args.machines
+    print(f'{args.processes} 个工序 × {args.machines} 条机台记录 × {n_hours} 小时：'
+          f'{seconds * 1000:.1f}ms，{machines * n_hours / seconds:,.0f} 机台小时/秒')
+    print(f'未派工数量合计：{unassigned_total:,}（产能不足的小时）')
+
+
+if __name__ == '__main__':
+    main()
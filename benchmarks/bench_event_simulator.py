@@ -0,0 +1,81 @@
+"""离散事件排产引擎基准测试
+
+不依赖数据库，在随机生成的 10 道工序流水线（每个工序 1~3 条机台记录，节拍、台数、每批数量随机）上
+对比按小时模拟（simulate_order）和离散事件模拟（simulate_order_events）：
+
+- 不同订单数量下的完工时间：短订单在按小时模拟中每道工序至少推迟一小时
+- 模拟耗时与批次数：离散事件引擎的耗时与批次数成正比
+- 校验离散事件引擎各工序的排产数量之和等于订单数量
+
+用法：python benchmarks/bench_event_simulator.py [--orders 200] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+
+def build_processes(rng):
+    from app.scheduler import PROCESS_SEQUENCE, calculate_capacity_per_hour
+
+    processes = []
+    for index, name in enumerate(PROCESS_SEQUENCE):
+        equipments = []
+        for _ in range(rng.randint(1, 3)):
+            beat = rng.choice([20, 30, 45, 60, 90, 600])
+            quantity = rng.randint(1, 4)
+            batch_size = rng.choice([1, 5, 10, 20, 50])
+            equipments.append({'id': None, 'name': name, 'beat': beat, 'quantity': quantity, 'batch_size': batch_size,
+                               'capacity_per_hour': calculate_capacity_per_hour(beat, quantity, batch_size)})
+        processes.append({'id': index + 1, 'name': name, 'equipments': equipments,
+                          'capacity_per_hour': sum(e['capacity_per_hour'] for e in equipments)})
+    return processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离散事件排产引擎基准测试')
+    parser.add_argument('--orders', type=int, default=200, help='耗时测试的订单数')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args()
+
+    from app.event_simulator import process_machines, simulate_order_events
+    from app.scheduler import simulate_order
+
+    rng = random.Random(args.seed)
+    processes = build_processes(rng)
+    start_time = datetime(2026, 1, 1, 8, 0)
+    bottleneck = min(p['capacity_per_hour'] for p in processes)
+    print(f'瓶颈工序产能 {bottleneck:,.0f} 片/小时，'
+          f'共 {sum(len(process_machines(p)) for p in processes)} 台机台')
+
+    print(f"\n{'订单数量':>10}{'按小时完工(h)':>16}{'离散事件完工(h)':>18}{'差值(h)':>10}")
+    for quantity in (20, 100, 500, 2000, 10000, 50000):
+        entries = simulate_order(quantity, processes, start_time)
+        hourly = (entries[-1][1] - start_time).total_seconds() / 3600 + 1
+        _, _, completion = simulate_order_events(quantity, processes, start_time)
+        event = (completion - start_time).total_seconds() / 3600
+        print(f'{quantity:>10,}{hourly:>16.2f}{event:>18.2f}{hourly - event:>10.2f}')
+
+    quantities = [rng.randint(100, 20000) for _ in range(args.orders)]
+    batches = sum(-(-q // min(b for _, b in process_machines(p))) for q in quantities for p in processes)
+    for name, simulate in (('按小时', lambda q: simulate_order(q, processes, start_time)),
+                           ('离散事件', lambda q: simulate_order_events(q, processes, start_time)[0])):
+        started = time.perf_counter()
+        results = [simulate(q) for q in quantities]
+        seconds = time.perf_counter() - started
+        print(f'\n{name}：{args.orders} 个订单 {seconds * 1000:.0f}ms，'
+              f'排程行 {sum(len(r) for r in results):,}')
+        if name == '离散事件':
+            for quantity, entries in zip(quantities, results):
+                for process in processes:
+                    assert sum(q for pid, _, q in entries if pid == process['id']) == quantity
+            print(f'约 {batches:,} 个批次（上限估计），{batches / seconds:,.0f} 批次/秒；各工序数量校验通过')
+
+
+if __name__ == '__main__':
+    main()
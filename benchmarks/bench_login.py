@@ -0,0 +1,104 @@
+"""登录吞吐基准测试
+
+在临时 SQLite 数据库上测量：
+
+1. 单次密码验证耗时：Werkzeug 默认参数与 PASSWORD_HASH_METHOD 配置的参数
+2. 登录吞吐（不限流）：用户密码为旧的默认参数哈希，第一轮登录时验证并重新哈希，
+   第二轮只按新参数验证；多个线程并发登录
+3. 交接班登录风暴（按配置限流）：同一来源 IP 的大量登录请求，统计放行和被限流（429）的次数
+
+用法：python benchmarks/bench_login.py [--users 50] [--threads 4] [--storm 300]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+
+def timed_verify(password_hash, runs=5):
+    from werkzeug.security import check_password_hash
+    started = time.perf_counter()
+    for _ in range(runs):
+        check_password_hash(password_hash, 'secret')
+    return (time.perf_counter() - started) / runs * 1000
+
+
+def login_round(app, usernames, threads):
+    """多个线程并发登录，返回 (成功次数, 耗时秒)"""
+    successes = []
+
+    def worker(names):
+        client = app.test_client()
+        ok = 0
+        for name in names:
+            response = client.post('/login', data={'username': name, 'password': 'secret'})
+            ok += response.status_code == 302
+        successes.append(ok)
+
+    workers = [threading.Thread(target=worker, args=(usernames[i::threads],)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(successes), time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='登录吞吐基准测试')
+    parser.add_argument('--users', type=int, default=50, help='用户数')
+    parser.add_argument('--threads', type=int, default=4, help='并发线程数')
+    parser.add_argument('--storm', type=int, default=300, help='登录风暴的请求数')
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    db_file.close()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_file.name
+
+    from werkzeug.security import generate_password_hash
+    from app import create_app, db
+    from app.models import User, UserRole
+    from app.passwords import password_method
+
+    app = create_app()
+    # 吞吐测试不限流
+    app.config.update(LOGIN_IP_BURST=0, LOGIN_USER_BURST=0)
+
+    with app.app_context():
+        method = password_method()
+        legacy_hash = generate_password_hash('secret')
+        print(f'单次验证：Werkzeug 默认 {legacy_hash.split("$")[0]} {timed_verify(legacy_hash):.1f}ms，'
+              f'配置 {method} {timed_verify(generate_password_hash("secret", method=method)):.1f}ms')
+
+        db.create_all()
+        usernames = [f'user{i:04d}' for i in range(args.users)]
+        db.session.add_all([User(username=name, password=legacy_hash, role=UserRole.USER) for name in usernames])
+        db.session.commit()
+
+    for label in ('第一轮（验证旧哈希并重新哈希）', '第二轮（按配置参数验证）'):
+        ok, seconds = login_round(app, usernames, args.threads)
+        print(f'{label}：{ok}/{len(usernames)} 成功，{seconds:.2f}s，{ok / seconds:.1f} 次/秒')
+
+    # 登录风暴：同一 IP 的大量请求，按配置限流
+    storm_app = create_app()
+    client = storm_app.test_client()
+    statuses = {}
+    started = time.perf_counter()
+    for i in range(args.storm):
+        response = client.post('/login', data={'username': usernames[i % len(usernames)], 'password': 'secret'})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    seconds = time.perf_counter() - started
+    config = storm_app.config
+    print(f'登录风暴（IP 突发 {config["LOGIN_IP_BURST"]} 次、每秒恢复 {config["LOGIN_IP_RATE"]} 次）：'
+          f'{args.storm} 个请求，放行 {statuses.get(302, 0)}，限流 {statuses.get(429, 0)}，{seconds:.2f}s')
+
+    os.unlink(db_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""排程二进制数据基准测试
+
+在临时 SQLite 数据库中填充订单并生成排程（与 loadtest.py 相同的数据），用测试客户端对比
+同一时间范围内：
+
+- 排产页面（按天，每页 7 天）逐页请求的总耗时和 HTML 大小
+- /api/schedule/feed 的耗时、未压缩和 gzip 压缩后的大小，以及解码校验（数量合计与数据库一致）
+
+用法：python benchmarks/bench_schedule_feed.py [--orders 200] [--days 31]
+"""
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from loadtest import PASSWORD, WORKSHOPS, seed_database  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='排程二进制数据基准测试')
+    parser.add_argument('--orders', type=int, default=200, help='订单数')
+    parser.add_argument('--days', type=int, default=31, help='时间范围（天）')
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    db_file.close()
+    try:
+        started = time.perf_counter()
+        seed_database('sqlite:///' + db_file.name, 1, args.orders)
+        print(f'填充数据并生成排程：{args.orders} 个订单，{time.perf_counter() - started:.1f}s')
+
+        from app import create_app, db
+        from app.models import ProductionSchedule, Workshop
+        from app.schedule_feed import decode_feed
+        from sqlalchemy import func
+
+        app = create_app()
+        client = app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': PASSWORD})
+        start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        workshop = WORKSHOPS[0]
+
+        html_bytes = 0
+        started = time.perf_counter()
+        for page in range(0, args.days, 7):
+            response = client.get('/overall_production_schedule', query_string={
+                'workshop': workshop, 'zoom': 'day', 'start': (start + timedelta(days=page)).strftime('%Y-%m-%d')})
+            html_bytes += len(response.data)
+        html_seconds = time.perf_counter() - started
+
+        query = {'workshop': workshop, 'start': start.strftime('%Y-%m-%d'), 'days': args.days}
+        started = time.perf_counter()
+        raw = client.get('/api/schedule/feed', query_string=query).data
+        feed_seconds = time.perf_counter() - started
+        compressed = client.get('/api/schedule/feed', query_string=query, headers={'Accept-Encoding': 'gzip'}).data
+        feed = decode_feed(gzip.decompress(compressed))
+
+        with app.app_context():
+            workshop_id = Workshop.query.filter_by(name=workshop).first().id
+            expected = db.session.query(func.sum(ProductionSchedule.production_quantity)).filter(
+                ProductionSchedule.workshop_id == workshop_id, ProductionSchedule.schedule_date >= start,
+                ProductionSchedule.schedule_date < start + timedelta(days=args.days)).scalar() or 0
+        assert int(feed['quantities'].sum()) == expected
+
+        pages = (args.days + 6) // 7
+        print(f'{workshop} {args.days} 天：')
+        print(f'  排产页面（{pages} 页）：{html_seconds * 1000:.0f}ms，{html_bytes / 1024:,.0f} KB')
+        print(f"  二进制数据：{feed_seconds * 1000:.0f}ms，{len(feed['quantities']):,} 条记录，"
+              f'{len(raw) / 1024:,.1f} KB，gzip 后 {len(compressed) / 1024:,.1f} KB；数量合计校验通过')
+    finally:
+        os.unlink(db_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""启动耗时基准测试
+
+重构前 app/__init__.py 在导入时就构建完整应用，任何脚本 import app 都要付出
+导入扩展、定义模型、导入视图和注册路由的全部开销。本脚本在独立子进程中分阶段测量：
+
+1. import app：导入 app 包（现在只创建扩展实例）
+2. import app.models：导入模型（现在可以单独导入）
+3. create_app(register_views=False)：init_db.py 和数据库迁移使用的精简应用
+4. register_blueprints：导入视图模块并注册订单、产能、排产、用户蓝图
+
+另外交替运行 flask db --help，对比精简应用与完整应用的命令行启动耗时。
+
+用法：python benchmarks/bench_startup.py [--runs 9]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子进程中分阶段计时，输出各阶段耗时（毫秒）
+PHASES_PROGRAM = '''
+import json, time
+timings = {}
+t = time.perf_counter()
+import app
+timings['import_app'] = (time.perf_counter() - t) * 1000
+t = time.perf_counter()
+import app.models
+timings['import_models'] = (time.perf_counter() - t) * 1000
+t = time.perf_counter()
+flask_app = app.create_app(register_views=False)
+timings['create_app_lean'] = (time.perf_counter() - t) * 1000
+t = time.perf_counter()
+from app.blueprints import register_blueprints
+register_blueprints(flask_app)
+timings['register_views'] = (time.perf_counter() - t) * 1000
+print(json.dumps(timings))
+'''
+
+FLASK_DB_COMMANDS = {
+    'lean': [sys.executable, '-m', 'flask', '--app', 'app:create_app(register_views=False)', 'db', '--help'],
+    'full': [sys.executable, '-m', 'flask', '--app', 'app:create_app', 'db', '--help'],
+}
+
+
+def _environment():
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'tokenplan_bench.db'))
+    env['PYTHONPATH'] = PROJECT_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+
+def measure_phases(runs, env):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PHASES_PROGRAM], cwd=PROJECT_DIR, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+def measure_flask_db(runs, env):
+    samples = {name: [] for name in FLASK_DB_COMMANDS}
+    # 交替运行两种命令，减少机器负载波动带来的偏差
+    for _ in range(runs):
+        for name, command in FLASK_DB_COMMANDS.items():
+            started = time.perf_counter()
+            subprocess.run(command, cwd=PROJECT_DIR, env=env, capture_output=True, check=True)
+            samples[name].append((time.perf_counter() - started) * 1000)
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测量应用导入和启动耗时')
+    parser.add_argument('--runs', type=int, default=9, help='每项测量的运行次数')
+    args = parser.parse_args()
+
+    env = _environment()
+    # 预热一次，确保字节码缓存已生成
+    subprocess.run([sys.executable, '-c', 'from app import create_app; create_app()'],
+                   cwd=PROJECT_DIR, env=env, check=True)
+
+    phases = measure_phases(args.runs, env)
+    flask_db = measure_flask_db(args.runs, env)
+
+    before_import = sum(phases.values())
+    lean = phases['import_app'] + phases['import_models'] + phases['create_app_lean']
+
+    rows = [
+        ('import app（重构前：构建完整应用）', before_import),
+        ('import app（现在）', phases['import_app']),
+        ('  其中 import app.models', phases['import_models']),
+        ('init_db 路径（重构前：完整应用）', before_import),
+        ('init_db 路径（现在：精简应用）', lean),
+        ('  其中视图导入与蓝图注册（已省去）', phases['register_views']),
+        ('flask db --help（完整应用）', flask_db['full']),
+        ('flask db --help（精简应用）', flask_db['lean']),
+    ]
+    width = max(len(label) for label, _ in rows) + 4
+    print(f"{'测量项':<{width}}中位数(ms)")
+    for label, value in rows:
+        print(f'{label:<{width}}{value:10.1f}')
+
+    print()
+    print(f"import app 减少 {before_import - phases['import_app']:.1f} ms "
+          f"({(1 - phases['import_app'] / before_import) * 100:.0f}%)")
+    print(f"init_db 减少 {before_import - lean:.1f} ms ({(1 - lean / before_import) * 100:.0f}%)")
+    print(f"flask db 减少 {flask_db['full'] - flask_db['lean']:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
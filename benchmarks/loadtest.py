@@ -0,0 +1,347 @@
+"""请求回放负载测试
+
+在本机启动 gunicorn（多进程 + 线程，使用 gunicorn.conf.py）并连接一个预先填充数据的
+临时 SQLite 数据库（或通过 --database-url 指定的 MySQL 测试库），由多个虚拟用户并发回放
+请求序列，按路由统计吞吐、延迟分位数和错误率。
+
+请求序列（计划）的来源：
+- 默认合成：每个用户先登录，再按权重随机访问订单管理、各车间的整体排产页面、创建订单，
+  管理员偶尔生成排程（--mix 调整权重）
+- --plan FILE：回放之前保存的计划（JSON Lines，每行 {"user", "route", "method", "path", "data"}）
+- --access-log FILE：从 gunicorn 访问日志中提取 GET 请求作为计划（按原顺序轮流分配给各用户）
+- --save-plan FILE：保存本次使用的计划，便于在修改前后回放同一组请求
+
+用法：
+  python benchmarks/loadtest.py [--users 50] [--duration 30] [--workers 4] [--threads 4]
+  python benchmarks/loadtest.py --url http://127.0.0.1:5002 --plan plan.jsonl   # 压测已启动的实例
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import shlex
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+WORKSHOPS = ['UTG1车间', 'UTG2车间', 'UTG3车间', '中试线']
+PASSWORD = 'loadtest'
+
+# 合成计划中各操作的默认权重
+DEFAULT_MIX = 'order_management=4,overall_production_schedule=4,create_order=1,generate_schedule=0.05'
+
+
+def seed_database(database_url, users, orders):
+    """创建表并填充车间、工序、机台、用户和订单，最后生成一次排程"""
+    os.environ['DATABASE_URL'] = database_url
+    from app import create_app, db
+    from app.models import Equipment, Process, User, UserRole, Workshop
+    from app.passwords import hash_password
+    from app.scheduler import PROCESS_SEQUENCE, calculate_capacity_per_hour
+
+    app = create_app()
+    app.config['LOGIN_IP_BURST'] = 0
+    with app.app_context():
+        db.create_all()
+        for workshop_name in WORKSHOPS:
+            workshop = Workshop(name=workshop_name)
+            db.session.add(workshop)
+            db.session.flush()
+            for index, process_name in enumerate(PROCESS_SEQUENCE):
+                process = Process(name=process_name, workshop_id=workshop.id)
+                db.session.add(process)
+                db.session.flush()
+                beat = 30 + index * 5
+                db.session.add(Equipment(name=f'{process_name}-A', process_id=process.id, quantity=2, beat=beat,
+                                         batch_size=10, capacity_per_hour=calculate_capacity_per_hour(beat, 2, 10)))
+        password = hash_password(PASSWORD)
+        db.session.add(User(username='admin', password=password, role=UserRole.ADMIN))
+        for index in range(users):
+            db.session.add(User(username=f'user{index}', password=password, role=UserRole.USER))
+        db.session.commit()
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': PASSWORD})
+    for index in range(orders):
+        client.post('/order/create', data=order_form(index))
+    client.post('/generate_schedule')
+
+
+def order_form(index):
+    return {
+        'customer_name': f'客户{index % 7}',
+        'product_model': f'M{index % 12:02d}',
+        'length': '100',
+        'width': '60',
+        'thickness': ['0.03', '0.05', '0.07', '0.1'][index % 4],
+        'shipping_quantity': str(2000 + (index * 137) % 5000),
+        'yield_rate': '0.9',
+        'shipping_date': (datetime.now() + timedelta(days=3 + index % 20)).strftime('%Y-%m-%d'),
+        'raw_glass_size': '500x400',
+        'workshop': WORKSHOPS[index % 2],
+    }
+
+
+def parse_mix(text):
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def synthesize_plan(users, requests_per_user, mix, seed=0):
+    """合成计划：每个用户先打开登录页并登录，之后按权重随机选择操作"""
+    rng = random.Random(seed)
+    names = [name for name in mix if mix[name] > 0]
+    weights = [mix[name] for name in names]
+    plan = []
+    for index in range(users):
+        # 第一个虚拟用户是管理员，只有管理员会生成排程
+        username = 'admin' if index == 0 else f'user{index - 1}'
+        plan.append({'user': index, 'route': 'login_page', 'method': 'GET', 'path': '/login'})
+        plan.append({'user': index, 'route': 'login', 'method': 'POST', 'path': '/login',
+                     'data': {'username': username, 'password': PASSWORD}})
+        for step in range(requests_per_user):
+            name = rng.choices(names, weights)[0]
+            if name == 'generate_schedule' and index != 0:
+                name = 'order_management'
+            if name == 'overall_production_schedule':
+                path = '/overall_production_schedule?' + urllib.parse.urlencode({'workshop': rng.choice(WORKSHOPS[:2])})
+                plan.append({'user': index, 'route': name, 'method': 'GET', 'path': path})
+            elif name == 'create_order':
+                plan.append({'user': index, 'route': name, 'method': 'POST', 'path': '/order/create',
+                             'data': order_form(rng.randrange(10 ** 6))})
+            elif name == 'generate_schedule':
+                plan.append({'user': index, 'route': name, 'method': 'POST', 'path': '/generate_schedule'})
+            else:
+                plan.append({'user': index, 'route': name, 'method': 'GET', 'path': f'/{name}'})
+    return plan
+
+
+ACCESS_LOG_PATTERN = re.compile(r'"(GET) (\S+) HTTP/[\d.]+"')
+
+
+def plan_from_access_log(path, users):
+    """从访问日志提取 GET 请求；路由名取路径第一段。每个用户先登录（日志中没有密码）"""
+    plan = []
+    for index in range(users):
+        username = 'admin' if index == 0 else f'user{index - 1}'
+        plan.append({'user': index, 'route': 'login', 'method': 'POST', 'path': '/login',
+                     'data': {'username': username, 'password': PASSWORD}})
+    with open(path, encoding='utf-8', errors='replace') as f:
+        count = 0
+        for line in f:
+            match = ACCESS_LOG_PATTERN.search(line)
+            if not match or match.group(2).startswith(('/static/', '/api/schedule/events')):
+                continue
+            request_path = match.group(2)
+            route = urllib.parse.urlsplit(request_path).path.strip('/').split('/')[0] or 'index'
+            plan.append({'user': count % users, 'route': route, 'method': 'GET', 'path': request_path})
+            count += 1
+    return plan
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """不跟随重定向：只测量被请求路由本身"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+
+    def record(self, route, seconds, status, ok):
+        with self.lock:
+            self.latencies.setdefault(route, []).append(seconds)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+            key = (route, status)
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+
+def expected(step, status):
+    """登录成功应重定向（登录失败返回 200 登录页），其他请求 2xx/3xx 为成功"""
+    if step['route'] == 'login':
+        return status == 302
+    return 200 <= status < 400
+
+
+def run_user(base_url, steps, results, deadline, timeout):
+    opener = urllib.request.build_opener(
+        urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect())
+    position = 0
+    # 登录步骤只执行一次，其余步骤在持续时间内循环回放
+    loop_start = next((i for i, s in enumerate(steps) if s['route'] not in ('login', 'login_page')), len(steps))
+    while position < len(steps) and time.perf_counter() < deadline:
+        step = steps[position]
+        data = urllib.parse.urlencode(step['data']).encode() if step.get('data') else None
+        request = urllib.request.Request(base_url + step['path'], data=data, method=step['method'])
+        started = time.perf_counter()
+        try:
+            with opener.open(request, timeout=timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        except (urllib.error.URLError, OSError):
+            status = 0
+        results.record(step['route'], time.perf_counter() - started, status, expected(step, status))
+        position += 1
+        if position == len(steps) and loop_start < len(steps):
+            position = loop_start
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def report(results, elapsed):
+    total = sum(len(v) for v in results.latencies.values())
+    errors = sum(results.errors.values())
+    print(f'\n共 {total} 个请求，{elapsed:.1f}s，{total / elapsed:.1f} 请求/秒，错误率 {errors / max(total, 1):.2%}\n')
+    header = f"{'路由':<30}{'请求数':>8}{'请求/秒':>9}{'错误率':>8}{'p50':>9}{'p90':>9}{'p99':>9}{'最大':>9}{'平均':>9}"
+    print(header)
+    print('-' * len(header))
+    for route in sorted(results.latencies, key=lambda r: -len(results.latencies[r])):
+        values = [v * 1000 for v in results.latencies[route]]
+        print(f'{route:<30}{len(values):>8}{len(values) / elapsed:>9.1f}'
+              f'{results.errors.get(route, 0) / len(values):>8.1%}'
+              f'{percentile(values, 0.5):>9.1f}{percentile(values, 0.9):>9.1f}{percentile(values, 0.99):>9.1f}'
+              f'{max(values):>9.1f}{statistics.fmean(values):>9.1f}')
+    print('（延迟单位：毫秒）')
+    failed = {key: count for key, count in results.statuses.items() if key[0] in results.errors}
+    if failed:
+        print('错误路由的状态码分布：' + '，'.join(
+            f'{route} {status or "连接失败"}×{count}' for (route, status), count in sorted(failed.items())))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(database_url, workers, threads, port):
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': database_url,
+        'BIND': f'127.0.0.1:{port}',
+        'WEB_CONCURRENCY': str(workers),
+        'GUNICORN_THREADS': str(threads),
+        'GUNICORN_ACCESS_LOG': os.devnull,
+        'GUNICORN_LOG_LEVEL': 'warning',
+        # 所有虚拟用户来自同一 IP，关闭按 IP 的登录限流
+        'LOGIN_IP_BURST': '0',
+        'LOGIN_USER_BURST': '0',
+        'SECRET_KEY': 'loadtest',
+    })
+    command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(PROJECT_DIR, 'gunicorn.conf.py'), 'wsgi:app']
+    print('启动：' + ' '.join(shlex.quote(part) for part in command))
+    process = subprocess.Popen(command, cwd=PROJECT_DIR, env=env)
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(300):
+        if process.poll() is not None:
+            sys.exit('gunicorn 启动失败')
+        try:
+            urllib.request.urlopen(base_url + '/login', timeout=1).read()
+            return process, base_url
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.1)
+    process.terminate()
+    sys.exit('gunicorn 启动超时')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='请求回放负载测试')
+    parser.add_argument('--users', type=int, default=50, help='并发虚拟用户数')
+    parser.add_argument('--duration', type=float, default=30, help='持续时间（秒）')
+    parser.add_argument('--requests-per-user', type=int, default=20, help='合成计划中每个用户登录后的请求数（循环回放）')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'合成计划的操作权重，默认 {DEFAULT_MIX}')
+    parser.add_argument('--orders', type=int, default=40, help='预先创建的订单数')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn 工作进程数')
+    parser.add_argument('--threads', type=int, default=4, help='每个工作进程的线程数')
+    parser.add_argument('--timeout', type=float, default=120, help='单个请求超时（秒）')
+    parser.add_argument('--database-url', help='使用指定的测试数据库（将被建表并写入数据），默认临时 SQLite 文件')
+    parser.add_argument('--url', help='压测已启动的实例（不启动 gunicorn，也不填充数据）')
+    parser.add_argument('--plan', help='回放保存的计划（JSON Lines）')
+    parser.add_argument('--access-log', help='从 gunicorn 访问日志生成计划')
+    parser.add_argument('--save-plan', help='保存本次使用的计划')
+    parser.add_argument('--seed', type=int, default=0, help='合成计划的随机种子')
+    args = parser.parse_args()
+
+    if args.plan:
+        with open(args.plan, encoding='utf-8') as f:
+            plan = [json.loads(line) for line in f if line.strip()]
+    elif args.access_log:
+        plan = plan_from_access_log(args.access_log, args.users)
+    else:
+        plan = synthesize_plan(args.users, args.requests_per_user, parse_mix(args.mix), args.seed)
+    if args.save_plan:
+        with open(args.save_plan, 'w', encoding='utf-8') as f:
+            for step in plan:
+                f.write(json.dumps(step, ensure_ascii=False) + '\n')
+
+    server = None
+    db_file = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        database_url = args.database_url
+        if not database_url:
+            db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+            db_file.close()
+            database_url = 'sqlite:///' + db_file.name
+        started = time.perf_counter()
+        seed_database(database_url, args.users, args.orders)
+        print(f'填充数据：{args.users} 个用户，{args.orders} 个订单，{time.perf_counter() - started:.1f}s')
+        server, base_url = start_server(database_url, args.workers, args.threads, free_port())
+
+    steps_by_user = {}
+    for step in plan:
+        steps_by_user.setdefault(step['user'], []).append(step)
+
+    results = Results()
+    try:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        threads = [threading.Thread(target=run_user, args=(base_url, steps, results, deadline, args.timeout))
+                   for steps in steps_by_user.values()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        if db_file is not None:
+            os.unlink(db_file.name)
+
+    print(f'{len(steps_by_user)} 个虚拟用户，目标 {base_url}')
+    report(results, elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,34 @@
 import os
 from urllib.parse import quote_plus as url_quote
 
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def build_engine_options(database_uri):
+    """根据环境变量生成 SQLAlchemy 连接池配置
+
+    MySQL 会主动断开空闲连接（wait_timeout），因此需要定期回收连接并在取用前检测，
+    避免出现 "MySQL server has gone away"。SQLite 只启用取用前检测。
+    """
+    options = {'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True)}
+    if database_uri.startswith('sqlite'):
+        return options
+
+    options.update({
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        # 回收时间需小于 MySQL 的 wait_timeout
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 280)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+    })
+    return options
+
+
 class Config:
     # 优先使用 DATABASE_URL 环境变量（推荐用于生产或远程数据库）
     DATABASE_URL = os.environ.get('DATABASE_URL')
@@ -35,9 +63,81 @@ class Config:
 
     # 全局数据库配置
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(SQLALCHEMY_DATABASE_URI)
+    # 只读副本：设置后 GET/HEAD 请求的查询读副本，写入和其他请求使用主库；
+    # 用户写入数据后 DB_READ_YOUR_WRITES_SECONDS 秒内该用户的请求仍读主库
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL', '')
+    SQLALCHEMY_BINDS = {
+        'replica': {'url': DATABASE_REPLICA_URL, **build_engine_options(DATABASE_REPLICA_URL)},
+    } if DATABASE_REPLICA_URL else {}
+    DB_READ_YOUR_WRITES_SECONDS = float(os.environ.get('DB_READ_YOUR_WRITES_SECONDS', 5))
+
+    # 启动预热：预先建立的数据库连接数（默认与连接池大小一致）
+    WARMUP_CONNECTIONS = int(os.environ.get('WARMUP_CONNECTIONS', SQLALCHEMY_ENGINE_OPTIONS.get('pool_size', 1)))
+    # 产能快照缓存时间（秒），本进程内修改产能数据时会立即失效
+    PLANT_CACHE_TTL = int(os.environ.get('PLANT_CACHE_TTL', 60))
     
     # 安全密钥：建议在生产中设置 SECRET_KEY
     SECRET_KEY = os.environ.get('SECRET_KEY', 'fallback-secret-key')
     
     # 会话过期时间：30 分钟
-    PERMANENT_SESSION_LIFETIME = 1800  # 秒
\ No newline at end of file
+    PERMANENT_SESSION_LIFETIME = 1800  # 秒
+
+    # 排程分批删除时每批的行数，控制单个事务的锁持有时间
+    SCHEDULE_DELETE_CHUNK_SIZE = int(os.environ.get('SCHEDULE_DELETE_CHUNK_SIZE', 5000))
+
+    # 排程版本保留策略：最多保留的版本数，以及最长保留天数（0 表示不限）
+    SCHEDULE_VERSION_RETENTION = int(os.environ.get('SCHEDULE_VERSION_RETENTION', 30))
+    SCHEDULE_VERSION_MAX_AGE_DAYS = int(os.environ.get('SCHEDULE_VERSION_MAX_AGE_DAYS', 0))
+    # production_schedules 按日期分区（仅 MySQL，需先执行迁移或 flask schedule-partitions enable）
+    SCHEDULE_PARTITIONING = _env_bool('SCHEDULE_PARTITIONING', False)
+    # 分区维护：预先创建的天数和保留的历史天数
+    SCHEDULE_PARTITION_DAYS_AHEAD = int(os.environ.get('SCHEDULE_PARTITION_DAYS_AHEAD', 60))
+    SCHEDULE_PARTITION_RETAIN_DAYS = int(os.environ.get('SCHEDULE_PARTITION_RETAIN_DAYS', 180))
+    # 归档：flask archive run 将多少天之前完工的订单及其排程写入压缩文件（目录相对路径位于 instance 目录），
+    # 以及每个归档文件包含的订单数
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 180))
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', 'archive')
+    ARCHIVE_CHUNK_ORDERS = int(os.environ.get('ARCHIVE_CHUNK_ORDERS', 500))
+    # 换型：生成排程时按换型时间对各车间订单排序并依次生产，以及每个车间排序改进的最长秒数
+    SCHEDULE_CHANGEOVERS = _env_bool('SCHEDULE_CHANGEOVERS', False)
+    CHANGEOVER_TIME_BUDGET = float(os.environ.get('CHANGEOVER_TIME_BUDGET', 1.0))
+    # 排产引擎：hourly 按小时模拟，event 按机台逐批离散事件模拟（开工延迟和完工时间精确到分钟）
+    SCHEDULE_ENGINE = os.environ.get('SCHEDULE_ENGINE', 'hourly')
+
+    # 滚动排产：是否按实际产量计算已完成数量，以及等待报工写入的小时数（最近几个小时先按计划数量计算）
+    REPLAN_NET_ACTUALS = _env_bool('REPLAN_NET_ACTUALS', True)
+    REPLAN_ACTUALS_LAG_HOURS = int(os.environ.get('REPLAN_ACTUALS_LAG_HOURS', 2))
+
+    # 排产页面实时更新（SSE）：事件轮询间隔（秒）、单个连接保持时长（秒），
+    # 单个事件最多携带的单元格数（超过则通知客户端整页刷新），以及保留的事件数
+    SSE_POLL_INTERVAL = float(os.environ.get('SSE_POLL_INTERVAL', 2))
+    SSE_STREAM_SECONDS = int(os.environ.get('SSE_STREAM_SECONDS', 25))
+    # 每个工作进程同时保持的事件流连接数上限，默认为 GUNICORN_THREADS 的一半（gthread 下每个连接占用一个线程），
+    # 超出的连接退化为轮询，并按 SSE_DEGRADED_RETRY_SECONDS 秒的间隔重连，避免频繁重连反而加重负载
+    SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', max(1, int(os.environ.get('GUNICORN_THREADS', 8)) // 2)))
+    SSE_DEGRADED_RETRY_SECONDS = int(os.environ.get('SSE_DEGRADED_RETRY_SECONDS', 20))
+    SSE_MAX_DELTA_CELLS = int(os.environ.get('SSE_MAX_DELTA_CELLS', 2000))
+    SSE_EVENT_RETENTION = int(os.environ.get('SSE_EVENT_RETENTION', 1000))
+
+    # 实际产量采集：缓冲区写入间隔（秒）、缓冲的汇总行数上限（达到后立即写入），
+    # 产线终端使用的接口令牌（请求头 X-Api-Token），以及 asyncio 采集服务端口
+    ACTUALS_FLUSH_INTERVAL = float(os.environ.get('ACTUALS_FLUSH_INTERVAL', 1.0))
+    ACTUALS_FLUSH_MAX_ROWS = int(os.environ.get('ACTUALS_FLUSH_MAX_ROWS', 5000))
+    # 缓冲区最多保留的汇总行数（数据库长时间不可写时拒绝新报工），单行写入失败的重试次数，
+    # 以及超过重试次数的报工写入的死信文件（NDJSON，相对路径位于 instance 目录，为空只记录日志）
+    ACTUALS_BUFFER_MAX_ROWS = int(os.environ.get('ACTUALS_BUFFER_MAX_ROWS', 200000))
+    ACTUALS_MAX_ATTEMPTS = int(os.environ.get('ACTUALS_MAX_ATTEMPTS', 5))
+    ACTUALS_DEAD_LETTER_FILE = os.environ.get('ACTUALS_DEAD_LETTER_FILE', 'actuals_dead_letter.ndjson')
+    ACTUALS_API_TOKEN = os.environ.get('ACTUALS_API_TOKEN', '')
+    ACTUALS_SERVER_PORT = int(os.environ.get('ACTUALS_SERVER_PORT', 5003))
+
+    # 密码哈希算法和参数（Werkzeug 格式），登录时自动将旧哈希更新为该配置
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:260000')
+    # 登录限流（令牌桶）：每个来源 IP 和每个用户名的突发次数及每秒恢复次数，突发次数为 0 表示不限流；
+    # 设置 LOGIN_RATE_LIMIT_FILE 后计数保存在本地文件中，同一台机器上的工作进程共享（相对路径位于 instance 目录）
+    LOGIN_IP_BURST = int(os.environ.get('LOGIN_IP_BURST', 60))
+    LOGIN_IP_RATE = float(os.environ.get('LOGIN_IP_RATE', 1.0))
+    LOGIN_USER_BURST = int(os.environ.get('LOGIN_USER_BURST', 5))
+    LOGIN_USER_RATE = float(os.environ.get('LOGIN_USER_RATE', 0.05))
+    LOGIN_RATE_LIMIT_FILE = os.environ.get('LOGIN_RATE_LIMIT_FILE', '')
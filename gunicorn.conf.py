@@ -0,0 +1,53 @@
+"""gunicorn 配置：多进程 + 线程的工作模式，参数均可通过环境变量调整"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '5002')}")
+
+# 工作进程数：默认 CPU 核数 * 2 + 1
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# gthread 工作模式下每个进程的线程数；线程数不宜超过数据库连接池大小 + 溢出数。
+# 排产页面的实时更新（SSE）连接在保持期间（SSE_STREAM_SECONDS）占用一个线程（等待期间不占用数据库连接），
+# 每个进程最多保持 SSE_MAX_STREAMS 个（默认为线程数的一半），超出的页面每 SSE_DEGRADED_RETRY_SECONDS 秒轮询一次；
+# 线程数应至少为 SSE_MAX_STREAMS + 预期的并发普通请求数，即 workers × (threads - SSE_MAX_STREAMS) 个线程
+# 始终可用于普通请求。打开排产页面的用户较多时应同时调大 GUNICORN_THREADS 和 SSE_MAX_STREAMS
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))  # 生成排程可能耗时较长
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# 处理一定数量请求后重启工作进程，防止内存持续增长
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.environ.get('GUNICORN_ERROR_LOG', '-')
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+# 不在主进程中预加载应用：数据库连接不能在 fork 之间共享，每个工作进程各自建立连接池
+preload_app = False
+
+
+def post_worker_init(worker):
+    """工作进程启动后预热数据库连接和产能数据"""
+    if os.environ.get('WARMUP_ON_START', '1').lower() in ('0', 'false', 'no', 'off'):
+        return
+
+    from app import db
+    from app.warmup import warm_up
+
+    try:
+        timings = warm_up(worker.wsgi, db)
+        worker.log.info('工作进程 %s 预热完成：%s', worker.pid, timings)
+    except Exception:
+        # 预热失败不影响服务启动，第一批请求会按需建立连接
+        worker.log.exception('预热失败')
+
+
+def worker_exit(server, worker):
+    """工作进程退出前写入缓冲的实际产量报工"""
+    from app.actuals import flush_all_buffers
+
+    flush_all_buffers()
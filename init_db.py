@@ -1,9 +1,11 @@
 import os
-from app import app, db
+from app import create_app, db
 from app.models import Workshop, Process, User, UserRole
-from werkzeug.security import generate_password_hash
+from app.passwords import hash_password
 
 def init_db():
+    # 初始化数据库只需要扩展和模型，不注册视图
+    app = create_app(register_views=False)
     with app.app_context():
         # 为数据库创建所有表（兼容SQLite和MySQL）
         db.create_all()
@@ -58,14 +60,14 @@ def init_db():
             # 添加管理员用户
             admin_user = User(
                 username='admin',
-                password=generate_password_hash('admin'),  # 修改密码为admin
+                password=hash_password('admin'),  # 修改密码为admin
                 role=UserRole.ADMIN
             )
             
             # 添加普通用户
             regular_user = User(
                 username='0210042432',
-                password=generate_password_hash('Cao99063010'),  # 密码哈希
+                password=hash_password('Cao99063010'),  # 密码哈希
                 role=UserRole.USER
             )
             
@@ -5,6 +5,8 @@ from flask import current_app
 
 from alembic import context
 
+from app.partitioning import is_partitioned, skip_partition_foreign_keys
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -97,6 +99,10 @@ def run_migrations_online():
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        # production_schedules 已分区时外键已删除，autogenerate 跳过这些外键
+        if conf_args.get('include_object') is None and is_partitioned(connection):
+            conf_args['include_object'] = skip_partition_foreign_keys
+
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
@@ -0,0 +1,78 @@
+"""Add schedule versions, deduplicated schedule blocks and schedule_version_id
+
+Revision ID: 3f9c1d2e7a41
+Revises: 56277a4bac8f
+Create Date: 2026-10-19 09:12:40.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c1d2e7a41'
+down_revision = '56277a4bac8f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('schedule_versions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('created_by', sa.String(length=80), nullable=True),
+    sa.Column('plan_start', sa.DateTime(), nullable=True),
+    sa.Column('note', sa.String(length=200), nullable=True),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('total_quantity', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('schedule_versions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_schedule_versions_created_at'), ['created_at'], unique=False)
+
+    op.create_table('schedule_blocks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.LargeBinary(length=16777216), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('digest')
+    )
+
+    op.create_table('schedule_version_blocks',
+    sa.Column('version_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('workshop_id', sa.Integer(), nullable=False),
+    sa.Column('block_id', sa.Integer(), nullable=False),
+    sa.Column('base_hour', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['block_id'], ['schedule_blocks.id'], ),
+    sa.ForeignKeyConstraint(['version_id'], ['schedule_versions.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('version_id', 'product_id')
+    )
+    with op.batch_alter_table('schedule_version_blocks', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_schedule_version_blocks_block_id'), ['block_id'], unique=False)
+
+    with op.batch_alter_table('production_schedules', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('schedule_version_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_production_schedules_schedule_version_id'), ['schedule_version_id'], unique=False)
+        batch_op.create_foreign_key('fk_production_schedules_schedule_version_id', 'schedule_versions',
+                                    ['schedule_version_id'], ['id'], ondelete='SET NULL')
+
+
+def downgrade():
+    with op.batch_alter_table('production_schedules', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_production_schedules_schedule_version_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_production_schedules_schedule_version_id'))
+        batch_op.drop_column('schedule_version_id')
+
+    with op.batch_alter_table('schedule_version_blocks', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_schedule_version_blocks_block_id'))
+
+    op.drop_table('schedule_version_blocks')
+    op.drop_table('schedule_blocks')
+
+    with op.batch_alter_table('schedule_versions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_schedule_versions_created_at'))
+
+    op.drop_table('schedule_versions')
@@ -0,0 +1,55 @@
+"""Add archive_chunks and archived_orders
+
+Revision ID: 4c8a1f6d2e93
+Revises: 9d4b7e2c1a58
+Create Date: 2026-10-20 01:12:44.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c8a1f6d2e93'
+down_revision = '9d4b7e2c1a58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('archive_chunks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('path', sa.String(length=500), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('cutoff', sa.DateTime(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('path')
+    )
+    op.create_table('archived_orders',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('order_number', sa.String(length=100), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('chunk_id', sa.Integer(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['chunk_id'], ['archive_chunks.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_orders', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_orders_chunk_id'), ['chunk_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_archived_orders_order_id'), ['order_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_archived_orders_order_number'), ['order_number'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('archived_orders', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_orders_order_number'))
+        batch_op.drop_index(batch_op.f('ix_archived_orders_order_id'))
+        batch_op.drop_index(batch_op.f('ix_archived_orders_chunk_id'))
+
+    op.drop_table('archived_orders')
+    op.drop_table('archive_chunks')
@@ -0,0 +1,65 @@
+"""Key product_masters by a normalized spec hash instead of float equality
+
+Revision ID: 5b1d7f3a9c26
+Revises: 7e3c9a5b1f42
+Create Date: 2026-10-20 11:18:42.730514
+
+"""
+import hashlib
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1d7f3a9c26'
+down_revision = '7e3c9a5b1f42'
+branch_labels = None
+depends_on = None
+
+
+def _spec_hash(product_model, length, width, thickness, raw_glass_size):
+    # 与 app.product_master.spec_key / spec_hash 相同：尺寸按 0.001mm 取整后计算 sha1
+    key = [product_model, round(float(length), 3), round(float(width), 3), round(float(thickness), 3),
+           raw_glass_size]
+    return hashlib.sha1(json.dumps(key, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def upgrade():
+    with op.batch_alter_table('product_masters', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('spec_hash', sa.String(length=40), nullable=True))
+
+    masters = sa.table('product_masters', sa.column('id', sa.Integer), sa.column('spec_hash', sa.String),
+                       sa.column('product_model', sa.String), sa.column('length', sa.Float),
+                       sa.column('width', sa.Float), sa.column('thickness', sa.Float),
+                       sa.column('raw_glass_size', sa.String))
+    products = sa.table('products', sa.column('product_master_id', sa.Integer))
+    orders = sa.table('orders', sa.column('product_master_id', sa.Integer))
+
+    bind = op.get_bind()
+    kept = {}
+    for row in bind.execute(sa.select(masters).order_by(masters.c.id)).all():
+        digest = _spec_hash(row.product_model, row.length, row.width, row.thickness, row.raw_glass_size)
+        if digest not in kept:
+            kept[digest] = row.id
+            bind.execute(masters.update().where(masters.c.id == row.id).values(spec_hash=digest))
+            continue
+        # 取整后相同的规格（浮点误差造成的重复主数据）并入最早的一条
+        for table in (products, orders):
+            bind.execute(table.update().where(table.c.product_master_id == row.id)
+                         .values(product_master_id=kept[digest]))
+        bind.execute(masters.delete().where(masters.c.id == row.id))
+
+    with op.batch_alter_table('product_masters', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_product_masters_spec', type_='unique')
+        batch_op.alter_column('spec_hash', existing_type=sa.String(length=40), nullable=False)
+        batch_op.create_unique_constraint('uq_product_masters_spec_hash', ['spec_hash'])
+
+
+def downgrade():
+    with op.batch_alter_table('product_masters', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_product_masters_spec_hash', type_='unique')
+        batch_op.drop_column('spec_hash')
+        batch_op.create_unique_constraint('uq_product_masters_spec',
+                                          ['product_model', 'length', 'width', 'thickness', 'raw_glass_size'])
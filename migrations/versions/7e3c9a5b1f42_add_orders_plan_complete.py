@@ -0,0 +1,26 @@
+"""Add orders.plan_complete
+
+Revision ID: 7e3c9a5b1f42
+Revises: 4c8a1f6d2e93
+Create Date: 2026-10-20 09:36:05.112873
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e3c9a5b1f42'
+down_revision = '4c8a1f6d2e93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('plan_complete', sa.Boolean(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_column('plan_complete')
@@ -0,0 +1,28 @@
+"""Add schedule_date and (workshop_id, schedule_date, hour) indexes to production_schedules
+
+Revision ID: 8b2e4c6d1f03
+Revises: 3f9c1d2e7a41
+Create Date: 2026-10-19 11:05:12.604391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4c6d1f03'
+down_revision = '3f9c1d2e7a41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('production_schedules', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_production_schedules_schedule_date'), ['schedule_date'], unique=False)
+        batch_op.create_index('ix_production_schedules_workshop_date', ['workshop_id', 'schedule_date', 'hour'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('production_schedules', schema=None) as batch_op:
+        batch_op.drop_index('ix_production_schedules_workshop_date')
+        batch_op.drop_index(batch_op.f('ix_production_schedules_schedule_date'))
@@ -0,0 +1,26 @@
+"""Add products.workshop_flexible
+
+Revision ID: 9d4b7e2c1a58
+Revises: b6e2f9a4c713
+Create Date: 2026-10-19 23:42:17.605391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4b7e2c1a58'
+down_revision = 'b6e2f9a4c713'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('workshop_flexible', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_column('workshop_flexible')
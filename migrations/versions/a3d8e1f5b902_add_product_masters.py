@@ -0,0 +1,79 @@
+"""Add product_masters and link products and orders to it
+
+Revision ID: a3d8e1f5b902
+Revises: f7c2d4e8a691
+Create Date: 2026-10-19 19:42:17.508311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d8e1f5b902'
+down_revision = 'f7c2d4e8a691'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('product_masters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_model', sa.String(length=100), nullable=False),
+    sa.Column('length', sa.Float(), nullable=False),
+    sa.Column('width', sa.Float(), nullable=False),
+    sa.Column('thickness', sa.Float(), nullable=False),
+    sa.Column('raw_glass_size', sa.String(length=100), nullable=False),
+    sa.Column('nesting_count', sa.Integer(), nullable=False),
+    sa.Column('cutting_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('product_model', 'length', 'width', 'thickness', 'raw_glass_size',
+                        name='uq_product_masters_spec')
+    )
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('product_master_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_products_product_master_id'), ['product_master_id'], unique=False)
+        batch_op.create_foreign_key('fk_products_product_master_id', 'product_masters',
+                                    ['product_master_id'], ['id'])
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('product_master_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_orders_product_master_id'), ['product_master_id'], unique=False)
+        batch_op.create_foreign_key('fk_orders_product_master_id', 'product_masters',
+                                    ['product_master_id'], ['id'])
+
+    # 按已有产品的规格回填主数据，叠数、切数沿用产品上已计算的值
+    op.execute(
+        "INSERT INTO product_masters "
+        "(product_model, length, width, thickness, raw_glass_size, nesting_count, cutting_count, created_at) "
+        "SELECT product_model, length, width, thickness, raw_glass_size, "
+        "MIN(nesting_count), MIN(cutting_count), MIN(created_at) "
+        "FROM products GROUP BY product_model, length, width, thickness, raw_glass_size"
+    )
+    op.execute(
+        "UPDATE products SET product_master_id = ("
+        "SELECT pm.id FROM product_masters pm "
+        "WHERE pm.product_model = products.product_model AND pm.length = products.length "
+        "AND pm.width = products.width AND pm.thickness = products.thickness "
+        "AND pm.raw_glass_size = products.raw_glass_size)"
+    )
+    op.execute(
+        "UPDATE orders SET product_master_id = ("
+        "SELECT p.product_master_id FROM products p WHERE p.id = orders.product_id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_orders_product_master_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_orders_product_master_id'))
+        batch_op.drop_column('product_master_id')
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_products_product_master_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_products_product_master_id'))
+        batch_op.drop_column('product_master_id')
+
+    op.drop_table('product_masters')
@@ -0,0 +1,33 @@
+"""Add changeover_rules
+
+Revision ID: b6e2f9a4c713
+Revises: a3d8e1f5b902
+Create Date: 2026-10-19 21:05:38.214907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e2f9a4c713'
+down_revision = 'a3d8e1f5b902'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('changeover_rules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('process_name', sa.String(length=100), nullable=False),
+    sa.Column('match_by', sa.String(length=20), nullable=False),
+    sa.Column('from_value', sa.String(length=100), nullable=False),
+    sa.Column('to_value', sa.String(length=100), nullable=False),
+    sa.Column('minutes', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('process_name', 'match_by', 'from_value', 'to_value', name='uq_changeover_rules_pair')
+    )
+
+
+def downgrade():
+    op.drop_table('changeover_rules')
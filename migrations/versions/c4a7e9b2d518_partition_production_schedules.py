@@ -0,0 +1,74 @@
+"""Partition production_schedules by schedule_date (MySQL, opt-in)
+
+Only runs on MySQL when SCHEDULE_PARTITIONING is enabled; a no-op elsewhere.
+The table's foreign keys are dropped and the primary key becomes
+(id, schedule_date), as required by MySQL partitioning.
+
+The DDL is a frozen copy of app.partitioning as of this revision, so later
+changes to the runtime module do not alter what this migration runs.
+
+Revision ID: c4a7e9b2d518
+Revises: 8b2e4c6d1f03
+Create Date: 2026-10-19 14:20:41.118203
+
+"""
+from datetime import date, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a7e9b2d518'
+down_revision = '8b2e4c6d1f03'
+branch_labels = None
+depends_on = None
+
+TABLE_NAME = 'production_schedules'
+
+
+def _is_partitioned(connection):
+    return connection.execute(sa.text(
+        'SELECT COUNT(*) FROM information_schema.PARTITIONS '
+        'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL'
+    ), {'table': TABLE_NAME}).scalar() > 0
+
+
+def _day_partition_sql(day):
+    upper = day + timedelta(days=1)
+    return f"PARTITION p{day:%Y%m%d} VALUES LESS THAN ('{upper:%Y-%m-%d} 00:00:00')"
+
+
+def upgrade():
+    if not current_app.config.get('SCHEDULE_PARTITIONING'):
+        return
+    connection = op.get_bind()
+    if connection.dialect.name != 'mysql' or _is_partitioned(connection):
+        return
+
+    days_ahead = current_app.config.get('SCHEDULE_PARTITION_DAYS_AHEAD', 60)
+    start_day = date.today()
+
+    for foreign_key in sa.inspect(connection).get_foreign_keys(TABLE_NAME):
+        op.execute(f"ALTER TABLE {TABLE_NAME} DROP FOREIGN KEY `{foreign_key['name']}`")
+    op.execute(f'ALTER TABLE {TABLE_NAME} DROP PRIMARY KEY, ADD PRIMARY KEY (id, schedule_date)')
+
+    partitions = [f"PARTITION p_history VALUES LESS THAN ('{start_day:%Y-%m-%d} 00:00:00')"]
+    partitions += [_day_partition_sql(start_day + timedelta(days=i)) for i in range(days_ahead + 1)]
+    partitions.append('PARTITION p_future VALUES LESS THAN (MAXVALUE)')
+    op.execute(f'ALTER TABLE {TABLE_NAME} PARTITION BY RANGE COLUMNS(schedule_date) ({", ".join(partitions)})')
+
+
+def downgrade():
+    connection = op.get_bind()
+    if connection.dialect.name != 'mysql' or not _is_partitioned(connection):
+        return
+
+    op.execute(f'ALTER TABLE {TABLE_NAME} REMOVE PARTITIONING')
+    op.execute(f'ALTER TABLE {TABLE_NAME} DROP PRIMARY KEY, ADD PRIMARY KEY (id)')
+    for column, target in (('product_id', 'products'), ('process_id', 'processes'), ('workshop_id', 'workshops')):
+        op.execute(f'ALTER TABLE {TABLE_NAME} ADD CONSTRAINT fk_{TABLE_NAME}_{column} '
+                   f'FOREIGN KEY ({column}) REFERENCES {target} (id)')
+    op.execute(f'ALTER TABLE {TABLE_NAME} ADD CONSTRAINT fk_production_schedules_schedule_version_id '
+               f'FOREIGN KEY (schedule_version_id) REFERENCES schedule_versions (id) ON DELETE SET NULL')
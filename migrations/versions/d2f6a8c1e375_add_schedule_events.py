@@ -0,0 +1,30 @@
+"""Add schedule_events for live schedule updates
+
+Revision ID: d2f6a8c1e375
+Revises: c4a7e9b2d518
+Create Date: 2026-10-19 15:02:17.490126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f6a8c1e375'
+down_revision = 'c4a7e9b2d518'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('schedule_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('workshop_id', sa.Integer(), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('schedule_events')
@@ -0,0 +1,49 @@
+"""Add order plan summary columns and order_process_summaries
+
+Revision ID: e5b9c3a7f214
+Revises: d2f6a8c1e375
+Create Date: 2026-10-19 16:10:52.227415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b9c3a7f214'
+down_revision = 'd2f6a8c1e375'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('planned_start', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('planned_completion', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('slack_hours', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('plan_updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_orders_planned_completion'), ['planned_completion'], unique=False)
+        batch_op.create_index(batch_op.f('ix_orders_slack_hours'), ['slack_hours'], unique=False)
+
+    op.create_table('order_process_summaries',
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('process_id', sa.Integer(), nullable=False),
+    sa.Column('first_start', sa.DateTime(), nullable=False),
+    sa.Column('last_finish', sa.DateTime(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['process_id'], ['processes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('order_id', 'process_id')
+    )
+
+
+def downgrade():
+    op.drop_table('order_process_summaries')
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_orders_slack_hours'))
+        batch_op.drop_index(batch_op.f('ix_orders_planned_completion'))
+        batch_op.drop_column('plan_updated_at')
+        batch_op.drop_column('slack_hours')
+        batch_op.drop_column('planned_completion')
+        batch_op.drop_column('planned_start')
@@ -0,0 +1,43 @@
+"""Add production_actuals
+
+Revision ID: f7c2d4e8a691
+Revises: e5b9c3a7f214
+Create Date: 2026-10-19 17:24:08.551390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7c2d4e8a691'
+down_revision = 'e5b9c3a7f214'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('production_actuals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('workshop_id', sa.Integer(), nullable=False),
+    sa.Column('process_id', sa.Integer(), nullable=False),
+    sa.Column('equipment_id', sa.Integer(), nullable=False),
+    sa.Column('schedule_date', sa.DateTime(), nullable=False),
+    sa.Column('hour', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('report_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['process_id'], ['processes.id'], ),
+    sa.ForeignKeyConstraint(['workshop_id'], ['workshops.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('workshop_id', 'process_id', 'equipment_id', 'schedule_date', 'hour', name='uq_production_actuals_slot')
+    )
+    with op.batch_alter_table('production_actuals', schema=None) as batch_op:
+        batch_op.create_index('ix_production_actuals_workshop_date', ['workshop_id', 'schedule_date', 'hour'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('production_actuals', schema=None) as batch_op:
+        batch_op.drop_index('ix_production_actuals_workshop_date')
+
+    op.drop_table('production_actuals')
@@ -0,0 +1,55 @@
+"""滚动排产服务：每小时推进一次排产起点，冻结已过去的小时并重新排产剩余数量
+
+用法：
+    python replan_daemon.py            # 常驻运行，每个整点后推进一次
+    python replan_daemon.py --once     # 立即推进一次后退出（可用于 cron）
+"""
+import argparse
+import logging
+import signal
+import threading
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from app import create_app, db
+from app.replanning import RollingPlanner, seconds_until_next_hour
+
+
+def main():
+    parser = argparse.ArgumentParser(description='滚动排产服务')
+    parser.add_argument('--once', action='store_true', help='推进一次后退出')
+    parser.add_argument('--delay', type=int, default=5, help='整点后延迟的秒数，等待上一小时的数据写入')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    log = logging.getLogger('replan')
+
+    app = create_app(register_views=False)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    with app.app_context():
+        planner = RollingPlanner(db)
+        while not stop.is_set():
+            try:
+                result = planner.tick()
+                if result:
+                    log.info('滚动排产完成：%s', result)
+            except Exception:
+                db.session.rollback()
+                log.exception('滚动排产失败')
+            finally:
+                # 等待期间不占用数据库连接
+                db.session.remove()
+
+            if args.once:
+                break
+            stop.wait(seconds_until_next_hour(delay=args.delay))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""生产环境启动脚本：使用 gunicorn 多进程服务应用
+
+用法：python serve.py [gunicorn 参数...]
+常用环境变量：PORT、WEB_CONCURRENCY、GUNICORN_THREADS、DB_POOL_SIZE 等，见 .env.example
+"""
+import os
+import sys
+
+from dotenv import load_dotenv
+
+
+def main():
+    load_dotenv()
+
+    try:
+        from gunicorn.app.wsgiapp import run
+    except ImportError:
+        sys.exit('未安装 gunicorn，请先执行：pip install -r requirements.txt')
+
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(project_dir)
+    sys.argv = ['gunicorn', '-c', os.path.join(project_dir, 'gunicorn.conf.py')] + sys.argv[1:] + ['wsgi:app']
+    run()
+
+
+if __name__ == '__main__':
+    main()
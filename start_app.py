@@ -1,11 +1,15 @@
 import os
 from dotenv import load_dotenv
-from app import app
 
 # Load environment variables
 load_dotenv()
 
+from app import create_app
+
+
 def main():
+    app = create_app()
+
     # Check if we have the necessary environment variables
     database_uri = app.config.get('SQLALCHEMY_DATABASE_URI')
     print(f"Using database: {database_uri}")
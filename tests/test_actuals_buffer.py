@@ -0,0 +1,103 @@
+"""ActualsBuffer 写入失败时的处理：出错的行被隔离，数据库不可用时未写入的汇总全部留在缓冲区"""
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from app import actuals, create_app, db
+from app.models import ProductionActual
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    ACTUALS_DEAD_LETTER_FILE = ''
+    ACTUALS_MAX_ATTEMPTS = 3
+
+
+DAY = datetime(2026, 10, 19)
+KEYS = [(1, process_id, 0, DAY, 8) for process_id in range(1, 9)]
+POISON = KEYS[5]
+
+
+class ActualsBufferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(TestConfig, register_views=False)
+        with self.app.app_context():
+            db.create_all()
+        self.buffer = actuals.ActualsBuffer(self.app, db, interval=3600)
+        for key in KEYS:
+            self.buffer.add(key, 10)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def written_keys(self):
+        with self.app.app_context():
+            return {(r.workshop_id, r.process_id, r.equipment_id, r.schedule_date, r.hour)
+                    for r in ProductionActual.query.all()}
+
+    def assert_conserved(self):
+        """每个汇总行要么已写入，要么仍在缓冲区中，数量不多不少"""
+        written = self.written_keys()
+        with self.buffer._lock:
+            pending = dict(self.buffer._totals)
+        self.assertEqual(len(written) + self.buffer.pending(), len(KEYS))
+        self.assertFalse(written & set(pending))
+        with self.app.app_context():
+            total = db.session.query(func.sum(ProductionActual.quantity)).scalar() or 0
+        self.assertEqual(total + sum(quantity for quantity, _ in pending.values()), 10 * len(KEYS))
+
+    def test_poison_row_is_isolated(self):
+        upsert = actuals.upsert_actuals
+
+        def failing(db_, totals):
+            if POISON in totals:
+                raise ValueError('bad row')
+            return upsert(db_, totals)
+
+        with mock.patch.object(actuals, 'upsert_actuals', failing):
+            self.assertEqual(self.buffer.flush(), len(KEYS) - 1)
+            self.assertEqual(self.buffer.pending(), 1)
+            self.assert_conserved()
+            self.buffer.flush()
+            self.buffer.flush()
+        self.assertEqual(self.buffer.pending(), 0)
+        self.assertEqual(self.buffer.stats['dead_letters'], 1)
+        self.assertEqual(self.buffer.stats['rows_written'], len(KEYS) - 1)
+
+    def test_operational_error_during_bisect_keeps_unwritten_rows(self):
+        upsert = actuals.upsert_actuals
+        # 依次在二分过程中的每一次写入时模拟数据库断开
+        for failing_call in range(2, 2 * len(KEYS)):
+            with self.subTest(failing_call=failing_call):
+                self.tearDown()
+                self.setUp()
+                calls = []
+
+                def failing(db_, totals):
+                    calls.append(len(totals))
+                    if len(calls) == failing_call:
+                        raise OperationalError('INSERT', {}, Exception('server has gone away'))
+                    if POISON in totals:
+                        raise ValueError('bad row')
+                    return upsert(db_, totals)
+
+                with mock.patch.object(actuals, 'upsert_actuals', failing):
+                    try:
+                        self.buffer.flush()
+                    except OperationalError:
+                        pass
+                self.assert_conserved()
+                self.assertEqual(len(self.written_keys()), self.buffer.stats['rows_written'])
+
+
+if __name__ == '__main__':
+    unittest.main()
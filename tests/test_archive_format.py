@@ -0,0 +1,73 @@
+"""归档数据块编码：乱序写入的列、空数据块、压缩文件读写以及损坏或超出范围的数据"""
+import gzip
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from app.archive import ArchiveError, COLUMNS, _load_chunk, decode_archive, encode_archive, write_archive_file
+from app.versioning import to_hour_index
+
+HOUR = to_hour_index(datetime(2026, 10, 19), 8)
+
+
+def make_chunk(rows):
+    header = {'cutoff': '2026-10-19T00:00:00', 'processes': {'11': ['UTG1车间', '切割']},
+              'row_count': len(rows), 'orders': [{'id': 1, 'order_number': 'SO-001'}]}
+    columns = {name: [row[i] for row in rows] for i, name in enumerate(COLUMNS)}
+    return header, columns
+
+
+class ArchiveFormatTest(unittest.TestCase):
+
+    def test_roundtrip(self):
+        # 列按给定顺序原样保存（排序由 build_archive_chunk 负责），多个产品和工序
+        rows = [(7, 12, 1, HOUR + 3, 40), (3, 11, 1, HOUR, 10), (7, 11, 2, HOUR + 1, 0), (3, 12, 1, HOUR + 2, 2 ** 32 - 1)]
+        header, columns = make_chunk(rows)
+        decoded_header, decoded = decode_archive(encode_archive(header, columns))
+        self.assertEqual(decoded_header, header)
+        for name in COLUMNS:
+            self.assertEqual(decoded[name].tolist(), columns[name])
+
+    def test_empty_chunk(self):
+        header, columns = make_chunk([])
+        decoded_header, decoded = decode_archive(encode_archive(header, columns))
+        self.assertEqual(decoded_header['row_count'], 0)
+        self.assertTrue(all(len(decoded[name]) == 0 for name in COLUMNS))
+
+    def test_rejects_values_out_of_range(self):
+        for bad in (2 ** 32, -1):
+            header, columns = make_chunk([(1, 11, 1, HOUR, bad)])
+            with self.assertRaises(ValueError):
+                encode_archive(header, columns)
+
+    def test_rejects_column_length_mismatch(self):
+        header, columns = make_chunk([(1, 11, 1, HOUR, 5)])
+        columns['quantity'].append(6)
+        with self.assertRaises(ValueError):
+            encode_archive(header, columns)
+
+    def test_rejects_damaged_data(self):
+        payload = encode_archive(*make_chunk([(1, 11, 1, HOUR, 5), (1, 11, 1, HOUR + 1, 6)]))
+        for damaged in (payload[:6], payload[:-1], payload + b'\0\0\0\0', b'XXXX' + payload[4:]):
+            with self.assertRaises(ArchiveError):
+                decode_archive(damaged)
+
+    def test_compressed_file_roundtrip(self):
+        header, columns = make_chunk([(1, 11, 1, HOUR, 5)])
+        payload = encode_archive(header, columns)
+        with tempfile.TemporaryDirectory() as directory:
+            relative, size, digest = write_archive_file(directory, 'orders-20261019000000-1-1.tpa.gz', payload)
+            path = os.path.join(directory, relative)
+            self.assertEqual(os.path.getsize(path), size)
+            with open(path, 'rb') as f:
+                self.assertEqual(gzip.decompress(f.read()), payload)
+            self.assertEqual(_load_chunk(path, digest)[0], header)
+            with self.assertRaises(ArchiveError):
+                _load_chunk(path, '0' * 64)
+            with self.assertRaises(ArchiveError):
+                write_archive_file(directory, 'orders-20261019000000-1-1.tpa.gz', payload)
+
+
+if __name__ == '__main__':
+    unittest.main()
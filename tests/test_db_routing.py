@@ -0,0 +1,98 @@
+"""读写分离：主库和副本为两个 SQLite 文件，检查只读请求、写入请求和读己之写窗口的路由"""
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from flask import jsonify
+from sqlalchemy import text
+
+from app import create_app, db
+from app.db_routing import REPLICA_BIND
+from app.models import Workshop
+from config import Config
+
+
+def workshop_names():
+    return sorted(name for (name,) in db.session.query(Workshop.name).all())
+
+
+class DbRoutingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        primary = os.path.join(self.directory.name, 'primary.db')
+        replica = os.path.join(self.directory.name, 'replica.db')
+
+        class TestConfig(Config):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{primary}'
+            SQLALCHEMY_ENGINE_OPTIONS = {}
+            SQLALCHEMY_BINDS = {REPLICA_BIND: {'url': f'sqlite:///{replica}'}}
+            DB_READ_YOUR_WRITES_SECONDS = 5
+
+        self.app = create_app(TestConfig, register_views=False)
+        with self.app.app_context():
+            db.create_all()
+            db.metadata.create_all(db.engines[REPLICA_BIND])
+            for name, engine in (('primary', db.engine), ('replica', db.engines[REPLICA_BIND])):
+                with engine.begin() as connection:
+                    connection.execute(Workshop.__table__.insert(), {'name': name})
+
+        @self.app.route('/probe', methods=['GET', 'POST'])
+        def probe():
+            return jsonify(workshop_names())
+
+        @self.app.route('/probe/flush')
+        def probe_flush():
+            before = workshop_names()
+            db.session.add(Workshop(name='added'))
+            db.session.flush()
+            return jsonify({'before': before, 'after': workshop_names()})
+
+        @self.app.route('/probe/text')
+        def probe_text():
+            names = sorted(name for (name,) in db.session.execute(text('SELECT name FROM workshops')))
+            return jsonify({'text': names, 'after': workshop_names()})
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+        self.directory.cleanup()
+
+    def test_get_reads_replica(self):
+        self.assertEqual(self.client.get('/probe').get_json(), ['replica'])
+
+    def test_post_reads_primary(self):
+        self.assertEqual(self.client.post('/probe').get_json(), ['primary'])
+
+    def test_queries_after_flush_use_primary(self):
+        self.assertEqual(self.client.get('/probe/flush').get_json(),
+                         {'before': ['replica'], 'after': ['added', 'primary']})
+
+    def test_text_sql_uses_primary(self):
+        self.assertEqual(self.client.get('/probe/text').get_json(), {'text': ['primary'], 'after': ['primary']})
+
+    def test_read_your_writes_window(self):
+        self.client.post('/probe')
+        self.assertEqual(self.client.get('/probe').get_json(), ['primary'])
+
+        # 窗口结束后恢复读副本
+        now = time.time()
+        with mock.patch('app.db_routing.time.time', return_value=now + 6):
+            self.assertEqual(self.client.get('/probe').get_json(), ['replica'])
+
+    def test_write_in_get_starts_window(self):
+        self.client.get('/probe/flush')
+        self.assertEqual(self.client.get('/probe').get_json(), ['primary'])
+        # 其他用户（没有该会话 Cookie）不受影响
+        self.assertEqual(self.app.test_client().get('/probe').get_json(), ['replica'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""排程二进制数据编码：记录排序、字符串表、被忽略的记录以及超出格式上限时的错误"""
+import unittest
+from datetime import datetime
+
+from app.schedule_feed import HEADER, decode_feed, encode_feed
+
+START = datetime(2026, 10, 19)
+DAY = datetime(2026, 10, 19)
+NEXT_DAY = datetime(2026, 10, 20)
+PROCESSES = [(11, 'UTG1车间', '切割'), (12, 'UTG1车间', '钢化'), (21, 'UTG2车间', '切割')]
+
+
+def records(feed):
+    """解码结果还原为 (型号, 工序ID, 小时偏移, 数量)，保持记录顺序"""
+    return [(feed['strings'][model], feed['processes'][process][0], offset, quantity)
+            for model, process, offset, quantity in zip(
+                feed['models'].tolist(), feed['process_index'].tolist(),
+                feed['hour_offsets'].tolist(), feed['quantities'].tolist())]
+
+
+class ScheduleFeedTest(unittest.TestCase):
+
+    def test_roundtrip_sorts_records(self):
+        rows = [
+            ('B', 12, NEXT_DAY, 1, 40),
+            ('A', 11, DAY, 9, 20),
+            ('B', 11, DAY, 8, 30),
+            ('A', 21, DAY, 23, 5),
+            ('A', 11, DAY, 8, 10),
+        ]
+        feed = decode_feed(encode_feed(rows, PROCESSES, START, 48))
+        self.assertEqual(feed['start'], START)
+        self.assertEqual(feed['hours'], 48)
+        self.assertEqual(feed['processes'], PROCESSES)
+        # 车间名、工序名和型号各只保存一份
+        self.assertEqual(sorted(feed['strings']), sorted({'UTG1车间', 'UTG2车间', '切割', '钢化', 'A', 'B'}))
+        # 按 (工序, 型号序号, 小时) 排序，型号序号按首次出现的顺序分配（B 在 A 之前）
+        self.assertEqual(records(feed), [
+            ('B', 11, 8, 30), ('A', 11, 8, 10), ('A', 11, 9, 20), ('B', 12, 25, 40), ('A', 21, 23, 5),
+        ])
+
+    def test_skips_unknown_processes_and_empty_quantities(self):
+        rows = [('A', 11, DAY, 8, 10), ('A', 99, DAY, 8, 10), ('A', 12, DAY, 8, 0), ('A', 12, DAY, 9, None)]
+        feed = decode_feed(encode_feed(rows, PROCESSES, START, 24))
+        self.assertEqual(records(feed), [('A', 11, 8, 10)])
+
+    def test_empty_feed(self):
+        payload = encode_feed([], [], START, 24)
+        self.assertEqual(len(payload), HEADER.size)
+        feed = decode_feed(payload)
+        self.assertEqual(feed['strings'], [])
+        self.assertEqual(feed['processes'], [])
+        self.assertEqual(len(feed['quantities']), 0)
+
+    def test_too_many_processes(self):
+        processes = [(process_id, 'W', 'P') for process_id in range(257)]
+        with self.assertRaises(ValueError):
+            encode_feed([], processes, START, 24)
+        encode_feed([], processes[:256], START, 24)
+
+    def test_too_many_strings(self):
+        # 字符串表中已有车间名和工序名，型号序号在第 65536 个字符串处超出 uint16
+        rows = [(f'M{i}', 11, DAY, 8, 1) for i in range(0x10000 - 2)]
+        feed = decode_feed(encode_feed(rows, PROCESSES[:1], START, 24))
+        self.assertEqual(len(feed['strings']), 0x10000)
+        self.assertEqual(int(feed['models'].max()), 0xFFFF)
+        with self.assertRaises(ValueError):
+            encode_feed(rows + [('overflow', 11, DAY, 8, 1)], PROCESSES[:1], START, 24)
+
+    def test_rejects_unknown_format(self):
+        payload = bytearray(encode_feed([], [], START, 24))
+        payload[:4] = b'XXXX'
+        with self.assertRaises(ValueError):
+            decode_feed(bytes(payload))
+
+
+if __name__ == '__main__':
+    unittest.main()
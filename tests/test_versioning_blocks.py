@@ -0,0 +1,62 @@
+"""排程版本数据块编码：乱序输入、多工序、空数据块和超出范围的值都能正确处理"""
+import unittest
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+from app.versioning import decode_block, encode_block, from_hour_index, to_hour_index
+
+BASE = to_hour_index(datetime(2026, 10, 19), 8)
+
+
+def records(process_ids, hour_indexes, quantities):
+    return sorted(zip(process_ids, hour_indexes, quantities))
+
+
+class ScheduleBlockTest(unittest.TestCase):
+
+    def roundtrip(self, process_ids, hour_indexes, quantities):
+        base_hour, _, payload = encode_block(process_ids, hour_indexes, quantities)
+        decoded = decode_block(payload, base_hour)
+        self.assertEqual(records(*(column.tolist() for column in decoded)),
+                         records(process_ids, hour_indexes, quantities))
+        return base_hour, decoded
+
+    def test_hour_index_roundtrip(self):
+        self.assertEqual(from_hour_index(to_hour_index(datetime(2026, 10, 19), 23)), (datetime(2026, 10, 19), 23))
+        self.assertEqual(from_hour_index(BASE - 9), (datetime(2026, 10, 18), 23))
+
+    def test_unsorted_multiple_processes(self):
+        process_ids = [3, 1, 3, 2, 1, 2, 3]
+        hour_indexes = [BASE + 5, BASE + 2, BASE + 1, BASE + 30, BASE, BASE + 4, BASE + 48]
+        quantities = [50, 10, 30, 0, 20, 7, 1]
+        base_hour, (decoded_processes, decoded_hours, _) = self.roundtrip(process_ids, hour_indexes, quantities)
+        self.assertEqual(base_hour, BASE)
+        # 解码结果按 (工序, 小时) 排序
+        self.assertEqual(decoded_processes.tolist(), [1, 1, 2, 2, 3, 3, 3])
+        self.assertEqual((decoded_hours - BASE).tolist(), [0, 2, 4, 30, 1, 5, 48])
+
+    def test_shifted_plan_shares_block(self):
+        process_ids, offsets, quantities = [1, 1, 2], [0, 3, 1], [5, 6, 7]
+        first = encode_block(process_ids, [BASE + o for o in offsets], quantities)
+        second = encode_block(process_ids, [BASE + 72 + o for o in offsets], quantities)
+        self.assertEqual(second[0], first[0] + 72)
+        self.assertEqual(first[1:], second[1:])
+
+    def test_empty_block(self):
+        base_hour, (process_ids, hour_indexes, quantities) = self.roundtrip([], [], [])
+        self.assertEqual(base_hour, 0)
+        self.assertEqual(len(process_ids), 0)
+        self.assertEqual(zlib.decompress(encode_block([], [], [])[2]), np.zeros(1, '<u4').tobytes())
+
+    def test_large_values(self):
+        self.roundtrip([2 ** 31 - 1], [BASE], [2 ** 31 - 1])
+        with self.assertRaises(ValueError):
+            encode_block([1], [BASE], [2 ** 31])
+        with self.assertRaises(ValueError):
+            encode_block([1, 1], [0, 2 ** 31], [1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,15 @@
+"""生产环境 WSGI 入口
+
+供 gunicorn 等 WSGI 服务器加载：gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from dotenv import load_dotenv
+
+# 加载环境变量（需在导入应用之前，配置在导入时读取）
+load_dotenv()
+
+import pymysql
+pymysql.install_as_MySQLdb()
+
+from app import create_app
+
+app = create_app()